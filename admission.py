@@ -0,0 +1,352 @@
+# admission.py
+# Server-side admission control in front of the question pipeline
+# Every question passes three checks before it may spend Gemini quota or
+# data.gov.in capacity: the session's question quota (MAX_QUESTIONS_PER_SESSION
+# per SESSION_QUOTA_WINDOW, kept per server-issued session id so neither "New"
+# nor a different ?sid= resets it), a per-session and a per-IP token bucket,
+# and a weighted fair queue limiting how many questions run at once. The
+# queue serves sessions in start-time fair order, so one user
+# firing questions back to back cannot starve everyone else; sessions past
+# RATE_LIMIT_WARNING_THRESHOLD get half weight.
+#
+# Questions that are rate limited or shed (queue full / waited too long) get a
+# degraded answer built only from local data - the general answer cache or a
+# template over already-cached datasets - instead of an error.
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    MAX_QUESTIONS_PER_SESSION, RATE_LIMIT_WARNING_THRESHOLD, SESSION_RATE_PER_MIN, SESSION_BURST,
+    IP_RATE_PER_MIN, IP_BURST, PIPELINE_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_MAX_TRACKED, SESSION_QUOTA_WINDOW
+)
+from rate_limit import TokenBucket
+from intent_classifier import is_data_question
+from general_cache import lookup_general_answer
+from prefetch import guess_entities
+from gemini_handler import determine_required_apis
+from query_planner import build_query_plan, execute_plan
+from answer_templates import render_template_answer, HIGH_WORDS, LOW_WORDS
+from logging_setup import get_logger
+from metrics import ADMISSIONS, ADMISSION_WAIT
+
+logger = get_logger(__name__)
+
+# Weight of sessions past RATE_LIMIT_WARNING_THRESHOLD (1.0 = normal share)
+HEAVY_SESSION_WEIGHT = 0.5
+
+REJECTION_MESSAGES = {
+    'quota': f"🚫 **Question limit reached**\n\nThis session has used all {MAX_QUESTIONS_PER_SESSION} "
+             "questions. Please come back later.",
+    'session_rate': "⏳ **Slow down a little**\n\nYou're asking questions faster than we can answer them.",
+    'ip_rate': "⏳ **Too many questions from your network**\n\nPlease wait a moment before asking again.",
+    'queue_full': "🚦 **SAMARTH is busy**\n\nMany people are asking questions right now.",
+    'queue_timeout': "🚦 **SAMARTH is busy**\n\nYour question waited too long for a free slot.",
+}
+
+class AdmissionRejected(Exception):
+    """
+    A question was not admitted to the pipeline
+
+    Args:
+        reason: 'quota', 'session_rate', 'ip_rate', 'queue_full' or 'queue_timeout'
+        retry_after: Suggested seconds before asking again (None = not soon)
+    """
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(REJECTION_MESSAGES[reason])
+        self.reason = reason
+        self.message = REJECTION_MESSAGES[reason]
+        self.retry_after = retry_after
+
+class FairQueue:
+    """
+    Limits concurrent questions; waiting questions are served in start-time fair order
+
+    Each queued question gets a start tag max(virtual time, its session's last
+    finish tag); the smallest tag is served next and a session's finish tag
+    advances by 1/weight per question, so backlogged sessions take turns
+    instead of queueing behind each other's bursts.
+
+    Args:
+        slots: Questions allowed to run at once
+        max_waiting: Questions allowed to wait (more are rejected immediately)
+    """
+
+    def __init__(self, slots=PIPELINE_MAX_CONCURRENT, max_waiting=ADMISSION_MAX_QUEUE):
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self._active = 0
+        self._heap = []              # [start tag, sequence, key]
+        self._finish = {}            # key -> finish tag of its latest queued question
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, key, weight=1.0, timeout=ADMISSION_QUEUE_TIMEOUT):
+        """
+        Wait for a slot
+
+        Args:
+            key: Fairness key (session id)
+            weight: Share of the pipeline relative to other keys
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            'admitted', 'queue_full' or 'queue_timeout'
+        """
+        with self._cond:
+            if self._active < self.slots and not self._heap:
+                self._active += 1
+                return 'admitted'
+            if len(self._heap) >= self.max_waiting:
+                return 'queue_full'
+
+            start = max(self._virtual_time, self._finish.get(key, 0.0))
+            self._finish[key] = start + 1.0 / weight
+            entry = [start, next(self._sequence), key]
+            heapq.heappush(self._heap, entry)
+
+            deadline = time.monotonic() + timeout
+            while not (self._active < self.slots and self._heap[0] is entry):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    # Someone else may now be at the head
+                    self._cond.notify_all()
+                    return 'queue_timeout'
+                self._cond.wait(remaining)
+
+            heapq.heappop(self._heap)
+            self._virtual_time = start
+            self._active += 1
+            if not self._heap:
+                # Nobody is backlogged - old finish tags no longer matter
+                self._finish.clear()
+            elif len(self._finish) > ADMISSION_MAX_TRACKED:
+                self._finish = {k: f for k, f in self._finish.items() if f > self._virtual_time}
+            self._cond.notify_all()
+            return 'admitted'
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'active': self._active, 'waiting': len(self._heap)}
+
+class Admission:
+    """
+    A granted pipeline slot - release() it once the question is answered
+
+    Attributes:
+        questions_asked: Questions this session has been admitted for (including this one)
+        waited: Seconds spent in the queue
+    """
+
+    def __init__(self, queue, questions_asked, waited):
+        self._queue = queue
+        self._released = False
+        self.questions_asked = questions_asked
+        self.waited = waited
+
+    @property
+    def near_limit(self):
+        return self.questions_asked >= RATE_LIMIT_WARNING_THRESHOLD
+
+    @property
+    def questions_left(self):
+        return max(0, MAX_QUESTIONS_PER_SESSION - self.questions_asked)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._queue.release()
+
+def _lru_get(table, key, factory):
+    """Value for key in an LRU OrderedDict, created on first use (oldest entries dropped)"""
+    value = table.get(key)
+    if value is None:
+        value = table[key] = factory()
+        while len(table) > ADMISSION_MAX_TRACKED:
+            table.popitem(last=False)
+    else:
+        table.move_to_end(key)
+    return value
+
+class AdmissionController:
+    """
+    Quota, rate limits and fair queueing for one process
+
+    Args:
+        queue: FairQueue guarding the pipeline
+    """
+
+    def __init__(self, queue=None):
+        self.queue = queue or FairQueue()
+        self._session_buckets = OrderedDict()
+        self._ip_buckets = OrderedDict()
+        self._question_counts = OrderedDict()  # session id -> [questions, window start], oldest window first
+        self._lock = threading.Lock()
+
+    def _questions_asked(self, session_id):
+        """Questions counted in the session's current quota window (call with the lock held)"""
+        entry = self._question_counts.get(session_id)
+        if entry is None or time.time() - entry[1] >= SESSION_QUOTA_WINDOW:
+            return 0
+        return entry[0]
+
+    def _count_question(self, session_id):
+        """
+        Count an admitted question (call with the lock held)
+
+        Counts are never evicted while their window is open - dropping one
+        would hand the session a fresh quota - so only expired windows are
+        removed once more than ADMISSION_MAX_TRACKED sessions are tracked.
+        """
+        now = time.time()
+        entry = self._question_counts.get(session_id)
+        if entry is None or now - entry[1] >= SESSION_QUOTA_WINDOW:
+            entry = self._question_counts[session_id] = [0, now]
+            # Keep the dict ordered by window start so expired windows sit at the front
+            self._question_counts.move_to_end(session_id)
+        entry[0] += 1
+
+        while len(self._question_counts) > ADMISSION_MAX_TRACKED:
+            oldest = next(iter(self._question_counts.values()))
+            if now - oldest[1] < SESSION_QUOTA_WINDOW:
+                break
+            self._question_counts.popitem(last=False)
+        return entry[0]
+
+    def _check_limits(self, session_id, client_ip):
+        """Quota and token buckets. Returns the session's question count so far."""
+        with self._lock:
+            asked = self._questions_asked(session_id)
+            if asked >= MAX_QUESTIONS_PER_SESSION:
+                raise AdmissionRejected('quota')
+
+            bucket = _lru_get(self._session_buckets, session_id,
+                              lambda: TokenBucket(SESSION_RATE_PER_MIN / 60.0, SESSION_BURST))
+            if not bucket.try_acquire():
+                raise AdmissionRejected('session_rate', retry_after=60.0 / SESSION_RATE_PER_MIN)
+
+            if client_ip:
+                bucket = _lru_get(self._ip_buckets, client_ip,
+                                  lambda: TokenBucket(IP_RATE_PER_MIN / 60.0, IP_BURST))
+                if not bucket.try_acquire():
+                    raise AdmissionRejected('ip_rate', retry_after=60.0 / IP_RATE_PER_MIN)
+            return asked
+
+    def admit(self, session_id, client_ip=None, timeout=ADMISSION_QUEUE_TIMEOUT):
+        """
+        Admit a question to the pipeline, waiting for a fair turn if it is busy
+
+        Args:
+            session_id: Stable id of the asking session
+            client_ip: Client address if known (None skips the per-IP limit)
+            timeout: Seconds to wait in the queue
+
+        Returns:
+            Admission (release it when done)
+
+        Raises:
+            AdmissionRejected: Quota used up, rate limited, or shed by the queue
+        """
+        try:
+            asked = self._check_limits(session_id, client_ip)
+        except AdmissionRejected as e:
+            ADMISSIONS.inc(outcome=e.reason)
+            logger.info("🚦 Question rejected (%s)", e.reason)
+            raise
+
+        weight = HEAVY_SESSION_WEIGHT if asked >= RATE_LIMIT_WARNING_THRESHOLD else 1.0
+        started = time.monotonic()
+        outcome = self.queue.acquire(session_id, weight=weight, timeout=timeout)
+        waited = time.monotonic() - started
+        ADMISSIONS.inc(outcome=outcome)
+
+        if outcome != 'admitted':
+            logger.warning("🚦 Question shed (%s) after %.1fs, queue %s", outcome, waited, self.queue.stats())
+            raise AdmissionRejected(outcome, retry_after=ADMISSION_QUEUE_TIMEOUT)
+
+        ADMISSION_WAIT.observe(waited)
+        with self._lock:
+            asked = self._count_question(session_id)
+        return Admission(self.queue, asked, waited)
+
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_admission_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
+
+# ---------------------------------------------------------------------------
+# Degraded answers for shed questions
+# ---------------------------------------------------------------------------
+
+def _guess_intent(question_lower):
+    if any(word in question_lower for word in HIGH_WORDS + LOW_WORDS):
+        return 'extreme'
+    if any(word in question_lower for word in ['trend', 'over the years', 'change', 'growth']):
+        return 'trend'
+    return 'comparison'
+
+def degraded_answer(question):
+    """
+    Answer from local data only - no Gemini call, no upstream fetch
+
+    Returns:
+        Markdown answer, or None if nothing local can answer the question
+    """
+    if not is_data_question(question):
+        return lookup_general_answer(question)
+
+    guess = guess_entities(question)
+    parsed = guess['parsed']
+    if not parsed['entities']['states']:
+        return None
+    if parsed['intent'] != 'policy':
+        parsed['intent'] = _guess_intent(question.lower())
+
+    plan = build_query_plan(determine_required_apis(guess))
+    if not plan['nodes'] or any(node['dataset'] and not node['cached'] for node in plan['nodes'].values()):
+        return None
+    fetched_data, _ = execute_plan(plan)
+    return render_template_answer(question, guess, fetched_data)
+
+def shed_answer(question, rejection):
+    """
+    What to show for a rejected question: a degraded answer when one is
+    available (never for an exhausted quota), otherwise the rejection message
+
+    Args:
+        question: The user's question
+        rejection: The AdmissionRejected raised by admit()
+    """
+    message = rejection.message
+    if rejection.retry_after:
+        message += f" Please try again in about {max(1, round(rejection.retry_after))} seconds."
+    if rejection.reason == 'quota':
+        return message
+
+    try:
+        answer = degraded_answer(question)
+    except Exception as e:
+        logger.warning("⚠️ Degraded answer failed: %.200s", e)
+        answer = None
+
+    if not answer:
+        return message
+    return f"{answer}\n\n---\n{message}\n\n_This answer was built from cached data only._"
@@ -0,0 +1,269 @@
+# answer_templates.py
+# Deterministic answers for purely numeric questions
+# Rainfall averages and comparisons, seasonal totals, top crops, district
+# and state extremes and simple production/yield trends are fully computable
+# from the fetched data, so they are rendered straight to markdown - no Gemini call,
+# no quota, milliseconds instead of seconds. Questions asking for reasons,
+# recommendations or correlations (or needing water-efficiency data) return
+# None and are answered by Gemini as before.
+
+import re
+
+from crop_rollups import get_district_ranking
+
+# Intents whose answers are pure numbers
+TEMPLATE_INTENTS = ('comparison', 'trend', 'extreme')
+
+# Wording that asks for interpretation rather than numbers
+REASONING_WORDS = ('why', 'reason', 'recommend', 'suggest', 'argument', 'impact', 'correlat', 'explain',
+                   'policy', 'should', 'cause', 'effect', 'relationship', 'advis', 'support', 'summary')
+
+HIGH_WORDS = ('highest', 'most', 'largest', 'maximum', 'top', 'best', 'leading')
+LOW_WORDS = ('lowest', 'least', 'smallest', 'minimum', 'bottom', 'worst')
+
+DEFAULT_TOP_N = 3
+
+def wants_yield(user_question, parsed_data):
+    """True if the question is about yield/area rather than raw production"""
+    question_lower = user_question.lower()
+    metrics = [str(m).lower() for m in parsed_data.get('parsed', {}).get('entities', {}).get('metrics', []) or []]
+    return ('yield' in metrics or 'area' in metrics
+            or any(word in question_lower for word in ['yield', 'productivity', 'hectare']))
+
+def _has_word(text, words):
+    return any(re.search(rf"\b{word}", text) for word in words)
+
+def _requested_years(user_question, parsed_data):
+    """Years the question asks about: parsed years plus any range it names ("2010 to 2014")"""
+    years = set()
+    for year in parsed_data.get('parsed', {}).get('entities', {}).get('years', []) or []:
+        try:
+            years.add(int(year))
+        except (ValueError, TypeError):
+            continue
+    for start, end in re.findall(r"\b((?:19|20)\d{2})\s*(?:-|–|to|until|through)\s*((?:19|20)\d{2})\b", user_question):
+        years.update(range(int(start), int(end) + 1))
+    return years
+
+def _year_span(years):
+    years = sorted(years)
+    if not years:
+        return ""
+    return str(years[0]) if years[0] == years[-1] else f"{years[0]}-{years[-1]}"
+
+def _change(first, last):
+    """'+12.3%' style change between two values (empty if undefined)"""
+    if not first:
+        return ""
+    return f"{(last - first) / first * 100:+.1f}%"
+
+def _annual_values(records):
+    """(year, mm, partial) for usable annual records - zero/negative values mark missing data"""
+    values = []
+    for r in records:
+        try:
+            value, year = float(r.get('annual')), int(float(r.get('year')))
+        except (ValueError, TypeError):
+            continue
+        if value > 0:
+            values.append((year, value, r.get('coverage', 1) < 1))
+    return sorted(values)
+
+def _render_rainfall(sections, trend):
+    """Annual rainfall: averages per state, comparison and (for trends) yearly values"""
+    lines, averages = [], {}
+    for data in sections:
+        values = _annual_values(data.get('records', []))
+        if not values:
+            lines.append(f"- **{data['state']}:** no rainfall data for the requested years")
+            continue
+        average = sum(v for _, v, _ in values) / len(values)
+        averages[data['state']] = average
+        lines.append(f"- **{data['state']}:** {average:,.1f} mm average "
+                     f"({_year_span([y for y, _, _ in values])}, {len(values)} year{'s' if len(values) != 1 else ''})")
+        if trend or len(sections) == 1:
+            for year, value, partial in values:
+                lines.append(f"  - {year}: {value:,.1f} mm" + (" (partial subdivisions)" if partial else ""))
+            if trend and len(values) > 1:
+                lines.append(f"  - Change {values[0][0]}→{values[-1][0]}: {_change(values[0][1], values[-1][1])}")
+
+    out = ["**Annual rainfall**", *lines]
+    if len(averages) > 1:
+        ordered = sorted(averages.items(), key=lambda item: item[1], reverse=True)
+        (wet, wet_mm), (dry, dry_mm) = ordered[0], ordered[-1]
+        out.append("")
+        out.append(f"**{wet}** received **{wet_mm - dry_mm:,.1f} mm** ({_change(dry_mm, wet_mm)}) more rainfall "
+                   f"on average than **{dry}**.")
+    return out
+
+def _render_seasonal(sections):
+    out = []
+    for data in sections:
+        records = data.get('records', [])
+        out.append(f"**{data['state']} - {data['season']} rainfall**")
+        if not records:
+            out.append("- No seasonal rainfall data for the requested years")
+            continue
+        for record in records:
+            out.append(f"- {record['year']}: {record['rainfall']:,.1f} mm")
+        if len(records) > 1:
+            average = sum(r['rainfall'] for r in records) / len(records)
+            out.append(f"- Average: {average:,.1f} mm")
+    return out
+
+def _format_value(value, metric):
+    return f"{value:,.2f} t/ha" if metric == 'yield' else f"{value:,.0f} " + ("ha" if metric == 'area' else "tonnes")
+
+def _render_top_crops(data, ranking, top_n):
+    totals = {}
+    years = set()
+    for crop, crop_state, year in ranking.keys():
+        totals[crop] = totals.get(crop, 0) + ranking.total(crop, crop_state, year)
+        years.add(year)
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top_n]
+
+    out = [f"**Top {top_n} crops by production in {data['state']} ({_year_span(years)})**"]
+    for rank, (crop, total) in enumerate(ordered, 1):
+        out.append(f"{rank}. **{crop}** - {total:,.0f} tonnes")
+    return out
+
+def _render_district_extremes(data, ranking, metric, high, low):
+    out = []
+    for crop, crop_state, year in ranking.keys():
+        count = ranking.district_count(crop, crop_state, year, metric=metric)
+        if not count:
+            continue
+        out.append(f"**{crop} {metric} by district in {data['state']} ({year}, {count} district{'s' if count != 1 else ''})**")
+        if high:
+            district, value = ranking.top(crop, crop_state, year, metric=metric)[0]
+            out.append(f"- Highest: **{district}** - {_format_value(value, metric)}")
+        if low:
+            district, value = ranking.bottom(crop, crop_state, year, metric=metric)[0]
+            out.append(f"- Lowest: **{district}** - {_format_value(value, metric)}")
+    return out
+
+def _render_state_extremes(sections, metric, high, low):
+    """States side by side on their state-level totals, per crop and year"""
+    values = {}
+    for data, ranking in sections:
+        for crop, crop_state, year in ranking.keys():
+            value = ranking.total(crop, crop_state, year, metric=metric)
+            if value:
+                values.setdefault((crop, year), {})[data['state']] = value
+
+    out = []
+    for (crop, year), by_state in sorted(values.items()):
+        if len(by_state) < 2:
+            continue
+        ordered = sorted(by_state.items(), key=lambda item: item[1], reverse=True)
+        out.append(f"**{crop} {metric} by state ({year})**")
+        for state, value in ordered:
+            out.append(f"- {state}: {_format_value(value, metric)}")
+        if high:
+            out.append(f"- Highest: **{ordered[0][0]}**")
+        if low:
+            out.append(f"- Lowest: **{ordered[-1][0]}**")
+    return out
+
+def _render_crop_series(data, ranking, metric):
+    out = []
+    crops = sorted({crop for crop, _, _ in ranking.keys()})
+    for crop in crops:
+        series = []
+        for _, crop_state, _ in ranking.keys(crop=crop)[:1]:
+            series = ranking.trend(crop, crop_state, metric=metric)
+        if not series:
+            continue
+        out.append(f"**{crop} {metric} in {data['state']}**")
+        for year, value in series:
+            out.append(f"- {year}: {_format_value(value, metric)}")
+        if len(series) > 1:
+            out.append(f"- Change {series[0][0]}→{series[-1][0]}: {_change(series[0][1], series[-1][1])}")
+    return out
+
+def render_template_answer(user_question, parsed_data, fetched_data):
+    """
+    Render a markdown answer without Gemini when the question is purely numeric
+
+    Args:
+        user_question: Original question
+        parsed_data: Parsed question (intent and entities)
+        fetched_data: Results keyed like execute_plan's output
+
+    Returns:
+        Markdown answer, or None if no template fits the question
+    """
+    question_lower = user_question.lower()
+    intent = parsed_data.get('parsed', {}).get('intent')
+    if intent not in TEMPLATE_INTENTS or _has_word(question_lower, REASONING_WORDS):
+        return None
+
+    rainfall, seasonal, crops = [], [], []
+    for key, data in fetched_data.items():
+        if not data.get('success'):
+            continue
+        if 'rainfall_seasonal' in key:
+            seasonal.append(data)
+        elif 'rainfall' in key:
+            rainfall.append(data)
+        elif 'crops' in key:
+            crops.append(data)
+        else:
+            # Water efficiency and anything new needs interpretation
+            return None
+
+    if not (rainfall or seasonal or crops):
+        return None
+
+    trend = intent == 'trend'
+    metric = 'yield' if wants_yield(user_question, parsed_data) else 'production'
+    high, low = _has_word(question_lower, HIGH_WORDS), _has_word(question_lower, LOW_WORDS)
+    if not (high or low):
+        high = low = True
+    top_match = re.search(r"\btop\s+(\d+)", question_lower)
+    top_n = int(top_match.group(1)) if top_match else DEFAULT_TOP_N
+    requested_years = _requested_years(user_question, parsed_data)
+
+    blocks = []
+    if rainfall:
+        blocks.append(_render_rainfall(rainfall, trend))
+    if seasonal:
+        blocks.append(_render_seasonal(seasonal))
+
+    state_extremes = []
+    for data in crops:
+        ranking = get_district_ranking(data)
+        if not ranking.keys():
+            blocks.append([f"**{data['state']}:** no crop production data for the requested filters"])
+            continue
+
+        years = {year for _, _, year in ranking.keys()}
+        if (trend and len(years) < 2) or (len(requested_years) > 1 and requested_years - years):
+            # Fewer years than asked for (the planner fetches crops for the latest year only) -
+            # a template would pass one year off as the whole span, so let Gemini answer
+            return None
+
+        if data.get('crop') is None:
+            if metric != 'production' or trend:
+                # Yield or trends across every crop of a state - too open-ended for a template
+                return None
+            blocks.append(_render_top_crops(data, ranking, top_n))
+        elif 'district' in question_lower:
+            blocks.append(_render_district_extremes(data, ranking, metric, high, low))
+        elif intent == 'extreme':
+            # State-level extreme ("Punjab or Haryana?") - compared across states below
+            state_extremes.append((data, ranking))
+        else:
+            blocks.append(_render_crop_series(data, ranking, metric))
+
+    if state_extremes:
+        block = _render_state_extremes(state_extremes, metric, high, low)
+        if not block:
+            # A single state's best year and similar - left to Gemini
+            return None
+        blocks.append(block)
+
+    blocks = [block for block in blocks if block]
+    if not blocks:
+        return None
+    return "\n\n".join("\n".join(block) for block in blocks)
@@ -0,0 +1,215 @@
+# batch.py
+# Batch question mode - answer a JSONL file of questions in one run
+# All questions are parsed first, their data needs are merged into one
+# de-duplicated fetch plan that runs once, and every answer is then built
+# from the shared (cached) data. Gemini calls run concurrently under a
+# token bucket so the batch stays within the API's rate limits.
+#
+# Usage:
+#   python batch.py questions.jsonl answers.jsonl
+#
+# Input lines:  {"id": "q1", "question": "Compare rainfall in Punjab and Haryana for 2010-2014"}
+#               (or just a JSON string per line)
+# Output lines: {"id", "question", "success", "answer", "sources": [{purpose, url, records, dataset}], "error"}
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    ENABLE_CACHING, ENABLE_COMBINED_PARSE, BATCH_GEMINI_CONCURRENCY, BATCH_GEMINI_RATE_PER_SEC,
+    PLANNER_MAX_WORKERS
+)
+from data_fetcher import check_all_apis_failed
+from gemini_handler import (
+    check_if_agriculture_query, classify_and_parse_question, parse_user_question, validate_parsed_query,
+    determine_required_apis, generate_intelligent_answer, handle_general_query
+)
+from query_planner import build_query_plan, execute_plan, describe_plan
+from rate_limit import TokenBucket
+from logging_setup import get_logger, bind_context, request_id_var
+
+logger = get_logger(__name__)
+
+def read_questions(path):
+    """
+    Read a JSONL file of questions
+
+    Returns:
+        List of {'id', 'question'} dicts (ids default to the line number)
+    """
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {'question': item}
+            questions.append({'id': item.get('id', str(line_no)), 'question': item['question']})
+    return questions
+
+class BatchRunner:
+    """
+    Answers many questions while fetching shared data only once
+
+    Args:
+        concurrency: Parallel Gemini calls
+        rate_per_sec: Max Gemini calls per second across the batch
+    """
+
+    def __init__(self, concurrency=BATCH_GEMINI_CONCURRENCY, rate_per_sec=BATCH_GEMINI_RATE_PER_SEC):
+        self.concurrency = concurrency
+        self.gemini_bucket = TokenBucket(rate_per_sec, capacity=concurrency)
+
+    def _gemini(self, func, *args):
+        """Call a Gemini-backed function once a rate-limit token is available"""
+        self.gemini_bucket.acquire()
+        return func(*args)
+
+    def _parse(self, item):
+        request_id_var.set(item['id'])
+        question = item['question']
+
+        if ENABLE_COMBINED_PARSE:
+            parsed = self._gemini(classify_and_parse_question, question)
+            is_agriculture_query = parsed['is_agriculture_query']
+        else:
+            parsed = None
+            is_agriculture_query = check_if_agriculture_query(question)
+
+        if not is_agriculture_query:
+            if parsed and parsed.get('answer'):
+                return {'done': parsed}
+            return {'done': self._gemini(handle_general_query, question)}
+
+        if parsed is None:
+            parsed = self._gemini(parse_user_question, question)
+        if not parsed['success']:
+            return {'done': {'success': False, 'error': parsed.get('error', "Couldn't understand the question")}}
+
+        validation = validate_parsed_query(parsed)
+        if not validation['valid']:
+            error = validation['reason']
+            if validation.get('suggestions'):
+                error += f" {validation['suggestions']}"
+            return {'done': {'success': False, 'error': error}}
+
+        return {'parsed': parsed, 'apis_needed': determine_required_apis(parsed)}
+
+    def _answer(self, item, state):
+        request_id_var.set(item['id'])
+        if 'done' in state:
+            return state['done'], []
+
+        # Every fetch in this plan was already made by the shared plan, so this is served from cache
+        fetched_data, api_calls_made = execute_plan(build_query_plan(state['apis_needed']), parallel=False)
+
+        all_failed, network_issue = check_all_apis_failed(fetched_data)
+        if all_failed or not any(d.get('success') for d in fetched_data.values()):
+            error = 'Data servers unavailable' if network_issue else 'No data found matching the question'
+            return {'success': False, 'error': error}, api_calls_made
+
+        return self._gemini(generate_intelligent_answer, item['question'], state['parsed'], fetched_data), api_calls_made
+
+    # One failing question must not abort the batch
+    def _safe_parse(self, item):
+        try:
+            return self._parse(item)
+        except Exception as e:
+            logger.exception("❌ Parsing %s failed: %.200s", item['id'], e)
+            return {'done': {'success': False, 'error': f'Unexpected error: {str(e)[:200]}'}}
+
+    def _safe_answer(self, item, state):
+        try:
+            return self._answer(item, state)
+        except Exception as e:
+            logger.exception("❌ Answering %s failed: %.200s", item['id'], e)
+            return {'success': False, 'error': f'Unexpected error: {str(e)[:200]}'}, []
+
+    def _prefetch(self, apis_needed):
+        """Run every upstream fetch of the merged plan once, concurrently"""
+        plan = build_query_plan(apis_needed)
+        logger.info("🗺️ Shared batch plan: %s", describe_plan(plan))
+        network = [n for n in plan['nodes'].values() if n['dataset'] and not n['cached']]
+        with ThreadPoolExecutor(max_workers=PLANNER_MAX_WORKERS) as executor:
+            futures = [executor.submit(bind_context(n['func']), **n['kwargs']) for n in network]
+            for future in futures:
+                future.result()
+        return plan
+
+    def run(self, questions):
+        """
+        Answer a list of {'id', 'question'} items
+
+        Returns:
+            List of result dicts in input order
+        """
+        if not ENABLE_CACHING:
+            logger.warning("⚠️ Caching is disabled - each question will fetch its own data")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # Each task tags its log lines with the question id
+            states = list(executor.map(self._safe_parse, questions))
+
+            # One merged plan: identical requests across questions collapse onto one node
+            merged = [spec for state in states for spec in state.get('apis_needed', [])]
+            if merged:
+                plan = self._prefetch(merged)
+                logger.info("📦 %d questions share %d fetch(es)", len(questions), plan['estimate']['network_fetches'])
+
+            answers = list(executor.map(self._safe_answer, questions, states))
+
+        results = []
+        for item, (answer, api_calls_made) in zip(questions, answers):
+            results.append({
+                'id': item['id'],
+                'question': item['question'],
+                'success': bool(answer.get('success')),
+                'answer': answer.get('answer'),
+                'sources': api_calls_made,
+                'error': None if answer.get('success') else answer.get('error')
+            })
+
+        logger.info("✅ Batch of %d answered in %.1fs", len(questions), time.perf_counter() - start)
+        return results
+
+def answer_batch(questions):
+    """
+    Answer many questions in one run (programmatic entry point)
+
+    Args:
+        questions: List of question strings or {'id', 'question'} dicts
+
+    Returns:
+        List of result dicts (see module docstring) in input order
+    """
+    items = [{'id': str(i + 1), 'question': q} if isinstance(q, str) else q for i, q in enumerate(questions)]
+    return BatchRunner().run(items)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in one run")
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("output", help="JSONL file to write answers to ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = BatchRunner().run(read_questions(args.input))
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    answered = sum(1 for r in results if r['success'])
+    print(f"✅ {answered}/{len(results)} questions answered", file=sys.stderr)
+    return 0 if answered == len(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# cache_warmer.py
+# Background cache warming for popular queries
+# Keeps the data behind the sidebar examples, the most popular states and the
+# most requested (state, crop, year) combinations fresh, so users don't pay
+# the cold-fetch latency after every cache expiry
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    API_KEY, CACHE_WARM_INTERVAL, CACHE_WARM_REFRESH_MARGIN, CACHE_WARM_CONCURRENCY,
+    CACHE_WARM_RATE_PER_SEC, CACHE_WARM_TOP_REQUESTED, CACHE_WARM_STATES, ENABLE_DELTA_SYNC
+)
+from metadata import CROP_YEAR_MAX
+from data_fetcher import (
+    fetch_rainfall_annual_block, fetch_rainfall_monthly, fetch_crop_production, fetch_water_usage
+)
+from rate_limit import TokenBucket
+from response_cache import CACHED_FUNCTIONS
+from delta_sync import DeltaSync, SYNC_DATASETS
+from logging_setup import get_logger, bind_context, request_id_var
+
+logger = get_logger(__name__)
+
+# Fetches the sidebar example questions (metadata.EXAMPLE_QUESTIONS) end up making
+EXAMPLE_QUESTION_TARGETS = [
+    # Q1: Multi-State Comparison (rainfall for every state comes from one shared block)
+    (fetch_rainfall_annual_block, {}),
+    (fetch_crop_production, {'state_name': 'Punjab', 'crop_name': None, 'year': CROP_YEAR_MAX}),
+    (fetch_crop_production, {'state_name': 'Haryana', 'crop_name': None, 'year': CROP_YEAR_MAX}),
+    # Q2: District Extremes
+    (fetch_crop_production, {'state_name': 'Punjab', 'crop_name': 'Wheat', 'year': CROP_YEAR_MAX}),
+    (fetch_crop_production, {'state_name': 'Haryana', 'crop_name': 'Wheat', 'year': CROP_YEAR_MAX}),
+    # Q3: Trend Analysis
+    (fetch_crop_production, {'state_name': 'Punjab', 'crop_name': 'Rice', 'year': CROP_YEAR_MAX}),
+    # Q4: Policy Recommendation
+    (fetch_crop_production, {'state_name': 'Maharashtra', 'crop_name': 'Cotton', 'year': CROP_YEAR_MAX}),
+    (fetch_water_usage, {'crop_name': 'Cotton'}),
+    # Seasonal questions all share the monthly dataset
+    (fetch_rainfall_monthly, {}),
+]
+
+class CacheWarmer:
+    """
+    Periodically refreshes cache entries that are missing or about to expire
+
+    Args:
+        concurrency: Number of parallel upstream requests
+        rate_per_sec: Maximum upstream requests per second across all workers
+        interval: Seconds between warming passes
+        refresh_margin: Refresh entries expiring within this many seconds
+        top_requested: How many of the most requested queries to include
+    """
+
+    def __init__(self, concurrency=CACHE_WARM_CONCURRENCY, rate_per_sec=CACHE_WARM_RATE_PER_SEC,
+                 interval=CACHE_WARM_INTERVAL, refresh_margin=CACHE_WARM_REFRESH_MARGIN,
+                 top_requested=CACHE_WARM_TOP_REQUESTED):
+        self.concurrency = concurrency
+        self.interval = interval
+        self.refresh_margin = refresh_margin
+        self.top_requested = top_requested
+        self.rate_limiter = TokenBucket(rate_per_sec)
+        # Whole-dataset entries are renewed by delta sync (a metadata check) instead of a full refetch
+        self.delta_sync = DeltaSync() if ENABLE_DELTA_SYNC else None
+        self._synced = {}
+        if self.delta_sync:
+            for name, spec in SYNC_DATASETS.items():
+                if hasattr(spec['func'], 'cache'):
+                    self._synced[(spec['func'].__name__, spec['func'].cache_key(**spec['kwargs']))] = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    def collect_targets(self):
+        """
+        Build the de-duplicated list of (fetch_function, kwargs) to keep warm
+
+        Order matters: examples first, then popular states, then the most
+        requested queries seen so far.
+        """
+        targets = list(EXAMPLE_QUESTION_TARGETS)
+
+        for state in CACHE_WARM_STATES:
+            targets.append((fetch_crop_production, {'state_name': state, 'crop_name': None, 'year': CROP_YEAR_MAX}))
+
+        # Most requested queries across all cached fetch functions
+        popular = []
+        for func in CACHED_FUNCTIONS.values():
+            for call_args, count in func.cache.most_requested(self.top_requested):
+                popular.append((count, func, call_args))
+        popular.sort(key=lambda item: item[0], reverse=True)
+        targets.extend((func, call_args) for _, func, call_args in popular[:self.top_requested])
+
+        # De-duplicate on cache key
+        unique = []
+        seen = set()
+        for func, kwargs in targets:
+            if not hasattr(func, 'cache'):
+                continue  # Caching disabled
+            marker = (func.__name__, func.cache_key(**kwargs))
+            if marker not in seen:
+                seen.add(marker)
+                unique.append((func, kwargs))
+
+        return unique
+
+    def _needs_refresh(self, func, kwargs):
+        expires_in = func.expires_in(**kwargs)
+        return expires_in is None or expires_in < self.refresh_margin
+
+    def _warm(self, func, kwargs):
+        self.rate_limiter.acquire()
+        if self._stop.is_set():
+            return False
+        name = self._synced.get((func.__name__, func.cache_key(**kwargs)))
+        if name:
+            return self.delta_sync.sync(name)['success']
+        result = func.refresh(**kwargs)
+        return bool(result and result.get('success'))
+
+    def run_once(self):
+        """
+        Run a single warming pass
+
+        Returns:
+            Dictionary with counts of warmed, failed and skipped (still fresh) entries
+        """
+        targets = self.collect_targets()
+        due = [(func, kwargs) for func, kwargs in targets if self._needs_refresh(func, kwargs)]
+
+        summary = {'warmed': 0, 'failed': 0, 'skipped': len(targets) - len(due)}
+        if not due:
+            return summary
+
+        logger.info("🔥 Warming %d cache entries (%d still fresh)...", len(due), summary['skipped'])
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(bind_context(self._warm), func, kwargs) for func, kwargs in due]
+            for future in futures:
+                if future.result():
+                    summary['warmed'] += 1
+                else:
+                    summary['failed'] += 1
+
+        logger.info("✅ Cache warming done: %d warmed, %d failed", summary['warmed'], summary['failed'])
+        return summary
+
+    def _loop(self):
+        # Log lines from warming passes are tagged instead of carrying a request id
+        request_id_var.set('cache-warmer')
+        if self.delta_sync:
+            # Serve from the last snapshots right away; the first pass confirms they are current
+            loaded = self.delta_sync.load_into_cache()
+            if loaded:
+                logger.info("📂 Loaded snapshots into cache: %s", loaded)
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("⚠️ Cache warming pass failed: %.200s", e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start warming in a daemon thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+def start_cache_warmer():
+    """
+    Start the process-wide cache warmer once (safe to call on every Streamlit rerun)
+
+    Returns:
+        The running CacheWarmer, or None if there is no API key to warm with
+    """
+    global _warmer
+
+    if not API_KEY:
+        return None
+
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = CacheWarmer()
+            _warmer.start()
+        return _warmer
@@ -0,0 +1,84 @@
+# circuit_breaker.py
+# Per-dataset circuit breakers for data.gov.in
+# After CIRCUIT_FAILURE_THRESHOLD consecutive failed calls a dataset's circuit
+# opens: requests fail immediately (and the response cache serves stale data,
+# see response_cache.py) instead of every user waiting through the full
+# timeout/retry budget. After CIRCUIT_RESET_TIMEOUT one trial request is let
+# through; success closes the circuit, failure keeps it open for another round.
+
+import threading
+import time
+
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+from logging_setup import get_logger
+from metrics import UPSTREAM_CIRCUIT_OPENS
+
+logger = get_logger(__name__)
+
+class CircuitBreaker:
+    """
+    Closed -> open after repeated failures -> half-open trial -> closed
+
+    Args:
+        name: Dataset label (for logs and metrics)
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds before an open circuit allows a trial request
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial_running or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        """True if a request may go upstream now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial_running and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial_running = True
+                logger.info("🔌 %s circuit half-open, sending a trial request", self.name)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("🔌 %s circuit closed - upstream is back", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    UPSTREAM_CIRCUIT_OPENS.inc(dataset=self.name)
+                    logger.warning("🔌 %s circuit open after %d failed calls - failing fast for %ds",
+                                   self.name, self._failures, self.reset_timeout)
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(dataset):
+    with _breakers_lock:
+        breaker = _breakers.get(dataset)
+        if breaker is None:
+            breaker = _breakers[dataset] = CircuitBreaker(dataset)
+        return breaker
@@ -16,19 +16,23 @@ try:
     API_KEY = st.secrets.get("API_KEY", os.environ.get("API_KEY", ""))
     GEMINI_KEY = st.secrets.get("GEMINI_KEY", os.environ.get("GEMINI_KEY", ""))
     
-except ImportError:
-    # Running locally without Streamlit (for testing)
+except (ImportError, FileNotFoundError):
+    # Running locally without Streamlit or without a secrets file (testing, CI)
     API_KEY = os.environ.get("API_KEY", "")
     GEMINI_KEY = os.environ.get("GEMINI_KEY", "")
 
-# Validation check
-if not API_KEY or API_KEY == "":
-    import warnings
-    warnings.warn("⚠️ API_KEY not set! Add it to .streamlit/secrets.toml for local dev or Streamlit Cloud secrets for deployment")
-
-if not GEMINI_KEY or GEMINI_KEY == "":
+def check_api_keys():
+    """
+    Warn about missing API keys (called once at app startup, not on import)
+    
+    Returns:
+        List of missing key names
+    """
     import warnings
-    warnings.warn("⚠️ GEMINI_KEY not set! Add it to .streamlit/secrets.toml for local dev or Streamlit Cloud secrets for deployment")
+    missing = [name for name, value in (("API_KEY", API_KEY), ("GEMINI_KEY", GEMINI_KEY)) if not value]
+    for name in missing:
+        warnings.warn(f"⚠️ {name} not set! Add it to .streamlit/secrets.toml for local dev or Streamlit Cloud secrets for deployment")
+    return missing
 
 # ============================================================================
 # DATA.GOV.IN API ENDPOINTS
@@ -47,6 +51,113 @@ API_TIMEOUT = 30
 API_RETRY_ATTEMPTS = 3
 API_RETRY_DELAY = 2
 CACHE_TTL = 86400  # 24 hours
+CACHE_MAX_ENTRIES = 2000           # Responses kept per cached fetch function (least recently used dropped)
+CACHE_MAX_TRACKED_REQUESTS = 5000  # Distinct queries whose request counts are kept for the warmer
+RAINFALL_MONTHLY_PAGE_SIZE = 1000  # Monthly dataset is paged in whole (~4,100 records)
+
+# Adaptive timeouts and hedged requests (see hedging.py)
+LATENCY_WINDOW = 100               # Recent requests per dataset used for latency statistics
+LATENCY_MIN_SAMPLES = 10           # Use API_TIMEOUT and no hedging until this many samples exist
+HEDGE_PERCENTILE = 0.95            # Send a duplicate once a request is slower than this quantile
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0  # Timeout = p99 x this, clamped to [ADAPTIVE_TIMEOUT_MIN, API_TIMEOUT]
+ADAPTIVE_TIMEOUT_MIN = 10
+HEDGE_RATE_PER_SEC = 0.5           # Process-wide cap on duplicate requests
+HEDGE_BURST = 3
+HEDGE_MAX_WORKERS = 16             # Threads running upstream requests (primaries + hedges)
+
+# Degraded serving while data.gov.in is down (see circuit_breaker.py, response_cache.py)
+CIRCUIT_FAILURE_THRESHOLD = 3      # Consecutive failed calls to a dataset before its circuit opens
+CIRCUIT_RESET_TIMEOUT = 60         # Seconds an open circuit fails fast before one trial request
+CACHE_STALE_MAX_AGE = 30 * 86400   # Oldest cached/snapshot data served (marked stale) when upstream fails
+
+# ============================================================================
+# CACHE WARMING (background refresh before entries expire)
+# ============================================================================
+
+CACHE_WARM_INTERVAL = 900          # Seconds between warming passes (15 min)
+CACHE_WARM_REFRESH_MARGIN = 3600   # Refresh entries expiring within 1 hour
+CACHE_WARM_CONCURRENCY = 2         # Parallel upstream requests while warming
+CACHE_WARM_RATE_PER_SEC = 0.5      # Max upstream requests per second (be polite to data.gov.in)
+CACHE_WARM_TOP_REQUESTED = 10      # How many of the most requested queries to keep warm
+CACHE_WARM_STATES = ["Punjab", "Haryana", "Uttar Pradesh", "Maharashtra", "Karnataka"]
+
+# ============================================================================
+# DELTA SYNC (whole-dataset snapshots kept current via data.gov.in metadata)
+# ============================================================================
+
+SNAPSHOT_DIR = "data_snapshots"                          # Local JSON snapshots, one per dataset
+SYNC_STATE_PATH = "data_snapshots/sync_state.json"       # updated/total/page hashes per dataset
+SYNC_FULL_VERIFY_INTERVAL = 7 * 86400                    # Compare every page hash weekly (else append-only)
+
+# ============================================================================
+# STATE RAINFALL AGGREGATION
+# ============================================================================
+
+RAINFALL_STATE_WEIGHTING = "area"  # "area" (STATE_SUBDIVISION_AREA_KM2 in metadata.py) or "equal"
+
+# ============================================================================
+# GENERAL ANSWER CACHE (off-topic / small-talk questions)
+# ============================================================================
+
+GENERAL_CACHE_TTL = 7 * 86400       # Learned answers expire after a week (seed answers never do)
+GENERAL_CACHE_MAX_ENTRIES = 2000    # Learned answers kept in memory (LRU)
+GENERAL_CACHE_SIMILARITY = 0.85     # TF-IDF cosine needed to reuse a near-repeat's answer
+GENERAL_CACHE_PATH = None           # e.g. "general_answers.jsonl" to keep learned answers across restarts
+
+# ============================================================================
+# INTENT ROUTING (data question vs general question, see intent_classifier.py)
+# ============================================================================
+
+INTENT_MODEL_PATH = "intent_model.json"  # Trained by scripts/train_intent_classifier.py (keyword rules if missing)
+INTENT_LOG_PATH = None                    # e.g. "intent_labels.jsonl" to log Gemini's labels as training data
+INTENT_THRESHOLD = 0.5                    # Model probability above which a question is routed as a data query
+
+# ============================================================================
+# QUERY PLANNER
+# ============================================================================
+
+# Rough cost of one uncached fetch per dataset (seconds, upstream requests),
+# used to estimate a plan's cost before running it
+DATASET_COST_ESTIMATES = {
+    'rainfall': {'latency': 8.0, 'requests': 1},
+    'rainfall_monthly': {'latency': 20.0, 'requests': 5},
+    'crops': {'latency': 5.0, 'requests': 1},
+    'water': {'latency': 3.0, 'requests': 1},
+}
+PLANNER_MAX_WORKERS = 4  # Max concurrent fetches within one plan stage
+PREFETCH_MAX_WORKERS = 4  # Threads for speculative fetches started while Gemini parses
+PREFETCH_MAX_FETCHES = 6  # Cap on speculative upstream fetches per question
+
+# ============================================================================
+# METRICS (Prometheus text format, see metrics.py)
+# ============================================================================
+
+METRICS_PORT = 9108          # Local scrape endpoint (http://127.0.0.1:9108/metrics), None to disable
+METRICS_HOST = "127.0.0.1"   # Bind address for the endpoint (local only)
+METRICS_FILE = None          # e.g. "/tmp/samarth.prom" to also write metrics to a file
+METRICS_FILE_INTERVAL = 60   # Seconds between metrics file writes
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# ============================================================================
+# BATCH MODE (batch.py)
+# ============================================================================
+
+BATCH_GEMINI_CONCURRENCY = 4    # Parallel Gemini calls while answering a batch
+BATCH_GEMINI_RATE_PER_SEC = 0.5 # Max Gemini calls per second across the batch
+
+# ============================================================================
+# ADMISSION CONTROL (admission.py)
+# ============================================================================
+
+SESSION_RATE_PER_MIN = 6        # Sustained questions per minute per browser session
+SESSION_BURST = 3               # Questions a session may ask back to back
+IP_RATE_PER_MIN = 20            # Sustained questions per minute per client IP (all its sessions)
+IP_BURST = 10
+PIPELINE_MAX_CONCURRENT = 4     # Questions answered at once across all sessions
+ADMISSION_MAX_QUEUE = 16        # Questions waiting for a slot before new ones are shed
+ADMISSION_QUEUE_TIMEOUT = 20    # Seconds a question waits for a slot before it is shed
+ADMISSION_MAX_TRACKED = 10000   # Sessions/IPs whose rate buckets are kept (LRU)
+SESSION_QUOTA_WINDOW = 86400    # Seconds a session's MAX_QUESTIONS_PER_SESSION count lasts (never evicted before)
 
 # ============================================================================
 # GEMINI CONFIGURATION
@@ -55,13 +166,35 @@ CACHE_TTL = 86400  # 24 hours
 GEMINI_MODEL = "gemini-2.5-flash"
 GEMINI_MAX_ATTEMPTS = 20
 GEMINI_INITIAL_DELAY = 2
+GEMINI_PARSER_CONTEXT_CACHE = False  # Also keep the parser instructions in an explicit Gemini context cache
+                                     # (only worth it once they pass the model's minimum cacheable size)
+GEMINI_CONTEXT_CACHE_TTL = 3600      # Seconds a context cache lives before it is recreated
+
+# ============================================================================
+# GEMINI USAGE LEDGER (tokens, latency and retries per call, see usage_ledger.py)
+# ============================================================================
+
+# Prompt tokens one call of each pipeline stage should need - larger prompts are flagged
+GEMINI_PROMPT_BUDGETS = {
+    'classify_parse': 800,   # Combined classify + parse (instructions + schema)
+    'parse': 600,
+    'answer': 1500,          # Grows with the data summary
+    'general': 300,
+    'polish': 600,
+}
+GEMINI_SESSION_TOKEN_BUDGET = 50000  # Prompt + output tokens per session before it is flagged
+USAGE_LEDGER_HOURS = 48              # Hourly buckets kept in memory
+USAGE_LEDGER_MAX_SESSIONS = 10000    # Per-session totals kept in memory (LRU)
+USAGE_LOG_PATH = None                # e.g. "gemini_usage.jsonl" to log every call (python usage_ledger.py FILE summarizes it)
 
 # ============================================================================
 # APPLICATION SETTINGS
 # ============================================================================
 
-MAX_CONVERSATIONS = 20
+MAX_CONVERSATIONS = 10
 MAX_MESSAGES_PER_CONV = 20
+HISTORY_PAGE_SIZE = 6  # Messages rendered per page of chat history (older ones load on demand)
+CONVERSATION_DB_PATH = None  # e.g. "conversations.db" to mirror chat history to SQLite
 MAX_QUESTIONS_PER_SESSION = 100
 RATE_LIMIT_WARNING_THRESHOLD = 80
 
@@ -72,6 +205,19 @@ RATE_LIMIT_WARNING_THRESHOLD = 80
 ENABLE_CACHING = True
 ENABLE_DEBUG_MODE = False
 SHOW_API_URLS = True
-ENABLE_PARALLEL_FETCHING = False
+ENABLE_PARALLEL_FETCHING = True
+ENABLE_CACHE_WARMING = True
+ENABLE_DELTA_SYNC = True  # Warmer renews whole-dataset entries with a metadata check instead of a refetch
+ENABLE_MMAP_STORE = True  # Serve synced datasets from memory-mapped files shared by all processes
+ENABLE_SPECULATIVE_PREFETCH = True  # Start likely fetches while the question is being parsed
+ENABLE_COMBINED_PARSE = True  # One structured Gemini call classifies + parses each question
+ENABLE_HEDGED_REQUESTS = True  # Duplicate requests that run past the p95 latency
+ENABLE_METRICS = True  # Expose counters/histograms via METRICS_PORT / METRICS_FILE
+ENABLE_GENERAL_CACHE = True  # Serve repeat / near-repeat off-topic questions without Gemini
+ENABLE_TEMPLATE_ANSWERS = True  # Render purely numeric answers locally instead of calling Gemini
+ENABLE_TEMPLATE_POLISH = False  # Let Gemini rephrase template answers (costs a call, keeps the numbers)
+ENABLE_PARSER_SYSTEM_INSTRUCTION = True  # Send the static parser preamble as a system instruction (per call: just the question)
+ENABLE_STALE_FALLBACK = True  # Serve expired cache entries / local snapshots (labelled with their date) when data.gov.in fails
+ENABLE_ADMISSION_CONTROL = True  # Per-session/IP rate limits, session quota and a fair queue in front of the pipeline
 
 
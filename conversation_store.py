@@ -0,0 +1,186 @@
+# conversation_store.py
+# Compact, bounded per-session conversation store
+# Messages are __slots__ records with interned roles/timestamps kept in
+# fixed-size deques, so a session's memory is bounded without forcing full
+# garbage collections. Optionally mirrored to a local SQLite database.
+
+import datetime
+import json
+import sqlite3
+import sys
+import threading
+from collections import deque
+
+from config import MAX_CONVERSATIONS, MAX_MESSAGES_PER_CONV, CONVERSATION_DB_PATH
+
+class Message:
+    """
+    One chat message (role and timestamp strings are interned and shared)
+
+    `seq` is unique within the store and stable across reruns (used for widget
+    keys); `sources_html` caches the rendered Data Sources card (ui_render.py).
+    """
+
+    __slots__ = ('seq', 'role', 'content', 'timestamp', 'api_calls', 'sources_html')
+
+    def __init__(self, seq, role, content, timestamp, api_calls=None):
+        self.seq = seq
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = sys.intern(timestamp)
+        self.api_calls = tuple(api_calls) if api_calls else ()
+        self.sources_html = None
+
+class Conversation:
+    """A conversation holding at most `max_messages` messages (oldest dropped first)"""
+
+    __slots__ = ('id', 'title', 'created', 'messages')
+
+    def __init__(self, conv_id, title, created, max_messages):
+        self.id = conv_id
+        self.title = title
+        self.created = sys.intern(created)
+        self.messages = deque(maxlen=max_messages)
+
+_db_connections = {}
+_db_lock = threading.Lock()
+
+def _get_db(path):
+    """One shared SQLite connection per database file per process"""
+    with _db_lock:
+        conn = _db_connections.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    session_id TEXT, conv_id INTEGER, title TEXT, created TEXT,
+                    PRIMARY KEY (session_id, conv_id)
+                );
+                CREATE TABLE IF NOT EXISTS messages (
+                    session_id TEXT, conv_id INTEGER, role TEXT, content TEXT,
+                    timestamp TEXT, api_calls TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages (session_id, conv_id);
+            """)
+            _db_connections[path] = conn
+        return conn
+
+class ConversationStore:
+    """
+    Bounded conversation history for one session
+
+    Args:
+        max_conversations: Oldest conversations are dropped beyond this many
+        max_messages: Oldest messages are dropped beyond this many per conversation
+        db_path: Optional SQLite file to mirror every write to (None = memory only)
+        session_id: Key for this session's rows in the database
+    """
+
+    def __init__(self, max_conversations=MAX_CONVERSATIONS, max_messages=MAX_MESSAGES_PER_CONV,
+                 db_path=CONVERSATION_DB_PATH, session_id=None):
+        self.max_messages = max_messages
+        self.conversations = deque(maxlen=max_conversations)
+        self.db_path = db_path
+        self.session_id = session_id
+        self._next_id = 0
+        self._next_seq = 0
+
+        if db_path and session_id:
+            self._load()
+
+    def _load(self):
+        """Reload this session's most recent conversations from SQLite"""
+        conn = _get_db(self.db_path)
+        with _db_lock:
+            convs = conn.execute(
+                "SELECT conv_id, title, created FROM conversations WHERE session_id = ? "
+                "ORDER BY conv_id DESC LIMIT ?", (self.session_id, self.conversations.maxlen)
+            ).fetchall()
+            for conv_id, title, created in reversed(convs):
+                conv = Conversation(conv_id, title, created, self.max_messages)
+                rows = conn.execute(
+                    "SELECT role, content, timestamp, api_calls FROM messages "
+                    "WHERE session_id = ? AND conv_id = ? ORDER BY rowid DESC LIMIT ?",
+                    (self.session_id, conv_id, self.max_messages)
+                ).fetchall()
+                for role, content, timestamp, api_calls in reversed(rows):
+                    conv.messages.append(Message(self._next_seq, role, content, timestamp,
+                                                 json.loads(api_calls or '[]')))
+                    self._next_seq += 1
+                self.conversations.append(conv)
+                self._next_id = max(self._next_id, conv_id + 1)
+
+    def _persist(self, sql, params):
+        if not (self.db_path and self.session_id):
+            return
+        conn = _get_db(self.db_path)
+        with _db_lock:
+            conn.execute(sql, params)
+            conn.commit()
+
+    def get(self, conv_id):
+        """Return the Conversation with this id, or None if unknown or dropped"""
+        if conv_id is None:
+            return None
+        for conv in self.conversations:
+            if conv.id == conv_id:
+                return conv
+        return None
+
+    def messages(self, conv_id):
+        conv = self.get(conv_id)
+        return list(conv.messages) if conv else []
+
+    def recent(self, n):
+        """The n most recent conversations, newest first"""
+        return list(reversed(self.conversations))[:n]
+
+    def new_conversation(self, title='New Chat'):
+        conv = Conversation(self._next_id, title,
+                            datetime.datetime.now().strftime("%Y-%m-%d %H:%M"), self.max_messages)
+        self._next_id += 1
+        self.conversations.append(conv)
+        self._persist("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?)",
+                      (self.session_id, conv.id, conv.title, conv.created))
+        return conv
+
+    def add_message(self, conv_id, role, content, api_calls=None):
+        """
+        Append a message, creating a conversation if conv_id is unknown
+
+        Returns:
+            The id of the conversation the message was added to
+        """
+        conv = self.get(conv_id)
+        if conv is None:
+            conv = self.new_conversation()
+
+        message = Message(self._next_seq, role, content, datetime.datetime.now().strftime("%H:%M"), api_calls)
+        self._next_seq += 1
+        conv.messages.append(message)
+
+        if role == 'user' and len(conv.messages) == 1:
+            conv.title = content[:40] + "..." if len(content) > 40 else content
+            self._persist("UPDATE conversations SET title = ? WHERE session_id = ? AND conv_id = ?",
+                          (conv.title, self.session_id, conv.id))
+
+        self._persist("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+                      (self.session_id, conv.id, message.role, message.content, message.timestamp,
+                       json.dumps(list(message.api_calls))))
+        return conv.id
+
+    def memory_usage(self):
+        """
+        Approximate bytes held by this store (records, strings and source lists;
+        interned role/timestamp strings are shared and not counted)
+        """
+        total = sys.getsizeof(self.conversations)
+        for conv in self.conversations:
+            total += sys.getsizeof(conv) + sys.getsizeof(conv.title) + sys.getsizeof(conv.messages)
+            for msg in conv.messages:
+                total += sys.getsizeof(msg) + sys.getsizeof(msg.content) + sys.getsizeof(msg.api_calls)
+                if msg.sources_html:
+                    total += sys.getsizeof(msg.sources_html)
+                for call in msg.api_calls:
+                    total += sys.getsizeof(call) + sum(sys.getsizeof(v) for v in call.values())
+        return total
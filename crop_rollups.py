@@ -0,0 +1,187 @@
+# crop_rollups.py
+# Precomputed district rankings for "highest/lowest district" questions
+# Crop records are rolled up once per fetched response: production and area
+# are summed per district over seasons (the upstream has one row per district,
+# crop, year and season) and yield is derived as production / area. Districts
+# are then sorted per (crop, state, year) - and per season - for each metric.
+# Top-k / bottom-k are slices of the sorted arrays, so extremes are exact and
+# computed locally instead of being picked out of a prompt by Gemini.
+
+import threading
+from collections import OrderedDict
+
+ALL_SEASONS = None    # Season key for totals over every season
+METRICS = ('production', 'area', 'yield')
+MAX_CACHED_RANKINGS = 64
+
+def _number(value):
+    """float, or None for missing/NA/non-numeric values"""
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return None
+    return number if number == number else None  # NaN
+
+def _clean(value):
+    # Upstream pads names, e.g. "Kharif     "
+    return str(value).strip().title() if value is not None else ''
+
+class DistrictRanking:
+    """
+    Districts sorted by production, area and yield per (crop, state, year, season)
+
+    Yield is production / area (tonnes per hectare) over the rows where both
+    are known and area is positive, so NA or zero area never produces an
+    infinite or misleading yield - the district is just left out of the
+    yield ranking.
+
+    Args:
+        records: Crop production records (state_name, district_name, crop,
+                 crop_year, season, production_, area_); rows without a
+                 numeric year are skipped
+    """
+
+    def __init__(self, records):
+        # key -> district -> [production, area, production with area, area with production]
+        sums = {}
+        for r in records:
+            try:
+                year = int(float(r.get('crop_year')))
+            except (ValueError, TypeError):
+                continue
+            production, area = _number(r.get('production_')), _number(r.get('area_'))
+            if production is None and area is None:
+                continue
+
+            crop, state = _clean(r.get('crop')), _clean(r.get('state_name'))
+            district, season = _clean(r.get('district_name')), _clean(r.get('season'))
+
+            # Each row counts towards the all-season total and its own season
+            keys = [(crop, state, year, ALL_SEASONS)]
+            if season:
+                keys.append((crop, state, year, season))
+            for key in keys:
+                acc = sums.setdefault(key, {}).setdefault(district, [0.0, 0.0, 0.0, 0.0])
+                if production is not None:
+                    acc[0] += production
+                if area is not None:
+                    acc[1] += area
+                if production is not None and area is not None and area > 0:
+                    acc[2] += production
+                    acc[3] += area
+
+        # metric -> key -> (districts, values), both sorted by value descending
+        self._ranked = {metric: {} for metric in METRICS}
+        # key -> {metric: state-level value}
+        self._totals = {}
+        for key, districts in sums.items():
+            values = {
+                'production': {d: acc[0] for d, acc in districts.items()},
+                'area': {d: acc[1] for d, acc in districts.items()},
+                'yield': {d: acc[2] / acc[3] for d, acc in districts.items() if acc[3] > 0}
+            }
+            for metric, by_district in values.items():
+                if by_district:
+                    ordered = sorted(by_district.items(), key=lambda item: (-item[1], item[0]))
+                    self._ranked[metric][key] = (tuple(d for d, _ in ordered), tuple(v for _, v in ordered))
+
+            yield_production = sum(acc[2] for acc in districts.values())
+            yield_area = sum(acc[3] for acc in districts.values())
+            self._totals[key] = {
+                'production': sum(values['production'].values()),
+                'area': sum(values['area'].values()),
+                # State yield is total production over total area, not a mean of district yields
+                'yield': yield_production / yield_area if yield_area > 0 else None
+            }
+
+    def keys(self, crop=None, state=None):
+        """All-season (crop, state, year) keys present, optionally filtered"""
+        return sorted((c, s, y) for c, s, y, season in self._totals
+                      if season is ALL_SEASONS
+                      and (crop is None or c == _clean(crop)) and (state is None or s == _clean(state)))
+
+    def _key(self, crop, state, year, season):
+        return (_clean(crop), _clean(state), int(year), _clean(season) or ALL_SEASONS)
+
+    def top(self, crop, state, year, k=1, season=ALL_SEASONS, metric='production'):
+        """
+        Highest districts by a metric ('production', 'area' or 'yield')
+
+        Returns:
+            List of (district, value) pairs, highest first ([] if no data)
+        """
+        ranked = self._ranked[metric].get(self._key(crop, state, year, season))
+        if ranked is None:
+            return []
+        districts, values = ranked
+        return list(zip(districts[:k], values[:k]))
+
+    def bottom(self, crop, state, year, k=1, season=ALL_SEASONS, metric='production'):
+        """
+        Lowest districts by a metric ('production', 'area' or 'yield')
+
+        Returns:
+            List of (district, value) pairs, lowest first ([] if no data)
+        """
+        ranked = self._ranked[metric].get(self._key(crop, state, year, season))
+        if ranked is None:
+            return []
+        districts, values = ranked
+        n = len(districts)
+        return [(districts[i], values[i]) for i in range(n - 1, max(n - k, 0) - 1, -1)]
+
+    def total(self, crop, state, year, season=ALL_SEASONS, metric='production'):
+        """
+        State-level value: summed production/area, or production/area for yield
+
+        Returns:
+            float, 0.0 for production/area without data, None for yield without area
+        """
+        totals = self._totals.get(self._key(crop, state, year, season))
+        if totals is None:
+            return None if metric == 'yield' else 0.0
+        return totals[metric]
+
+    def trend(self, crop, state, metric='production', season=ALL_SEASONS):
+        """
+        State-level values by year
+
+        Returns:
+            List of (year, value) pairs in year order (years without a value are skipped)
+        """
+        crop, state, season = _clean(crop), _clean(state), _clean(season) or ALL_SEASONS
+        series = [(y, totals[metric]) for (c, s, y, se), totals in self._totals.items()
+                  if c == crop and s == state and se == season and totals[metric] is not None]
+        return sorted(series)
+
+    def district_count(self, crop, state, year, season=ALL_SEASONS, metric='production'):
+        ranked = self._ranked[metric].get(self._key(crop, state, year, season))
+        return len(ranked[0]) if ranked else 0
+
+# Rankings are built once per fetched response object (responses are
+# shared through the response cache, so repeat questions reuse them)
+_rankings = OrderedDict()
+_rankings_lock = threading.Lock()
+
+def get_district_ranking(crop_data):
+    """
+    Ranking for a fetch_crop_production() result, built on first use
+
+    Args:
+        crop_data: Successful crop production response
+    """
+    key = id(crop_data)
+    with _rankings_lock:
+        cached = _rankings.get(key)
+        if cached is not None and cached[0] is crop_data:
+            _rankings.move_to_end(key)
+            return cached[1]
+
+    ranking = DistrictRanking(crop_data.get('records', []))
+    with _rankings_lock:
+        # Keep a reference to the response so its id cannot be reused while cached
+        _rankings[key] = (crop_data, ranking)
+        _rankings.move_to_end(key)
+        while len(_rankings) > MAX_CACHED_RANKINGS:
+            _rankings.popitem(last=False)
+    return ranking
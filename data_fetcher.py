@@ -2,75 +2,94 @@
 # This file handles all API calls to fetch data
 # PRODUCTION VERSION with improved error handling and timeouts
 
+import logging
 import requests
 import time
-import random
 
-# Try to import streamlit, use dummy cache if not available
-try:
-    import streamlit as st
-    cache_decorator = st.cache_data(ttl=86400)  # 24 hours cache
-except:
-    # Dummy decorator for testing without Streamlit
+from config import *
+from metadata import get_subdivisions_for_state, get_subdivision_weights
+from response_cache import ttl_cache, staleness, UPSTREAM_ERRORS
+from logging_setup import get_logger
+from metrics import UPSTREAM_REQUESTS, UPSTREAM_BYTES, UPSTREAM_LATENCY
+from hedging import hedged_call
+from circuit_breaker import get_circuit_breaker
+from json_decode import decode_response, RAINFALL_ANNUAL_FIELDS, RAINFALL_MONTHLY_FIELDS, CROP_FIELDS
+
+logger = get_logger(__name__)
+
+# Process-wide TTL cache (24 hours) shared by all sessions.
+# Unlike st.cache_data it only keeps successful responses and can be
+# refreshed in the background by cache_warmer.py before entries expire.
+if ENABLE_CACHING:
+    cache_decorator = ttl_cache(ttl=CACHE_TTL)
+else:
+    # No caching - every call goes upstream
     def cache_decorator(func):
         return func
 
-from config import *
-from metadata import get_subdivision_for_state
-
-def retry_request(func, max_attempts=3, initial_delay=2):
+def retry_request(func, max_attempts=3, initial_delay=2, dataset='unknown'):
     """
-    Retry a function with exponential backoff and jitter
+    Call an upstream request with adaptive timeouts, hedging and retries
+    (see hedging.py), failing fast while the dataset's circuit is open
+    (see circuit_breaker.py)
     
     Args:
-        func: Function to retry
-        max_attempts: Maximum number of attempts (default 3)
-        initial_delay: Initial delay in seconds (default 2)
+        func: Function taking a timeout in seconds and making one request
+        max_attempts: Maximum number of attempts, hedges included (default 3)
+        initial_delay: Initial backoff delay in seconds (default 2)
+        dataset: Label for latency statistics and metrics (rainfall, rainfall_monthly, crops, water)
     
     Returns:
         Result of function or None if all attempts fail
     """
-    for attempt in range(max_attempts):
+    def attempt(timeout):
+        start = time.perf_counter()
         try:
-            result = func()
-            return result
+            result = func(timeout)
         except requests.exceptions.Timeout:
-            if attempt < max_attempts - 1:
-                # Exponential backoff with jitter: 2s, 4s, 8s (+ random 0-1s)
-                delay = min(initial_delay * (2 ** attempt) + random.uniform(0, 1), 15)
-                print(f"⏱️ Request timeout, retrying in {delay:.1f}s... (Attempt {attempt + 1}/{max_attempts})")
-                time.sleep(delay)
-            else:
-                print(f"❌ All {max_attempts} attempts failed due to timeout")
-                return None
-        except requests.exceptions.RequestException as e:
-            if attempt < max_attempts - 1:
-                delay = min(initial_delay * (2 ** attempt) + random.uniform(0, 1), 15)
-                print(f"⚠️ Request failed: {str(e)[:100]}, retrying in {delay:.1f}s... (Attempt {attempt + 1}/{max_attempts})")
-                time.sleep(delay)
-            else:
-                print(f"❌ All {max_attempts} attempts failed: {str(e)[:100]}")
-                return None
-    return None
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, dataset=dataset)
+            UPSTREAM_REQUESTS.inc(dataset=dataset, outcome='timeout')
+            raise
+        except requests.exceptions.RequestException:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, dataset=dataset)
+            UPSTREAM_REQUESTS.inc(dataset=dataset, outcome='error')
+            raise
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, dataset=dataset)
+        UPSTREAM_REQUESTS.inc(dataset=dataset, outcome='success')
+        content = getattr(result, 'content', None)
+        if content is not None:
+            UPSTREAM_BYTES.inc(len(content), dataset=dataset)
+        return result
+    
+    breaker = get_circuit_breaker(dataset)
+    if not breaker.allow():
+        UPSTREAM_REQUESTS.inc(dataset=dataset, outcome='circuit_open')
+        logger.warning("🔌 %s circuit open - skipping upstream request", dataset)
+        return None
+    
+    result = hedged_call(attempt, dataset=dataset, max_attempts=max_attempts, initial_delay=initial_delay)
+    if result is None:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return result
+
+def _is_usable_rainfall_record(record):
+    return bool(record.get('sd_name') or record.get('subdivision')) and record.get('year') not in (None, '')
 
 # Cache decorator to store API responses (24 hour expiry)
 @cache_decorator
-def fetch_rainfall_annual(state_name, years):
+def fetch_rainfall_annual_block():
     """
-    Fetch annual rainfall data for a state
+    Fetch the block of recent annual rainfall records (all subdivisions)
     
-    Args:
-        state_name: Name of the state (e.g., "Punjab")
-        years: List of years (e.g., [2010, 2011, 2012])
+    The upstream request is identical for every state, so it is made once,
+    cached, and shared by every fetch_rainfall_annual call.
     
     Returns:
-        Dictionary with rainfall data and metadata
+        Dictionary with raw rainfall records and metadata
     """
-    print(f"🌧️ Fetching rainfall data for {state_name}...")
-    
-    # Get the subdivision name for this state
-    subdivision = get_subdivision_for_state(state_name)
-    print(f"   Mapped to subdivision: {subdivision}")
+    logger.info("🌧️ Fetching annual rainfall block...")
     
     url = f"{RAINFALL_ANNUAL_API}"
     params = {
@@ -80,14 +99,15 @@ def fetch_rainfall_annual(state_name, years):
         'limit': 500     # Fetch enough to cover 2000-2017
     }
     
-    def make_request():
-        # Reduced timeout from 60s to 30s for better UX
-        response = requests.get(url, params=params, timeout=API_TIMEOUT)
+    def make_request(timeout=API_TIMEOUT):
+        # Timeout adapts to observed latency (at most API_TIMEOUT = 30s)
+        response = requests.get(url, params=params, timeout=timeout)
         response.raise_for_status()
         return response
     
     try:
-        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY)
+        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY,
+                                 dataset='rainfall')
         
         if response is None:
             return {
@@ -98,42 +118,23 @@ def fetch_rainfall_annual(state_name, years):
             }
         
         if response.status_code == 200:
-            data = response.json()
+            # Only the fields we read; rows without a subdivision or year can never match
+            data = decode_response(response.content, RAINFALL_ANNUAL_FIELDS, keep=_is_usable_rainfall_record)
             records = data.get('records', [])
             
-            print(f"   ✅ Fetched {len(records)} total records")
+            logger.info("✅ Fetched %d total records", len(records))
             
             # Debug: Show year range
-            if records:
+            if records and logger.isEnabledFor(logging.DEBUG):
                 years_in_data = [int(float(r.get('year', 0))) for r in records if r.get('year')]
                 if years_in_data:
-                    print(f"   📅 Year range: {min(years_in_data)}-{max(years_in_data)}")
-            
-            # Filter for our subdivision and years
-            filtered_records = []
-            for r in records:
-                record_subdivision = r.get('sd_name', '')
-                record_year_str = r.get('year', '0')
-                
-                try:
-                    record_year = int(float(record_year_str))
-                except (ValueError, TypeError):
-                    continue
-                
-                # Match subdivision (case-insensitive) and year
-                if record_subdivision.upper() == subdivision.upper() and record_year in years:
-                    filtered_records.append(r)
-            
-            print(f"   ✅ Matched {len(filtered_records)} records for {subdivision} ({years})")
+                    logger.debug("📅 Year range: %d-%d", min(years_in_data), max(years_in_data))
             
             return {
                 'success': True,
-                'subdivision': subdivision,
-                'state': state_name,
-                'records': filtered_records,
+                'records': records,
                 'api_url': response.url,
-                'total_fetched': len(records),
-                'total_matched': len(filtered_records)
+                'total_fetched': len(records)
             }
         else:
             return {
@@ -145,7 +146,7 @@ def fetch_rainfall_annual(state_name, years):
             
     except Exception as e:
         error_str = str(e)
-        print(f"❌ Unexpected error: {error_str[:200]}")
+        logger.exception("❌ Unexpected error: %.200s", error_str)
         return {
             'success': False,
             'error': 'unexpected',
@@ -153,6 +154,48 @@ def fetch_rainfall_annual(state_name, years):
             'user_friendly': True,
             'technical_details': error_str[:200]
         }
+
+def fetch_rainfall_annual(state_name, years):
+    """
+    Fetch annual rainfall data for a state
+    
+    States spanning several subdivisions (e.g. Uttar Pradesh) get one
+    area-weighted value per year from all of them (see state_rainfall.py).
+    
+    Args:
+        state_name: Name of the state (e.g., "Punjab")
+        years: List of years (e.g., [2010, 2011, 2012])
+    
+    Returns:
+        Dictionary with rainfall data and metadata
+    """
+    from state_rainfall import get_state_rainfall_index
+    logger.info("🌧️ Fetching rainfall data for %s...", state_name)
+    
+    # Get every subdivision covering this state
+    subdivisions = get_subdivisions_for_state(state_name)
+    logger.debug("Mapped to subdivisions: %s", subdivisions)
+    
+    block = fetch_rainfall_annual_block()
+    if not block.get('success'):
+        return block
+    
+    # Precomputed per state-year from one pass over the block
+    filtered_records = get_state_rainfall_index(block).lookup(state_name, years)
+    
+    logger.info("✅ Matched %d records for %s (%s)", len(filtered_records), ", ".join(subdivisions), years)
+    
+    return {
+        'success': True,
+        'subdivision': ", ".join(subdivisions),
+        'subdivisions': subdivisions,
+        'state': state_name,
+        'records': filtered_records,
+        'api_url': block['api_url'],
+        'total_fetched': block['total_fetched'],
+        'total_matched': len(filtered_records),
+        **staleness(block)
+    }
     
 @cache_decorator
 def fetch_crop_production(state_name, crop_name=None, year=None):
@@ -167,7 +210,7 @@ def fetch_crop_production(state_name, crop_name=None, year=None):
     Returns:
         Dictionary with crop production data and metadata
     """
-    print(f"🌾 Fetching crop data for {state_name}, crop={crop_name}, year={year}...")
+    logger.info("🌾 Fetching crop data for %s, crop=%s, year=%s...", state_name, crop_name, year)
     
     url = f"{CROP_PRODUCTION_API}"
     params = {
@@ -183,13 +226,14 @@ def fetch_crop_production(state_name, crop_name=None, year=None):
     if year:
         params['filters[crop_year]'] = year
     
-    def make_request():
-        response = requests.get(url, params=params, timeout=API_TIMEOUT)
+    def make_request(timeout=API_TIMEOUT):
+        response = requests.get(url, params=params, timeout=timeout)
         response.raise_for_status()
         return response
     
     try:
-        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY)
+        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY,
+                                 dataset='crops')
         
         if response is None:
             return {
@@ -200,10 +244,10 @@ def fetch_crop_production(state_name, crop_name=None, year=None):
             }
         
         if response.status_code == 200:
-            data = response.json()
+            data = decode_response(response.content, CROP_FIELDS)
             records = data.get('records', [])
             
-            print(f"   ✅ Retrieved {len(records)} crop records")
+            logger.info("✅ Retrieved %d crop records", len(records))
             
             return {
                 'success': True,
@@ -224,7 +268,7 @@ def fetch_crop_production(state_name, crop_name=None, year=None):
             
     except Exception as e:
         error_str = str(e)
-        print(f"❌ Unexpected error: {error_str[:200]}")
+        logger.exception("❌ Unexpected error: %.200s", error_str)
         return {
             'success': False,
             'error': 'unexpected',
@@ -244,7 +288,7 @@ def fetch_water_usage(crop_name=None):
     Returns:
         Dictionary with water usage data and metadata
     """
-    print(f"💧 Fetching water usage data for crop={crop_name}...")
+    logger.info("💧 Fetching water usage data for crop=%s...", crop_name)
     
     url = f"{WATER_USAGE_API}"
     params = {
@@ -255,13 +299,14 @@ def fetch_water_usage(crop_name=None):
     if crop_name:
         params['filters[crop]'] = crop_name
     
-    def make_request():
-        response = requests.get(url, params=params, timeout=API_TIMEOUT)
+    def make_request(timeout=API_TIMEOUT):
+        response = requests.get(url, params=params, timeout=timeout)
         response.raise_for_status()
         return response
     
     try:
-        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY)
+        response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY,
+                                 dataset='water')
         
         if response is None:
             return {
@@ -272,10 +317,10 @@ def fetch_water_usage(crop_name=None):
             }
         
         if response.status_code == 200:
-            data = response.json()
+            data = decode_response(response.content)  # Every field is used (8 rows)
             records = data.get('records', [])
             
-            print(f"   ✅ Retrieved {len(records)} water usage records")
+            logger.info("✅ Retrieved %d water usage records", len(records))
             
             return {
                 'success': True,
@@ -294,7 +339,7 @@ def fetch_water_usage(crop_name=None):
             
     except Exception as e:
         error_str = str(e)
-        print(f"❌ Unexpected error: {error_str[:200]}")
+        logger.exception("❌ Unexpected error: %.200s", error_str)
         return {
             'success': False,
             'error': 'unexpected',
@@ -303,6 +348,143 @@ def fetch_water_usage(crop_name=None):
             'technical_details': error_str[:200]
         }
     
+@cache_decorator
+def fetch_rainfall_monthly():
+    """
+    Fetch the complete sub-divisional monthly rainfall dataset (1901-2017)
+    and pack it into a MonthlyRainfallStore
+    
+    The whole dataset is only ~4,000 records, so it is paged in once and
+    cached; every seasonal question afterwards is answered from the store.
+    
+    Returns:
+        Dictionary with the store and metadata
+    """
+    logger.info("🌦️ Fetching monthly rainfall dataset...")
+    
+    url = f"{RAINFALL_MONTHLY_API}"
+    records = []
+    api_url = None
+    offset = 0
+    
+    try:
+        while True:
+            params = {
+                'api-key': API_KEY,
+                'format': 'json',
+                'offset': offset,
+                'limit': RAINFALL_MONTHLY_PAGE_SIZE
+            }
+            
+            def make_request(timeout=API_TIMEOUT):
+                response = requests.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+                return response
+            
+            response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY,
+                                     dataset='rainfall_monthly')
+            
+            if response is None:
+                return {
+                    'success': False,
+                    'error': 'api_timeout',
+                    'message': '⏱️ Government servers are responding slowly. Please try again in a moment.',
+                    'user_friendly': True
+                }
+            
+            page = decode_response(response.content, RAINFALL_MONTHLY_FIELDS).get('records', [])
+            records.extend(page)
+            if api_url is None:
+                api_url = response.url
+            
+            if len(page) < RAINFALL_MONTHLY_PAGE_SIZE:
+                break
+            offset += RAINFALL_MONTHLY_PAGE_SIZE
+        
+        from rainfall_monthly import MonthlyRainfallStore  # numpy is only needed once monthly data is used
+        store = MonthlyRainfallStore.from_records(records)
+        
+        logger.info("✅ Fetched %d monthly records (%.0f KB packed)", len(records), store.nbytes / 1024)
+        
+        return {
+            'success': True,
+            'store': store,
+            'api_url': api_url,
+            'total_fetched': len(records)
+        }
+            
+    except Exception as e:
+        error_str = str(e)
+        logger.exception("❌ Unexpected error: %.200s", error_str)
+        return {
+            'success': False,
+            'error': 'unexpected',
+            'message': f'⚠️ Unexpected error while fetching monthly rainfall data. Please try again.',
+            'user_friendly': True,
+            'technical_details': error_str[:200]
+        }
+
+def fetch_rainfall_seasonal(state_name, years, season):
+    """
+    Seasonal rainfall totals for a state, computed from the monthly store
+    
+    Args:
+        state_name: Name of the state (e.g., "Punjab")
+        years: List of season start years (e.g., [2010, 2011, 2012])
+        season: Season name or window (e.g., "kharif", "JJAS", "OND", "Jun-Oct")
+    
+    Returns:
+        Dictionary shaped like fetch_rainfall_annual, one record per year
+    """
+    from rainfall_monthly import resolve_season
+    label, months = resolve_season(season)
+    if months is None:
+        return {
+            'success': False,
+            'error': 'unknown_season',
+            'message': f"❓ Unknown season '{season}'. Try kharif, rabi, JJAS, OND or a month range like Jun-Oct.",
+            'user_friendly': True
+        }
+    
+    monthly = fetch_rainfall_monthly()
+    if not monthly.get('success'):
+        return monthly
+    
+    weights = get_subdivision_weights(state_name, equal=RAINFALL_STATE_WEIGHTING == "equal")
+    subdivision = ", ".join(weights)
+    store = monthly['store']
+    
+    if all(store.subdivision_index(sd) is None for sd in weights):
+        return {
+            'success': False,
+            'error': 'no_data',
+            'message': f'📭 No monthly rainfall data for {state_name}.',
+            'user_friendly': True
+        }
+    
+    # Area-weighted over all of the state's subdivisions
+    totals = store.weighted_seasonal_totals(months, years, weights)
+    
+    records = []
+    for year, total in zip(years, totals):
+        if total == total:  # Skip NaN (missing months)
+            records.append({'year': year, 'season': label, 'rainfall': round(float(total), 1)})
+    
+    logger.info("✅ %s rainfall for %s: %d/%d years available", label, subdivision, len(records), len(years))
+    
+    return {
+        'success': True,
+        'subdivision': subdivision,
+        'state': state_name,
+        'season': label,
+        'months': list(months),
+        'records': records,
+        'api_url': monthly['api_url'],
+        'total_fetched': monthly['total_fetched'],
+        'total_matched': len(records),
+        **staleness(monthly)
+    }
+
 def calculate_average_rainfall(rainfall_data):
     """Calculate average annual rainfall from records"""
     records = rainfall_data.get('records', [])
@@ -380,9 +562,8 @@ def check_all_apis_failed(fetched_data):
     
     if all_failed:
         # Check if failures were due to network/timeout
-        network_errors = ['api_timeout', 'api_status', 'unexpected']
         has_network_issue = any(
-            data.get('error') in network_errors 
+            data.get('error') in UPSTREAM_ERRORS 
             for data in fetched_data.values()
         )
         return True, has_network_issue
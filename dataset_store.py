@@ -0,0 +1,202 @@
+# dataset_store.py
+# Memory-mapped, read-only columnar store for the synced datasets
+# Each column is saved as an int32 code array (.npy) plus a dictionary of its
+# distinct original values; numeric columns also get a float64 array for
+# vectorized filters. Every process maps the same files with
+# np.load(mmap_mode='r'), so the OS shares the pages between workers and
+# startup never re-parses JSON. Versions are written to their own directory
+# and switched atomically through a CURRENT pointer file.
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2  # Older versions are removed (open maps keep working on POSIX)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+class VersionedStore:
+    """
+    Directory of immutable versions with an atomically switched CURRENT pointer
+
+    Args:
+        path: Root directory for this dataset
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        """Name of the current version, or None"""
+        try:
+            with open(os.path.join(self.path, CURRENT_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def version_path(self, version):
+        return os.path.join(self.path, version)
+
+    def publish(self, version, write):
+        """
+        Write a new version with write(directory) and make it current
+
+        Readers either see the old version or the complete new one.
+        """
+        final_path = self.version_path(version)
+        if not os.path.isdir(final_path):
+            tmp_path = f"{final_path}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            write(tmp_path)
+            try:
+                os.rename(tmp_path, final_path)
+            except OSError:
+                # Another process published the same version first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+        pointer_tmp = os.path.join(self.path, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+        with open(pointer_tmp, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(self.path, CURRENT_FILE))
+        self._cleanup(keep=version)
+
+    def _cleanup(self, keep):
+        versions = [d for d in os.listdir(self.path)
+                    if os.path.isdir(os.path.join(self.path, d)) and '.tmp-' not in d and d != keep]
+        versions.sort(key=lambda d: os.path.getmtime(os.path.join(self.path, d)), reverse=True)
+        for old in versions[KEEP_VERSIONS - 1:]:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+class ColumnarTable:
+    """
+    Read-only table of records backed by memory-mapped column files
+
+    Args:
+        path: Version directory written by write_table
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(path, 'dictionaries.json'), encoding='utf-8') as f:
+            self.dictionaries = json.load(f)
+        self.columns = meta['columns']
+        self.n_rows = meta['n_rows']
+        self.numeric_columns = meta['numeric']
+        self._codes = {c: np.load(os.path.join(path, f"{i}.codes.npy"), mmap_mode='r')
+                       for i, c in enumerate(self.columns)}
+        self._numeric = {c: np.load(os.path.join(path, f"{i}.num.npy"), mmap_mode='r')
+                         for i, c in enumerate(self.columns) if c in meta['numeric']}
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def nbytes(self):
+        """Bytes mapped from disk (shared between processes)"""
+        return sum(a.nbytes for a in self._codes.values()) + sum(a.nbytes for a in self._numeric.values())
+
+    def numeric(self, column):
+        """float64 view of a numeric column (NaN where missing or non-numeric)"""
+        return self._numeric[column]
+
+    def equals_ignore_case(self, column, value):
+        """Boolean mask of rows whose string value matches case-insensitively"""
+        target = str(value).upper()
+        codes = [i for i, v in enumerate(self.dictionaries[column]) if str(v).upper() == target]
+        return np.isin(self._codes[column], codes)
+
+    def rows(self, mask=None):
+        """Materialize records (dicts with the original values) for a mask or all rows"""
+        indices = np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+        decoded = {c: [self.dictionaries[c][code] for code in self._codes[c][indices]] for c in self.columns}
+        records = []
+        for i in range(len(indices)):
+            record = {}
+            for c in self.columns:
+                value = decoded[c][i]
+                if value is not None:
+                    record[c] = value
+            records.append(record)
+        return records
+
+def write_table(records, path):
+    """
+    Write records as dictionary-encoded memmap-able columns
+
+    Columns are the union of record keys; a missing key decodes as absent.
+    """
+    columns = []
+    for r in records:
+        for key in r:
+            if key not in columns:
+                columns.append(key)
+
+    dictionaries, numeric = {}, []
+    for i, column in enumerate(columns):
+        values = [r.get(column) for r in records]
+        dictionary, index, codes = [], {}, np.empty(len(values), dtype=np.int32)
+        for row, value in enumerate(values):
+            key = json.dumps(value)
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(dictionary)
+                dictionary.append(value)
+            codes[row] = code
+        np.save(os.path.join(path, f"{i}.codes.npy"), codes)
+        dictionaries[column] = dictionary
+
+        floats = np.array([_to_float(v) for v in values], dtype=np.float64)
+        if values and not np.isnan(floats).all():
+            np.save(os.path.join(path, f"{i}.num.npy"), floats)
+            numeric.append(column)
+
+    with open(os.path.join(path, 'dictionaries.json'), 'w', encoding='utf-8') as f:
+        json.dump(dictionaries, f)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'columns': columns, 'numeric': numeric, 'n_rows': len(records)}, f)
+
+def open_table(path, version, load_records):
+    """
+    Open the memory-mapped table for `version`, building it first if needed
+
+    Args:
+        path: Dataset root directory
+        version: Content version (e.g. a hash of the snapshot)
+        load_records: Called only if the version has to be built
+
+    Returns:
+        ColumnarTable
+    """
+    store = VersionedStore(path)
+    if store.current() != version or not os.path.isdir(store.version_path(version)):
+        records = load_records()
+        store.publish(version, lambda d: write_table(records, d))
+        logger.info("🗄️ Built columnar table %s (%d rows)", path, len(records))
+    return ColumnarTable(store.version_path(version))
+
+def open_array(path, version, build_array):
+    """
+    Open a memory-mapped ndarray for `version`, building it with build_array() if needed
+
+    Returns:
+        Read-only np.memmap
+    """
+    store = VersionedStore(path)
+    if store.current() != version or not os.path.isdir(store.version_path(version)):
+        array = build_array()
+        store.publish(version, lambda d: np.save(os.path.join(d, 'values.npy'), array))
+        logger.info("🗄️ Built array %s %s", path, array.shape)
+    return np.load(os.path.join(store.version_path(version), 'values.npy'), mmap_mode='r')
@@ -0,0 +1,341 @@
+# delta_sync.py
+# Incremental sync of the whole-dataset fetches (annual rainfall block,
+# monthly rainfall, water efficiency) against data.gov.in metadata
+# A limit=1 request returns the dataset's `updated` timestamp and `total`
+# record count. If neither moved, the local snapshot is still current and the
+# cache entry is simply renewed - one tiny request instead of a full download.
+# If they did move, only new pages are fetched (or, on a periodic full check,
+# every page is compared by content hash and only changed pages are merged).
+#
+# Run once from the command line:  python delta_sync.py
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import requests
+
+from config import (
+    API_KEY, API_TIMEOUT, API_RETRY_ATTEMPTS, API_RETRY_DELAY, RAINFALL_ANNUAL_API, RAINFALL_MONTHLY_API,
+    WATER_USAGE_API, RAINFALL_MONTHLY_PAGE_SIZE, SNAPSHOT_DIR, SYNC_STATE_PATH, SYNC_FULL_VERIFY_INTERVAL,
+    ENABLE_MMAP_STORE
+)
+from data_fetcher import retry_request, fetch_rainfall_annual_block, fetch_rainfall_monthly, fetch_water_usage
+from json_decode import decode_response, RAINFALL_ANNUAL_FIELDS, RAINFALL_MONTHLY_FIELDS
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Builders turn a snapshot into the cached value of the live fetch. They get a
+# loader rather than the records so memory-mapped versions that already exist
+# are opened without parsing the JSON snapshot at all.
+
+def _build_rainfall_block(load_records, api_url, mapped_path=None, version=None):
+    if mapped_path:
+        # Columnar memory-mapped table shared by all processes (see dataset_store.py)
+        from dataset_store import open_table
+        table = open_table(mapped_path, version, load_records)
+        return {'success': True, 'table': table, 'api_url': api_url, 'total_fetched': len(table)}
+    records = load_records()
+    return {'success': True, 'records': records, 'api_url': api_url, 'total_fetched': len(records)}
+
+def _build_rainfall_monthly(load_records, api_url, mapped_path=None, version=None):
+    from rainfall_monthly import MonthlyRainfallStore
+    if mapped_path:
+        import numpy as np
+        from dataset_store import open_array
+        values = open_array(mapped_path, version, lambda: MonthlyRainfallStore.from_records(load_records()).values)
+        store = MonthlyRainfallStore(values)
+        # Record count is the number of (subdivision, year) rows holding any data
+        total = int((~np.isnan(values)).any(axis=2).sum())
+    else:
+        records = load_records()
+        store = MonthlyRainfallStore.from_records(records)
+        total = len(records)
+    return {'success': True, 'store': store, 'api_url': api_url, 'total_fetched': total}
+
+def _build_water_all(load_records, api_url, mapped_path=None, version=None):
+    # Only 8 rows - kept as plain records
+    records = load_records()
+    return {'success': True, 'crop': None, 'records': records, 'api_url': api_url,
+            'total_records': len(records)}
+
+# name -> how to page the dataset and which cache entry the snapshot backs.
+# start/max_records mirror the live request (the annual block is a 500-record window).
+SYNC_DATASETS = {
+    'rainfall_block': {
+        'api': RAINFALL_ANNUAL_API, 'dataset': 'rainfall', 'start': 1800, 'max_records': 500, 'page_size': 500,
+        'fields': RAINFALL_ANNUAL_FIELDS,
+        'func': fetch_rainfall_annual_block, 'kwargs': {}, 'build': _build_rainfall_block, 'mapped': True
+    },
+    'rainfall_monthly': {
+        'api': RAINFALL_MONTHLY_API, 'dataset': 'rainfall_monthly', 'start': 0, 'max_records': None,
+        'page_size': RAINFALL_MONTHLY_PAGE_SIZE,
+        'fields': RAINFALL_MONTHLY_FIELDS,
+        'func': fetch_rainfall_monthly, 'kwargs': {}, 'build': _build_rainfall_monthly, 'mapped': True
+    },
+    'water_all': {
+        'api': WATER_USAGE_API, 'dataset': 'water', 'start': 0, 'max_records': None, 'page_size': 100,
+        'fields': None,
+        'func': fetch_water_usage, 'kwargs': {'crop_name': None}, 'build': _build_water_all, 'mapped': False
+    },
+}
+
+def _page_hash(records):
+    return hashlib.sha1(json.dumps(records, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _content_version(page_hashes):
+    """Short id of a snapshot's content (names its memory-mapped version)"""
+    joined = ",".join(f"{o}:{h}" for o, h in sorted(page_hashes.items(), key=lambda item: int(item[0])))
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:16]
+
+def _write_json(path, data):
+    """Write atomically so a crash never leaves a half-written snapshot"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Unique temp name - workers syncing the same dataset must not share one
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path) or '.',
+                                     prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as f:
+        tmp_path = f.name
+        try:
+            json.dump(data, f)
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _checked_at(state):
+    """When a dataset's snapshot was last confirmed current upstream"""
+    return state.get('checked_at', state.get('synced_at', 0))
+
+def _request(spec, offset, limit):
+    """One page request; returns the parsed JSON body or None"""
+    params = {'api-key': API_KEY, 'format': 'json', 'offset': offset, 'limit': limit}
+
+    def make_request(timeout=API_TIMEOUT):
+        response = requests.get(spec['api'], params=params, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    response = retry_request(make_request, max_attempts=API_RETRY_ATTEMPTS, initial_delay=API_RETRY_DELAY,
+                             dataset=spec['dataset'])
+    if response is None:
+        return None
+    # Snapshots hold the same projected fields as the live fetch
+    return decode_response(response.content, spec['fields'])
+
+class DeltaSync:
+    """
+    Keeps snapshots of SYNC_DATASETS current with minimal upstream traffic
+
+    Args:
+        state_path: JSON file with per-dataset updated/total/page hashes
+        snapshot_dir: Directory holding one JSON snapshot per dataset
+        full_verify_interval: Seconds between full page-hash comparisons
+    """
+
+    def __init__(self, state_path=SYNC_STATE_PATH, snapshot_dir=SNAPSHOT_DIR,
+                 full_verify_interval=SYNC_FULL_VERIFY_INTERVAL):
+        self.state_path = state_path
+        self.snapshot_dir = snapshot_dir
+        self.full_verify_interval = full_verify_interval
+        self.state = _read_json(state_path, {})
+
+    def snapshot_path(self, name):
+        return os.path.join(self.snapshot_dir, f"{name}.json")
+
+    def mapped_path(self, name):
+        return os.path.join(self.snapshot_dir, 'mapped', name)
+
+    def load_snapshot(self, name):
+        """Records of the local snapshot, or None if there is none"""
+        return _read_json(self.snapshot_path(name), None)
+
+    def _window_end(self, spec, total):
+        end = total if spec['max_records'] is None else min(total, spec['start'] + spec['max_records'])
+        return max(end, spec['start'])
+
+    def _fetch_pages(self, spec, offsets):
+        """{offset: records} for the given page offsets, or None if any page fails"""
+        pages = {}
+        for offset in offsets:
+            data = _request(spec, offset, spec['page_size'])
+            if data is None:
+                return None
+            pages[offset] = data.get('records', [])
+        return pages
+
+    def sync(self, name):
+        """
+        Bring one dataset's snapshot up to date and renew its cache entry
+
+        Returns:
+            Dictionary with 'success', 'changed', 'pages_fetched' and 'pages_changed'
+        """
+        spec = SYNC_DATASETS[name]
+        meta = _request(spec, spec['start'], 1)
+        if meta is None:
+            return {'success': False, 'changed': False, 'pages_fetched': 0, 'pages_changed': 0}
+
+        updated, total = meta.get('updated'), int(meta.get('total') or 0)
+        previous = self.state.get(name)
+        have_snapshot = os.path.exists(self.snapshot_path(name))
+        now = time.time()
+
+        unchanged = (previous is not None and have_snapshot
+                     and previous['updated'] == updated and previous['total'] == total)
+        if unchanged:
+            # Remember the confirmation - it dates the snapshot if it is served stale later
+            previous['checked_at'] = now
+            _write_json(self.state_path, self.state)
+            self._publish(name, previous)
+            logger.info("🔁 %s unchanged (updated=%s, total=%d) - snapshot reused", name, updated, total)
+            return {'success': True, 'changed': False, 'pages_fetched': 0, 'pages_changed': 0}
+
+        records = self.load_snapshot(name) if have_snapshot else None
+        page_size = spec['page_size']
+        offsets = list(range(spec['start'], self._window_end(spec, total), page_size))
+        old_hashes = dict(previous['page_hashes']) if previous and records is not None else {}
+        full_verify = (not old_hashes or total < previous['total']
+                       or now - previous.get('verified_at', 0) >= self.full_verify_interval)
+
+        if full_verify:
+            to_fetch = offsets
+        else:
+            # Append fast path: refetch from the last (partial) page we hold onwards
+            last_full = spec['start'] + (len(records) // page_size) * page_size
+            to_fetch = [o for o in offsets if o >= last_full or str(o) not in old_hashes]
+
+        pages = self._fetch_pages(spec, to_fetch)
+        if pages is None:
+            return {'success': False, 'changed': False, 'pages_fetched': 0, 'pages_changed': 0}
+
+        # Merge: unchanged pages keep their snapshot records, changed/new pages are replaced
+        existing = {}
+        if records is not None:
+            for o in offsets:
+                i = o - spec['start']
+                existing[o] = records[i:i + page_size]
+
+        merged, new_hashes, changed = [], {}, 0
+        for o in offsets:
+            page = pages.get(o, existing.get(o, []))
+            new_hashes[str(o)] = _page_hash(page)
+            if new_hashes[str(o)] != old_hashes.get(str(o)):
+                changed += 1
+            merged.extend(page)
+
+        api_url = f"{spec['api']}?{urlencode({'format': 'json', 'offset': spec['start']})}"
+        _write_json(self.snapshot_path(name), merged)
+        self.state[name] = {
+            'updated': updated, 'total': total, 'api_url': api_url, 'page_hashes': new_hashes,
+            'version': _content_version(new_hashes),
+            'synced_at': now, 'checked_at': now,
+            'verified_at': now if full_verify else previous.get('verified_at', 0)
+        }
+        _write_json(self.state_path, self.state)
+        self._publish(name, self.state[name], records=merged)
+
+        logger.info("🔄 %s synced: %d/%d page(s) fetched, %d changed (%d records)",
+                    name, len(to_fetch), len(offsets), changed, len(merged))
+        return {'success': True, 'changed': changed > 0, 'pages_fetched': len(to_fetch), 'pages_changed': changed}
+
+    def _build_value(self, name, state, records=None):
+        """The live fetch's return value, built from the snapshot"""
+        spec = SYNC_DATASETS[name]
+
+        def load_records():
+            return records if records is not None else self.load_snapshot(name)
+
+        if ENABLE_MMAP_STORE and spec['mapped']:
+            version = state.get('version') or _content_version(state['page_hashes'])
+            return spec['build'](load_records, state['api_url'], self.mapped_path(name), version)
+        return spec['build'](load_records, state['api_url'])
+
+    def _publish(self, name, state, records=None, as_of=None):
+        """
+        Put the snapshot into the response cache under the live fetch's key (fresh TTL)
+
+        Args:
+            state: This dataset's sync state (api_url, page hashes, version)
+            records: Snapshot records if already in memory (else read only when needed)
+            as_of: When the snapshot was last confirmed upstream (default now)
+        """
+        spec = SYNC_DATASETS[name]
+        func = spec['func']
+        if not hasattr(func, 'cache'):
+            return
+        func.cache.put(func.cache_key(**spec['kwargs']), self._build_value(name, state, records), as_of=as_of)
+
+    def snapshot_fallback(self, name):
+        """
+        (checked_at, value) from the local snapshot, or None if there is none -
+        served (marked stale) while data.gov.in is unreachable
+        """
+        previous = self.state.get(name)
+        if not previous or not os.path.exists(self.snapshot_path(name)):
+            return None
+        return _checked_at(previous), self._build_value(name, previous)
+
+    def load_into_cache(self):
+        """
+        Seed the cache from existing snapshots without any upstream request
+        (e.g. at startup); the next sync() confirms they are still current
+
+        Returns:
+            Names of the datasets loaded
+        """
+        loaded = []
+        for name in SYNC_DATASETS:
+            previous = self.state.get(name)
+            if previous and os.path.exists(self.snapshot_path(name)):
+                # Not confirmed yet - the data is as old as the last sync
+                self._publish(name, previous, as_of=_checked_at(previous))
+                loaded.append(name)
+        return loaded
+
+    def sync_all(self):
+        """Sync every dataset; returns {name: sync result}"""
+        results = {}
+        for name in SYNC_DATASETS:
+            try:
+                results[name] = self.sync(name)
+            except Exception as e:
+                logger.exception("⚠️ Delta sync of %s failed: %.200s", name, e)
+                results[name] = {'success': False, 'changed': False, 'pages_fetched': 0, 'pages_changed': 0}
+        return results
+
+def _snapshot_fallback(name, **kwargs):
+    if kwargs != SYNC_DATASETS[name]['kwargs']:
+        # e.g. water usage for one crop - the snapshot holds the unfiltered fetch only
+        return None
+    try:
+        return DeltaSync().snapshot_fallback(name)
+    except Exception as e:
+        logger.warning("⚠️ Could not load %s snapshot: %.200s", name, e)
+        return None
+
+# Whole-dataset fetches fall back to their snapshot when the upstream fails
+# and nothing is cached (e.g. right after a restart)
+for _name, _spec in SYNC_DATASETS.items():
+    if hasattr(_spec['func'], 'set_fallback'):
+        _spec['func'].set_fallback(functools.partial(_snapshot_fallback, _name))
+
+if __name__ == "__main__":
+    for name, result in DeltaSync().sync_all().items():
+        print(f"{name}: {result}")
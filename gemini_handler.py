@@ -2,99 +2,175 @@
 # This file handles all Gemini AI interactions
 # PRODUCTION VERSION with improved rate limiting and error handling
 
-import google.generativeai as genai
+import datetime
+import hashlib
 import json
+import logging
+import threading
 import time
 import random
-from config import GEMINI_KEY, GEMINI_MODEL, GEMINI_MAX_ATTEMPTS, GEMINI_INITIAL_DELAY
+from config import (
+    GEMINI_KEY, GEMINI_MODEL, GEMINI_MAX_ATTEMPTS, GEMINI_INITIAL_DELAY, GEMINI_PARSER_CONTEXT_CACHE,
+    GEMINI_CONTEXT_CACHE_TTL, ENABLE_TEMPLATE_ANSWERS, ENABLE_TEMPLATE_POLISH, ENABLE_GENERAL_CACHE,
+    ENABLE_PARSER_SYSTEM_INSTRUCTION
+)
 from metadata import *
+from logging_setup import get_logger
+from metrics import GEMINI_CALLS, GEMINI_RETRIES, GEMINI_LATENCY, STAGE_LATENCY, timed
+from crop_rollups import get_district_ranking
+from answer_templates import render_template_answer, wants_yield
+from general_cache import lookup_general_answer, store_general_answer
+from intent_classifier import is_data_question, record_label
+from usage_ledger import record_gemini_usage
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_KEY)
-model = genai.GenerativeModel(GEMINI_MODEL)
+logger = get_logger(__name__)
+
+# Gemini client is built on first use (google.generativeai is slow to import,
+# and greetings/canned answers never need it)
+_model = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    """Return the shared Gemini model, configuring the client on first call (thread-safe)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_KEY)
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+# Models carrying a static prompt prefix as their system instruction (optionally
+# in a context cache), by name: {name: (instructions digest, expires at or None, model, cache or None)}
+_instructed_models = {}
+
+def _build_instructed_model(name, instructions):
+    """(model, expires at, cache) with `instructions` as system instruction or in a context cache"""
+    import google.generativeai as genai
+    if GEMINI_PARSER_CONTEXT_CACHE:
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=f"models/{GEMINI_MODEL}", display_name=f"samarth-{name}", system_instruction=instructions,
+                ttl=datetime.timedelta(seconds=GEMINI_CONTEXT_CACHE_TTL))
+            logger.info("🧊 %s instructions cached (%s)", name, cached.name)
+            # Recreate a minute early so no call races the expiry
+            return (genai.GenerativeModel.from_cached_content(cached), time.time() + GEMINI_CONTEXT_CACHE_TTL - 60,
+                    cached)
+        except Exception as e:
+            # e.g. instructions below the model's minimum cacheable size
+            logger.warning("⚠️ Context cache for %s unavailable, using a system instruction: %.200s", name, e)
+    return genai.GenerativeModel(GEMINI_MODEL, system_instruction=instructions), None, None
+
+def _delete_context_cache(cached):
+    """Delete a replaced context cache now instead of paying for it until its TTL runs out"""
+    try:
+        cached.delete()
+        logger.info("🧊 Deleted context cache %s", cached.name)
+    except Exception as e:
+        # Already expired or deleted - nothing left to pay for
+        logger.debug("Context cache %s not deleted: %.200s", cached.name, e)
+
+def _is_missing_cache_error(error):
+    """True if a Gemini error says the context cache a model points at no longer exists"""
+    error_str = str(error).lower()
+    return (type(error).__name__ == 'NotFound'
+            or ('cache' in error_str and any(word in error_str for word in ('not found', 'expired', 'invalid'))))
+
+def _drop_missing_cache_model(name, error):
+    """Forget a stage's model if `error` means its context cache is gone, so the next attempt recreates it"""
+    with _model_lock:
+        entry = _instructed_models.get(name)
+        if entry is None or entry[3] is None or not _is_missing_cache_error(error):
+            return
+        del _instructed_models[name]
+    logger.info("🔄 Context cache for %s is gone - recreating it", name)
+
+def _get_instructed_model(name, instructions):
+    """
+    Shared model for a static instruction prefix, rebuilt when the instructions
+    change (they are generated from metadata.py) or their context cache expires
+    """
+    digest = hashlib.sha1(instructions.encode('utf-8')).hexdigest()
+
+    def current(entry):
+        return entry is not None and entry[0] == digest and (entry[1] is None or time.time() < entry[1])
+
+    entry = _instructed_models.get(name)
+    if current(entry):
+        return entry[2]
+    _get_model()  # Configures the client
+    replaced = None
+    with _model_lock:
+        entry = _instructed_models.get(name)
+        if not current(entry):
+            if entry:
+                logger.info("🔄 %s instructions changed or expired - rebuilding", name)
+                replaced = entry[3]
+            model, expires_at, cached = _build_instructed_model(name, instructions)
+            entry = _instructed_models[name] = (digest, expires_at, model, cached)
+    if replaced is not None:
+        _delete_context_cache(replaced)
+    return entry[2]
 
 def check_if_agriculture_query(question):
     """
     Determine if a question is about agriculture/climate data that requires data fetching
     Returns True if agriculture-related and needs data, False for general questions
     """
-    question_lower = question.lower()
-    
-    # Simple greetings and pleasantries - handle conversationally (one or two words only)
-    if len(question.split()) <= 2:
-        simple_phrases = ['hello', 'hi', 'hey', 'thanks', 'thank you', 'bye', 'goodbye', 
-                         'ok', 'okay', 'cool', 'great', 'awesome', 'good', 'nice']
-        if any(phrase == question_lower.strip() for phrase in simple_phrases):
-            return False
-    
-    # Questions about the assistant itself (conversational)
-    assistant_questions = ['who are you', 'what are you', 'what can you do', 'what is your name',
-                          'how are you', 'tell me about yourself', 'what do you do']
-    if any(q in question_lower for q in assistant_questions):
-        return False
-    
-    # Agriculture/data keywords that indicate need for data fetching
-    data_keywords = [
-        'crop', 'rain', 'rainfall', 'production', 'wheat', 'rice', 'cotton',
-        'irrigation', 'harvest', 'farming', 'cultivation', 'paddy', 'maize',
-        'district', 'yield', 'drip', 'traditional', 'water usage',
-        'punjab', 'haryana', 'maharashtra', 'karnataka', 'tamil nadu',
-        'uttar pradesh', 'madhya pradesh', 'andhra pradesh', 'telangana',
-        'annual', 'season', 'kharif', 'rabi', 'data', 'statistics',
-        'area', 'productivity', 'hectare', 'tonne', 'sugarcane', 'bajra',
-        'jowar', 'arhar', 'gram', 'moong', 'groundnut', 'soyabean',
-        'compare', 'trend', 'highest', 'lowest', 'average', 'total',
-        'state', 'india', 'government', 'ministry of agriculture'
-    ]
-    
-    # If question has agriculture keywords, it's probably an agriculture query
-    has_data_keyword = any(keyword in question_lower for keyword in data_keywords)
-    
-    # If it has data keywords, treat as agriculture query
-    # Exception: questions about definitions without asking for specific data
-    if has_data_keyword:
-        # Check if it's just asking for a definition (general knowledge)
-        definition_patterns = ['what is', 'what are', 'define', 'meaning of', 'explain']
-        is_definition_only = any(pattern in question_lower for pattern in definition_patterns) and \
-                           not any(word in question_lower for word in ['compare', 'show', 'list', 'find', 'get', 'analyze', 'data', 'statistics', 'production', 'in', 'for'])
-        
-        if is_definition_only:
-            return False  # Handle as general query
-        
-        return True  # Has agriculture keywords and not just asking for definition
-    
-    return False  # No agriculture keywords, handle conversationally
+    # Compiled keyword matcher + optional local model (see intent_classifier.py)
+    return is_data_question(question)
 
-def handle_general_query(question):
+def get_canned_response(question):
     """
-    Handle non-agriculture queries with professionalism and respect
-    Provides helpful, contextual responses for any question
+    Pre-canned UNIQUE responses for greetings, thanks and questions about
+    the assistant - answered locally without calling Gemini
+    
+    Returns:
+        Answer text, or None if the question needs a real answer
     """
     
-    # Pre-handle common questions with UNIQUE responses
     question_lower = question.lower().strip()
     
     # Greetings
     if question_lower in ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'hi there']:
-        return {
-            'success': True,
-            'answer': "Hello! 👋 I'm SAMARTH, specialized in Indian agriculture and climate data. I can help you analyze crop production, rainfall patterns, and irrigation efficiency across Indian states. What would you like to explore?"
-        }
+        return "Hello! 👋 I'm SAMARTH, specialized in Indian agriculture and climate data. I can help you analyze crop production, rainfall patterns, and irrigation efficiency across Indian states. What would you like to explore?"
     
     # Thanks
     if 'thank' in question_lower:
-        return {
-            'success': True,
-            'answer': "You're welcome! 😊 Feel free to ask about any agriculture or climate data for Indian states."
-        }
+        return "You're welcome! 😊 Feel free to ask about any agriculture or climate data for Indian states."
     
     # About assistant
     if any(phrase in question_lower for phrase in ['who are you', 'what are you', 'what can you do', 'your name', 'tell me about yourself']):
+        return "I'm **SAMARTH**, an AI assistant specializing in Indian agriculture and climate data analysis. I can:\n\n- 🌧️ Compare rainfall patterns across states\n- 🌾 Analyze crop production and trends\n- 💧 Evaluate water efficiency in irrigation\n- 📊 Find extremes (highest/lowest production)\n- 📈 Identify trends over multiple years\n\nAll my data comes from official government sources (data.gov.in). What would you like to analyze?"
+    
+    return None
+
+@timed(STAGE_LATENCY, stage='general')
+def handle_general_query(question):
+    """
+    Handle non-agriculture queries with professionalism and respect
+    Provides helpful, contextual responses for any question
+    """
+    
+    question_lower = question.lower().strip()
+    
+    canned = get_canned_response(question)
+    if canned:
         return {
             'success': True,
-            'answer': "I'm **SAMARTH**, an AI assistant specializing in Indian agriculture and climate data analysis. I can:\n\n- 🌧️ Compare rainfall patterns across states\n- 🌾 Analyze crop production and trends\n- 💧 Evaluate water efficiency in irrigation\n- 📊 Find extremes (highest/lowest production)\n- 📈 Identify trends over multiple years\n\nAll my data comes from official government sources (data.gov.in). What would you like to analyze?"
+            'answer': canned
         }
     
+    # Repeat or near-repeat of an earlier question (see general_cache.py)
+    if ENABLE_GENERAL_CACHE:
+        cached = lookup_general_answer(question)
+        if cached:
+            return {
+                'success': True,
+                'answer': cached
+            }
+    
     # For other questions, use Gemini with concise, specific prompt
     prompt = f"""You are SAMARTH, specializing in Indian agriculture and climate data.
 
@@ -111,9 +187,11 @@ Instructions:
 Answer:"""
     
     try:
-        gemini_response = call_gemini_with_retry(prompt, max_attempts=2)
+        gemini_response = call_gemini_with_retry(prompt, max_attempts=2, stage='general')
         
         if gemini_response['success']:
+            if ENABLE_GENERAL_CACHE:
+                store_general_answer(question, gemini_response['text'])
             return {
                 'success': True,
                 'answer': gemini_response['text']
@@ -146,7 +224,8 @@ Answer:"""
             'answer': "I'm here to help with Indian agriculture and climate data! Ask me about crop production, rainfall patterns, or water efficiency for any state."
         }
 
-def call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS):
+def call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS, generation_config=None, stage='other',
+                           system_instruction=None):
     """
     Call Gemini API with retry logic for rate limits and other errors
     Uses exponential backoff with jitter for better reliability
@@ -154,14 +233,30 @@ def call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS):
     Args:
         prompt: The prompt to send to Gemini
         max_attempts: Maximum number of attempts (default from config)
+        generation_config: Optional generation config (e.g. JSON_PARSE_CONFIG for schema-enforced JSON)
+        stage: Pipeline stage making the call, for token accounting (see usage_ledger.py)
+        system_instruction: Optional static prefix sent as the model's system instruction
+                            (the model is shared per stage, so `prompt` only carries what changes)
     
     Returns:
         Response dict with success flag and text/error
     """
+    started = time.monotonic()
+    result = _generate_with_retry(prompt, max_attempts, generation_config, stage, system_instruction)
+    record_gemini_usage(stage, result.pop('usage', None), time.monotonic() - started,
+                        result.pop('attempts', max_attempts), result.get('error', 'success'), len(prompt))
+    return result
+
+def _generate_with_retry(prompt, max_attempts, generation_config, stage, system_instruction):
+    """call_gemini_with_retry without the accounting; results also carry 'usage' and 'attempts'"""
     for attempt in range(max_attempts):
         try:
-            response = model.generate_content(prompt)
-            return {'success': True, 'text': response.text.strip()}
+            model = _get_instructed_model(stage, system_instruction) if system_instruction else _get_model()
+            with GEMINI_LATENCY.time():
+                response = model.generate_content(prompt, generation_config=generation_config)
+            GEMINI_CALLS.inc(outcome='success')
+            return {'success': True, 'text': response.text.strip(),
+                    'usage': getattr(response, 'usage_metadata', None), 'attempts': attempt + 1}
             
         except Exception as e:
             error_str = str(e).lower()
@@ -170,48 +265,63 @@ def call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS):
             if '429' in error_str or 'quota' in error_str or 'rate limit' in error_str:
                 if attempt < max_attempts - 1:
                     # Exponential backoff with jitter: 2s, 5s, 10s (+ random 0-2s)
+                    GEMINI_RETRIES.inc(cause='rate_limit')
                     wait_time = min(GEMINI_INITIAL_DELAY * (2 ** attempt) + random.uniform(0, 2), 15)
-                    print(f"⏱️ Gemini rate limit hit, waiting {wait_time:.1f}s... (Attempt {attempt + 1}/{max_attempts})")
+                    logger.warning("⏱️ Gemini rate limit hit, waiting %.1fs... (Attempt %d/%d)", wait_time, attempt + 1, max_attempts)
                     time.sleep(wait_time)
                 else:
+                    GEMINI_CALLS.inc(outcome='rate_limit')
                     return {
                         'success': False,
                         'error': 'rate_limit',
-                        'message': '⏱️ AI service is busy right now. Please wait a moment and try again.'
+                        'message': '⏱️ AI service is busy right now. Please wait a moment and try again.',
+                        'attempts': attempt + 1
                     }
             
             # Handle timeout
             elif 'timeout' in error_str:
                 if attempt < max_attempts - 1:
+                    GEMINI_RETRIES.inc(cause='timeout')
                     wait_time = GEMINI_INITIAL_DELAY * (attempt + 1) + random.uniform(0, 1)
-                    print(f"⏱️ Gemini timeout, retrying in {wait_time:.1f}s... (Attempt {attempt + 1}/{max_attempts})")
+                    logger.warning("⏱️ Gemini timeout, retrying in %.1fs... (Attempt %d/%d)", wait_time, attempt + 1, max_attempts)
                     time.sleep(wait_time)
                 else:
+                    GEMINI_CALLS.inc(outcome='timeout')
                     return {
                         'success': False,
                         'error': 'timeout',
-                        'message': '⏱️ AI service is taking too long. Please try again.'
+                        'message': '⏱️ AI service is taking too long. Please try again.',
+                        'attempts': attempt + 1
                     }
             
             # Handle blocked content
             elif 'blocked' in error_str or 'safety' in error_str:
+                GEMINI_CALLS.inc(outcome='blocked')
                 return {
                     'success': False,
                     'error': 'blocked',
-                    'message': '⚠️ Unable to process this query. Please rephrase your question.'
+                    'message': '⚠️ Unable to process this query. Please rephrase your question.',
+                    'attempts': attempt + 1
                 }
             
             # Handle other API errors
             else:
+                if system_instruction:
+                    # Only a missing/expired context cache needs a new model - other errors
+                    # would just create (and pay for) another cache on every retry
+                    _drop_missing_cache_model(stage, e)
                 if attempt < max_attempts - 1:
+                    GEMINI_RETRIES.inc(cause='error')
                     wait_time = GEMINI_INITIAL_DELAY + random.uniform(0, 1)
-                    print(f"⚠️ Gemini error: {str(e)[:100]}, retrying in {wait_time:.1f}s... (Attempt {attempt + 1}/{max_attempts})")
+                    logger.warning("⚠️ Gemini error: %.100s, retrying in %.1fs... (Attempt %d/%d)", e, wait_time, attempt + 1, max_attempts)
                     time.sleep(wait_time)
                 else:
+                    GEMINI_CALLS.inc(outcome='api_error')
                     return {
                         'success': False,
                         'error': 'api_error',
-                        'message': f'⚠️ AI service error. Please try again. (Details: {str(e)[:100]})'
+                        'message': f'⚠️ AI service error. Please try again. (Details: {str(e)[:100]})',
+                        'attempts': attempt + 1
                     }
     
     return {
@@ -220,46 +330,59 @@ def call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS):
         'message': '⚠️ Failed after multiple attempts. Please try again later.'
     }
 
-def parse_user_question(user_question):
-    """
-    Stage 1: Use Gemini to understand the user's question
-    and extract structured information
-    
-    Args:
-        user_question: The natural language question from user
-    
-    Returns:
-        Dictionary with parsed intent and validation
-    """
-    
-    print(f"\n🤔 Parsing question: '{user_question}'")
-    
-    # Create prompt for Gemini
-    prompt = f"""
+# Structured output schemas - Gemini is forced to return JSON matching these,
+# so responses never need markdown-fence stripping or a re-ask
+ENTITIES_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'states': {'type': 'array', 'items': {'type': 'string'}},
+        'crops': {'type': 'array', 'items': {'type': 'string'}},
+        'years': {'type': 'array', 'items': {'type': 'integer'}},
+        'metrics': {
+            'type': 'array',
+            'items': {'type': 'string', 'enum': ['rainfall', 'seasonal_rainfall', 'production', 'yield', 'area', 'water']}
+        },
+        'season': {'type': 'string', 'nullable': True}
+    },
+    'required': ['states', 'crops', 'years', 'metrics']
+}
+
+PARSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'intent': {'type': 'string', 'enum': ['comparison', 'trend', 'extreme', 'policy', 'general']},
+        'entities': ENTITIES_SCHEMA,
+        'question_type': {'type': 'string'},
+        'time_period': {'type': 'string'}
+    },
+    'required': ['intent', 'entities']
+}
+
+CLASSIFY_PARSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'is_data_query': {'type': 'boolean'},
+        'general_answer': {'type': 'string', 'nullable': True},
+        'validation_hints': {'type': 'array', 'items': {'type': 'string'}},
+        **PARSE_SCHEMA['properties']
+    },
+    'required': ['is_data_query', 'intent', 'entities']
+}
+
+JSON_PARSE_CONFIG = {'response_mime_type': 'application/json', 'response_schema': PARSE_SCHEMA}
+JSON_CLASSIFY_PARSE_CONFIG = {'response_mime_type': 'application/json', 'response_schema': CLASSIFY_PARSE_SCHEMA}
+
+def _parser_instructions():
+    """Static part of the parser prompt: available data and extraction rules"""
+    return f"""
 You are a query parser for an agricultural data system.
 
 AVAILABLE DATA:
 - States: {', '.join(AVAILABLE_STATES[:15])}... (33 total)
 - Years: Crops (1997-2014), Rainfall (1901-2017)
 - Common Crops: {', '.join(COMMON_CROPS[:10])}... (100+ total)
-- Metrics: rainfall, crop production, water usage
-
-USER QUESTION: "{user_question}"
-
-TASK: Extract structured information from this question.
-
-Return ONLY valid JSON in this EXACT format (no markdown, no extra text):
-{{
-  "intent": "comparison | trend | extreme | policy | general",
-  "entities": {{
-    "states": ["State1", "State2"],
-    "crops": ["Crop1"],
-    "years": [2010, 2011, 2012],
-    "metrics": ["rainfall", "production"]
-  }},
-  "question_type": "brief description of what user wants",
-  "time_period": "description of time range"
-}}
+- Water usage crops: {', '.join(WATER_USAGE_CROPS)}
+- Metrics: rainfall (annual and monthly/seasonal), crop production, water usage
 
 RULES:
 - Only include states/crops that are clearly mentioned
@@ -270,59 +393,179 @@ RULES:
 - If asking for highest/lowest/best/worst, intent is "extreme"
 - If asking for recommendations/reasons, intent is "policy"
 - Normalize state names properly (e.g., "UP" → "Uttar Pradesh")
+- If asking about rainfall in a season or month range (kharif, rabi, monsoon, JJAS, OND, "June to September"), add "seasonal_rainfall" to metrics and set "season"; otherwise set "season" to null
+- "question_type" is a brief description of what the user wants, "time_period" describes the time range
+"""
+
+def _parse_instructions():
+    """Parser system instruction: everything but the question"""
+    return f"""{_parser_instructions()}
+TASK: Extract structured information from the user's question.
+"""
+
+def _classify_parse_instructions():
+    """Combined classify + parse system instruction: everything but the question"""
+    return f"""{_parser_instructions()}
+TASK:
+1. Set "is_data_query" to true if answering needs Indian agriculture/rainfall/water data
+   (states, crops, years, production, rainfall, irrigation). Definitions, greetings,
+   questions about you and off-topic questions are NOT data queries.
+2. If it is a data query, extract the structured information. Put problems a user should
+   know about in "validation_hints" (e.g. years outside the available range, unknown states).
+3. If it is NOT a data query, set intent to "general", leave entities empty and put your
+   answer in "general_answer": you are SAMARTH, specializing in Indian agriculture and climate
+   data. Answer directly and specifically if you can, say so honestly if you don't know,
+   briefly mention your agriculture expertise, under 80 words, warm and professional.
 """
+
+def _call_with_instructions(instructions, user_question, stage, generation_config):
+    """
+    Call Gemini with a static instruction prefix and the user's question
+
+    With ENABLE_PARSER_SYSTEM_INSTRUCTION the prefix is the model's system
+    instruction (built once, rebuilt when metadata changes) and each call
+    sends only the question; otherwise both go in one prompt.
+    """
+    question = f'USER QUESTION: "{user_question}"'
+    if ENABLE_PARSER_SYSTEM_INSTRUCTION:
+        return call_gemini_with_retry(question, max_attempts=GEMINI_MAX_ATTEMPTS, generation_config=generation_config,
+                                      stage=stage, system_instruction=instructions)
+    return call_gemini_with_retry(f"{instructions}\n{question}\n", max_attempts=GEMINI_MAX_ATTEMPTS,
+                                  generation_config=generation_config, stage=stage)
+
+def _log_parsed(parsed):
+    entities = parsed.get('entities', {})
+    logger.info("✅ Parsed successfully! intent=%s states=%s crops=%s years=%s",
+                parsed.get('intent'), entities.get('states'), entities.get('crops'), entities.get('years'))
+
+@timed(STAGE_LATENCY, stage='parse')
+def parse_user_question(user_question):
+    """
+    Stage 1: Use Gemini to understand the user's question
+    and extract structured information
+    
+    Args:
+        user_question: The natural language question from user
+    
+    Returns:
+        Dictionary with parsed intent and validation
+    """
+    
+    logger.info("🤔 Parsing question: %r", user_question)
     
     try:
-        # Call Gemini with retry logic
-        gemini_response = call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS)
+        # Call Gemini with retry logic (schema-enforced JSON output)
+        gemini_response = _call_with_instructions(_parse_instructions(), user_question, 'parse', JSON_PARSE_CONFIG)
+        
+        if not gemini_response['success']:
+            return {
+                'success': False,
+                'error': gemini_response.get('message', 'Failed to parse question')
+            }
+        
+        parsed = json.loads(gemini_response['text'])
+        _log_parsed(parsed)
+        
+        return {
+            'success': True,
+            'parsed': parsed,
+            'original_question': user_question
+        }
+        
+    except json.JSONDecodeError as e:
+        logger.warning("❌ Failed to parse JSON from Gemini")
+        return {
+            'success': False,
+            'error': 'Could not understand the question format. Please try rephrasing with clearer state names, crop types, and time periods.'
+        }
+    except Exception as e:
+        logger.exception("❌ Error: %.200s", e)
+        return {
+            'success': False,
+            'error': f'Unexpected error parsing question. Please try again.'
+        }
+
+@timed(STAGE_LATENCY, stage='classify_parse')
+def classify_and_parse_question(user_question):
+    """
+    Combined mode: classify, extract entities and get validation hints
+    in ONE schema-enforced Gemini call
+    
+    Replaces check_if_agriculture_query + parse_user_question (and the
+    handle_general_query call for off-topic questions, which get their
+    answer in the same response). Canned replies are still served locally.
+    
+    Args:
+        user_question: The natural language question from user
+    
+    Returns:
+        Dictionary with 'is_agriculture_query' and either the parse result
+        (same shape as parse_user_question) or a general 'answer'
+    """
+    
+    canned = get_canned_response(user_question)
+    if canned:
+        return {'success': True, 'is_agriculture_query': False, 'answer': canned}
+    
+    # Only general answers are cached, so a hit on a question without
+    # agriculture keywords needs no classification call at all
+    if ENABLE_GENERAL_CACHE and not check_if_agriculture_query(user_question):
+        cached = lookup_general_answer(user_question)
+        if cached:
+            return {'success': True, 'is_agriculture_query': False, 'answer': cached}
+    
+    logger.info("🤔 Classifying + parsing question: %r", user_question)
+    
+    try:
+        gemini_response = _call_with_instructions(_classify_parse_instructions(), user_question, 'classify_parse',
+                                                  JSON_CLASSIFY_PARSE_CONFIG)
         
         if not gemini_response['success']:
+            # Fall back to the keyword heuristic for routing the error message
             return {
                 'success': False,
+                'is_agriculture_query': check_if_agriculture_query(user_question),
                 'error': gemini_response.get('message', 'Failed to parse question')
             }
         
-        response_text = gemini_response['text']
+        result = json.loads(gemini_response['text'])
         
-        # Remove markdown code blocks if present
-        if response_text.startswith('```'):
-            # Extract JSON from markdown
-            lines = response_text.split('\n')
-            json_lines = []
-            in_json = False
-            for line in lines:
-                if line.strip().startswith('```'):
-                    in_json = not in_json
-                    continue
-                if in_json or (line.strip().startswith('{') or json_lines):
-                    json_lines.append(line)
-            response_text = '\n'.join(json_lines)
+        # Gemini's label is training data for the local intent model
+        record_label(user_question, result.get('is_data_query'))
         
-        # Parse JSON
-        parsed = json.loads(response_text)
+        if not result.get('is_data_query'):
+            logger.info("✅ Classified as general question")
+            if ENABLE_GENERAL_CACHE and result.get('general_answer'):
+                store_general_answer(user_question, result['general_answer'])
+            return {
+                'success': True,
+                'is_agriculture_query': False,
+                'answer': result.get('general_answer')
+            }
         
-        print(f"✅ Parsed successfully!")
-        print(f"   Intent: {parsed.get('intent')}")
-        print(f"   States: {parsed.get('entities', {}).get('states')}")
-        print(f"   Crops: {parsed.get('entities', {}).get('crops')}")
-        print(f"   Years: {parsed.get('entities', {}).get('years')}")
+        parsed = {k: result[k] for k in PARSE_SCHEMA['properties'] if k in result}
+        _log_parsed(parsed)
         
         return {
             'success': True,
+            'is_agriculture_query': True,
             'parsed': parsed,
+            'validation_hints': result.get('validation_hints', []),
             'original_question': user_question
         }
         
     except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse JSON from Gemini")
+        logger.warning("❌ Failed to parse JSON from Gemini")
         return {
             'success': False,
+            'is_agriculture_query': True,
             'error': 'Could not understand the question format. Please try rephrasing with clearer state names, crop types, and time periods.'
         }
     except Exception as e:
-        print(f"❌ Error: {str(e)[:200]}")
+        logger.exception("❌ Error: %.200s", e)
         return {
             'success': False,
+            'is_agriculture_query': check_if_agriculture_query(user_question),
             'error': f'Unexpected error parsing question. Please try again.'
         }
 
@@ -377,11 +620,16 @@ def validate_parsed_query(parsed_data):
             issues.append(f"Water usage data only for: {', '.join(WATER_USAGE_CROPS)}")
     
     if issues:
+        suggestions = 'Try: Punjab, Haryana (states); Wheat, Rice (crops); 2010-2014 (years)'
+        # Hints from the combined classify+parse call, if any
+        hints = parsed_data.get('validation_hints') or []
+        if hints:
+            suggestions = '; '.join(hints) + '. ' + suggestions
         return {
             'valid': False,
             'reason': '; '.join(issues),
             'type': 'data_unavailable',
-            'suggestions': 'Try: Punjab, Haryana (states); Wheat, Rice (crops); 2010-2014 (years)'
+            'suggestions': suggestions
         }
     
     return {
@@ -394,6 +642,11 @@ def determine_required_apis(parsed_data):
     Stage 2: Determine which APIs need to be called
     based on the parsed query
     
+    Only datasets the question actually needs are requested: metrics and
+    entities decide, and the intent is only used as a fallback when the
+    parser returned no metrics at all. query_planner.build_query_plan turns
+    this list into the minimal set of upstream fetches.
+    
     Args:
         parsed_data: Validated parsed query
     
@@ -405,37 +658,103 @@ def determine_required_apis(parsed_data):
     entities = parsed.get('entities', {})
     intent = parsed.get('intent')
     
+    metrics = [str(m).lower() for m in entities.get('metrics', []) or []]
+    states = entities.get('states', []) or []
+    crops = entities.get('crops', []) or []
+    years = entities.get('years', []) or []
+    season = entities.get('season')
+    
+    needs_seasonal = 'seasonal_rainfall' in metrics or bool(season)
+    # Annual rainfall is redundant when the question is about a season
+    needs_rainfall = 'rainfall' in metrics and not needs_seasonal
+    needs_crops = bool(crops) or any(m in metrics for m in ['production', 'yield', 'area'])
+    water_crops = [c for c in crops if c in WATER_USAGE_CROPS]
+    needs_water = any('water' in m for m in metrics) or (intent == 'policy' and bool(water_crops))
+    
+    # Parser gave no usable metrics - fall back to what the intent usually needs
+    if not (needs_seasonal or needs_rainfall or needs_crops or needs_water):
+        needs_rainfall = intent in ['comparison', 'trend']
+        needs_crops = intent in ['comparison', 'extreme', 'trend']
+    
     apis_needed = []
     
-    # Check if rainfall data is needed
-    metrics = entities.get('metrics', [])
-    if 'rainfall' in metrics or intent in ['comparison', 'trend']:
+    if needs_rainfall:
         apis_needed.append({
             'api': 'rainfall',
-            'states': entities.get('states', []),
-            'years': entities.get('years', [])
+            'states': states,
+            'years': years
         })
     
-    # Check if crop production data is needed
-    if 'production' in metrics or entities.get('crops') or intent in ['comparison', 'extreme', 'trend']:
+    if needs_seasonal:
+        apis_needed.append({
+            'api': 'rainfall_seasonal',
+            'states': states,
+            'years': years,
+            'season': season or 'JJAS'
+        })
+    
+    if needs_crops:
         apis_needed.append({
             'api': 'crops',
-            'states': entities.get('states', []),
-            'crops': entities.get('crops', []),
-            'years': entities.get('years', [])
+            'states': states,
+            'crops': crops,
+            'years': years
         })
     
-    # Check if water usage data is needed
-    if 'water' in str(metrics).lower() or intent == 'policy':
+    if needs_water:
         apis_needed.append({
             'api': 'water',
-            'crops': entities.get('crops', [])
+            'crops': water_crops or [None]  # None = all 8 crops in the dataset
         })
     
-    print(f"\n📊 APIs needed: {[api['api'] for api in apis_needed]}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("📊 APIs needed: %s", [api['api'] for api in apis_needed])
     
     return apis_needed
 
+def polish_template_answer(user_question, templated):
+    """
+    Optional Gemini pass that rephrases a template answer without changing its numbers
+    
+    Falls back to the template answer itself if Gemini fails.
+    """
+    prompt = f"""
+Rewrite this answer to the user's question in natural, professional language.
+Keep every number, unit, name and year exactly as given. Do not add facts.
+Keep it under 200 words and format with markdown.
+
+USER QUESTION: "{user_question}"
+
+ANSWER:
+{templated}
+"""
+    gemini_response = call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS, stage='polish')
+    if not gemini_response['success']:
+        logger.warning("⚠️ Polish failed, using template answer as is")
+        return {'success': True, 'answer': templated, 'data_used': templated}
+    
+    return {'success': True, 'answer': gemini_response['text'], 'data_used': templated}
+
+def _vintage_note(fetched_data):
+    """
+    Markdown note dating the data when any of it was served stale because
+    data.gov.in was unreachable (empty string if everything is fresh)
+    """
+    as_of = [data['data_as_of'] for data in fetched_data.values() if data.get('success') and data.get('stale')]
+    if not as_of:
+        return ""
+    oldest = min(as_of)
+    age_minutes = (time.time() - oldest) / 60
+    if age_minutes < 90:
+        age = f"{age_minutes:.0f} minutes"
+    elif age_minutes < 48 * 60:
+        age = f"{age_minutes / 60:.0f} hours"
+    else:
+        age = f"{age_minutes / 1440:.0f} days"
+    return (f"\n\n---\n🕰️ _Government data servers are unreachable right now, so this answer uses data "
+            f"last retrieved on {time.strftime('%d %b %Y, %H:%M', time.localtime(oldest))} ({age} ago)._")
+
+@timed(STAGE_LATENCY, stage='answer')
 def generate_intelligent_answer(user_question, parsed_data, fetched_data):
     """
     Stage 3: Use Gemini to generate a natural language answer
@@ -450,16 +769,46 @@ def generate_intelligent_answer(user_question, parsed_data, fetched_data):
         Dictionary with generated answer and citations
     """
     
-    print(f"\n✍️ Generating intelligent answer...")
+    logger.info("✍️ Generating intelligent answer...")
+    
+    # Served from cache/snapshot while data.gov.in is down - say how old the data is
+    vintage = _vintage_note(fetched_data)
+    
+    # Purely numeric questions are answered locally (see answer_templates.py)
+    if ENABLE_TEMPLATE_ANSWERS:
+        templated = render_template_answer(user_question, parsed_data, fetched_data)
+        if templated is not None:
+            if ENABLE_TEMPLATE_POLISH:
+                polished = polish_template_answer(user_question, templated)
+                polished['answer'] += vintage
+                return polished
+            logger.info("📝 Answered from template (%d chars, no Gemini call)", len(templated))
+            return {
+                'success': True,
+                'answer': templated + vintage,
+                'data_used': templated
+            }
     
     # Prepare data summary for Gemini
     data_summary = "AVAILABLE DATA:\n\n"
     
+    question_lower = user_question.lower()
+    yield_question = wants_yield(user_question, parsed_data)
+    
     for key, data in fetched_data.items():
         if not data.get('success'):
             continue
             
-        if 'rainfall' in key:
+        if 'rainfall_seasonal' in key:
+            state = data['state']
+            records = data.get('records', [])
+            if records:
+                data_summary += f"**{state} {data['season']} Season Rainfall:**\n"
+                for record in records:
+                    data_summary += f"  - {record['year']}: {record['rainfall']} mm\n"
+                data_summary += "\n"
+        
+        elif 'rainfall' in key:
             state = data['state']
             records = data.get('records', [])
             if records:
@@ -467,7 +816,11 @@ def generate_intelligent_answer(user_question, parsed_data, fetched_data):
                 for record in records:
                     year = record.get('year')
                     rainfall = record.get('annual')
-                    data_summary += f"  - Year {year}: {rainfall} mm\n"
+                    data_summary += f"  - Year {year}: {rainfall} mm"
+                    if record.get('coverage', 1) < 1:
+                        # Some of the state's subdivisions have no value this year
+                        data_summary += f" (partial: {record['sd_name']} only)"
+                    data_summary += "\n"
                 data_summary += "\n"
         
         elif 'crops' in key:
@@ -475,30 +828,34 @@ def generate_intelligent_answer(user_question, parsed_data, fetched_data):
             records = data.get('records', [])
             if records:
                 data_summary += f"**{state} Crop Production Data:**\n"
-                # Aggregate by crop
+                # Aggregate by crop (districts summed over seasons, see crop_rollups.py)
+                ranking = get_district_ranking(data)
                 crop_totals = {}
-                for record in records:
-                    crop = record.get('crop', 'Unknown')
-                    try:
-                        production = float(record.get('production_', 0))
-                        district = record.get('district_name', 'Unknown')
-                        
-                        if crop not in crop_totals:
-                            crop_totals[crop] = {'total': 0, 'districts': {}}
-                        crop_totals[crop]['total'] += production
-                        crop_totals[crop]['districts'][district] = production
-                    except:
-                        continue
+                for crop, crop_state, year in ranking.keys():
+                    crop_totals[crop] = crop_totals.get(crop, 0) + ranking.total(crop, crop_state, year)
                 
                 # Show top crops
-                sorted_crops = sorted(crop_totals.items(), key=lambda x: x[1]['total'], reverse=True)
-                for crop, info in sorted_crops[:10]:
-                    data_summary += f"  - {crop}: {info['total']:,.0f} tonnes\n"
-                    # Show district breakdown if asking about districts
-                    if 'district' in user_question.lower():
-                        sorted_districts = sorted(info['districts'].items(), key=lambda x: x[1], reverse=True)
-                        for district, prod in sorted_districts[:3]:
-                            data_summary += f"    • {district}: {prod:,.0f} tonnes\n"
+                sorted_crops = sorted(crop_totals.items(), key=lambda x: x[1], reverse=True)
+                for crop, total in sorted_crops[:10]:
+                    data_summary += f"  - {crop}: {total:,.0f} tonnes\n"
+                    if yield_question:
+                        # Yield per year from the same rollup (production / area)
+                        for year, crop_yield in ranking.trend(crop, data['state'], metric='yield'):
+                            area = ranking.total(crop, data['state'], year, metric='area')
+                            data_summary += f"    • {year} yield: {crop_yield:,.2f} t/ha ({area:,.0f} ha)\n"
+                    # Exact district extremes if asking about districts
+                    if 'district' in question_lower:
+                        metric, unit = ('yield', 't/ha') if yield_question else ('production', 't')
+                        for _, crop_state, year in ranking.keys(crop=crop):
+                            count = ranking.district_count(crop, crop_state, year, metric=metric)
+                            if not count:
+                                continue
+                            highest = ", ".join(f"{d} ({v:,.2f} {unit})" if yield_question else f"{d} ({v:,.0f} {unit})"
+                                                for d, v in ranking.top(crop, crop_state, year, k=3, metric=metric))
+                            lowest = ", ".join(f"{d} ({v:,.2f} {unit})" if yield_question else f"{d} ({v:,.0f} {unit})"
+                                               for d, v in ranking.bottom(crop, crop_state, year, k=3, metric=metric))
+                            data_summary += (f"    • {year} {metric} ({count} districts, all seasons): "
+                                             f"highest {highest}; lowest {lowest}\n")
                 data_summary += "\n"
         
         elif 'water' in key:
@@ -536,13 +893,14 @@ INSTRUCTIONS:
 8. Keep the answer focused and under 200 words
 9. Format with markdown for readability (use bold, bullet points)
 10. Be precise with numbers and units
+11. For highest/lowest district questions, use the district rankings exactly as listed
 
 Generate a clear, direct answer:
 """
     
     try:
         # Call Gemini with retry logic
-        gemini_response = call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS)
+        gemini_response = call_gemini_with_retry(prompt, max_attempts=GEMINI_MAX_ATTEMPTS, stage='answer')
         
         if not gemini_response['success']:
             return {
@@ -550,9 +908,9 @@ Generate a clear, direct answer:
                 'error': gemini_response.get('message', 'Failed to generate answer')
             }
         
-        answer = gemini_response['text']
+        answer = gemini_response['text'] + vintage
         
-        print(f"✅ Answer generated ({len(answer)} chars)")
+        logger.info("✅ Answer generated (%d chars)", len(answer))
         
         return {
             'success': True,
@@ -561,7 +919,7 @@ Generate a clear, direct answer:
         }
         
     except Exception as e:
-        print(f"❌ Error generating answer: {str(e)[:200]}")
+        logger.exception("❌ Error generating answer: %.200s", e)
         return {
             'success': False,
             'error': f'⚠️ Error generating answer. Please try again.'
@@ -0,0 +1,206 @@
+# general_cache.py
+# Two-tier cache for answers to general (off-topic / small-talk) questions
+# Tier 1 is an exact match on normalized question text; tier 2 is a small
+# TF-IDF index over the content words of previously answered questions, so
+# near-repeats ("whats the capital of india?" / "What is the capital of
+# India") are served locally instead of spending a Gemini call. The library
+# is seeded with answers to the off-topic questions we see most often.
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from config import GENERAL_CACHE_TTL, GENERAL_CACHE_MAX_ENTRIES, GENERAL_CACHE_SIMILARITY, GENERAL_CACHE_PATH
+from logging_setup import get_logger
+from metrics import CACHE_REQUESTS
+
+logger = get_logger(__name__)
+
+# Words that carry no meaning for matching - what remains decides similarity
+STOPWORDS = frozenset("""
+a an the is are was were be been am of in on at to for from and or but what whats who whom which how
+do does did can could would will shall should you your yours me my i we our us please tell about this
+that these those it its s there here any some just know give let
+""".split())
+
+# Precomputed answers for frequent off-topic questions (never expire)
+SEED_ANSWERS = [
+    ("What is the capital of India?",
+     "The capital of India is **New Delhi**. 🏛️ I'm SAMARTH, focused on Indian agriculture and climate data - "
+     "I can also compare rainfall or crop production across states if you're interested!"),
+    ("How is the weather today?",
+     "For current weather, check weather apps or IMD (mausam.imd.gov.in). I specialize in historical climate "
+     "data - rainfall patterns over years, seasonal trends, and how they correlate with crop production."),
+    ("What is data.gov.in?",
+     "**data.gov.in** is the Government of India's Open Government Data platform, publishing datasets from "
+     "ministries and departments. All my answers come from its IMD rainfall and Ministry of Agriculture datasets."),
+    ("Tell me a joke",
+     "Why did the farmer win an award? Because he was outstanding in his field! 🌾 Want me to find the most "
+     "outstanding district for wheat production in a state?"),
+    ("What is the currency of India?",
+     "India's currency is the **Indian Rupee (₹, INR)**. My speciality is agriculture and climate data - "
+     "ask me about crop production or rainfall in any state!"),
+]
+
+def normalize_question(text):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def _content_tokens(normalized):
+    return Counter(t for t in normalized.split() if t not in STOPWORDS)
+
+class GeneralAnswerCache:
+    """
+    Exact + similarity cache of general answers
+
+    Args:
+        ttl: Seconds a learned answer stays valid (seed answers never expire)
+        max_entries: Learned answers kept (least recently used are dropped)
+        threshold: Minimum TF-IDF cosine similarity for a near-repeat hit
+        path: Optional JSONL file to keep learned answers across restarts
+    """
+
+    def __init__(self, ttl=GENERAL_CACHE_TTL, max_entries=GENERAL_CACHE_MAX_ENTRIES,
+                 threshold=GENERAL_CACHE_SIMILARITY, path=GENERAL_CACHE_PATH, seeds=SEED_ANSWERS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.path = path
+        self._entries = OrderedDict()   # normalized -> {'answer', 'stored_at', 'tokens'}
+        self._postings = {}             # content token -> set of normalized questions
+        self._df = Counter()            # content token -> number of entries containing it
+        self._lock = threading.Lock()
+
+        for question, answer in seeds:
+            self._add(normalize_question(question), answer, stored_at=None)
+        if path:
+            self._load(path)
+            self._trim()
+
+    def _load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    item = json.loads(line)
+                    self._add(normalize_question(item['question']), item['answer'], item['stored_at'])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("⚠️ Could not load general answers from %s: %.200s", path, e)
+
+    def _add(self, normalized, answer, stored_at):
+        self._remove(normalized)
+        tokens = _content_tokens(normalized)
+        self._entries[normalized] = {'answer': answer, 'stored_at': stored_at, 'tokens': tokens}
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(normalized)
+            self._df[token] += 1
+
+    def _remove(self, normalized):
+        entry = self._entries.pop(normalized, None)
+        if entry is None:
+            return
+        for token in entry['tokens']:
+            self._postings[token].discard(normalized)
+            self._df[token] -= 1
+
+    def _trim(self):
+        """Drop the least recently used learned answers beyond max_entries"""
+        learned = [q for q, e in self._entries.items() if e['stored_at'] is not None]
+        for old in learned[:max(0, len(learned) - self.max_entries)]:
+            self._remove(old)
+
+    def _expired(self, entry):
+        return entry['stored_at'] is not None and time.time() - entry['stored_at'] >= self.ttl
+
+    def _vector(self, tokens):
+        n = len(self._entries)
+        return {t: count * (math.log((n + 1) / (self._df[t] + 1)) + 1) for t, count in tokens.items()}
+
+    @staticmethod
+    def _cosine(a, b):
+        dot = sum(weight * b.get(t, 0) for t, weight in a.items())
+        if not dot:
+            return 0.0
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm
+
+    def lookup(self, question):
+        """
+        Cached answer for the question or a near-repeat of it
+
+        Returns:
+            (answer, 'exact' | 'similar') or (None, None)
+        """
+        normalized = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(normalized)
+            if entry is not None:
+                if not self._expired(entry):
+                    self._entries.move_to_end(normalized)
+                    return entry['answer'], 'exact'
+                self._remove(normalized)
+
+            tokens = _content_tokens(normalized)
+            if not tokens:
+                return None, None
+
+            candidates = set()
+            for token in tokens:
+                candidates |= self._postings.get(token, set())
+
+            query = self._vector(tokens)
+            best, best_score = None, self.threshold
+            for candidate in candidates:
+                entry = self._entries[candidate]
+                if self._expired(entry):
+                    continue
+                score = self._cosine(query, self._vector(entry['tokens']))
+                if score >= best_score:
+                    best, best_score = candidate, score
+
+            if best is None:
+                return None, None
+            self._entries.move_to_end(best)
+            logger.debug("General answer near-repeat: %r ~ %r (%.2f)", normalized, best, best_score)
+            return self._entries[best]['answer'], 'similar'
+
+    def store(self, question, answer):
+        """Remember a generated answer (and persist it if a path is configured)"""
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        stored_at = time.time()
+        with self._lock:
+            self._add(normalized, answer, stored_at)
+            self._trim()
+
+            if self.path:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps({'question': question, 'answer': answer, 'stored_at': stored_at},
+                                           ensure_ascii=False) + "\n")
+                except OSError as e:
+                    logger.warning("⚠️ Could not persist general answer: %.200s", e)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_general_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeneralAnswerCache()
+        return _cache
+
+def lookup_general_answer(question):
+    """Cached general answer or None (counted in the cache metrics)"""
+    answer, kind = get_general_cache().lookup(question)
+    CACHE_REQUESTS.inc(function='general_answer', result='miss' if answer is None else f"{kind}_hit")
+    return answer
+
+def store_general_answer(question, answer):
+    get_general_cache().store(question, answer)
@@ -0,0 +1,169 @@
+# hedging.py
+# Latency-aware retries for data.gov.in
+# Tracks rolling per-dataset latency, derives timeouts from it instead of
+# always waiting the full API_TIMEOUT, and hedges: once a request runs past
+# the observed p95 a duplicate is sent and whichever answers first wins.
+# Hedges and retries share one small per-request budget, and hedges are
+# additionally rate limited process-wide so a slow upstream is not flooded.
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from config import (
+    API_TIMEOUT, ENABLE_HEDGED_REQUESTS, LATENCY_WINDOW, LATENCY_MIN_SAMPLES, HEDGE_PERCENTILE,
+    ADAPTIVE_TIMEOUT_MULTIPLIER, ADAPTIVE_TIMEOUT_MIN, HEDGE_RATE_PER_SEC, HEDGE_BURST, HEDGE_MAX_WORKERS
+)
+from rate_limit import TokenBucket
+from logging_setup import get_logger, bind_context
+from metrics import UPSTREAM_RETRIES, UPSTREAM_HEDGES
+
+logger = get_logger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="upstream")
+
+# Process-wide cap on duplicate requests
+_hedge_bucket = TokenBucket(rate=HEDGE_RATE_PER_SEC, capacity=HEDGE_BURST)
+
+class LatencyTracker:
+    """
+    Rolling window of request latencies for one endpoint
+
+    Timed-out requests are recorded at their timeout, so a slowing upstream
+    pushes the percentiles (and with them the timeout) up rather than down.
+
+    Args:
+        window: Number of recent samples kept
+        min_samples: Below this many samples, defaults are used
+    """
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=LATENCY_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        """q-th quantile (0-1) of recent latencies, or None without enough samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def timeout(self):
+        """Adaptive timeout: a multiple of the p99, within [ADAPTIVE_TIMEOUT_MIN, API_TIMEOUT]"""
+        p99 = self.percentile(0.99)
+        if p99 is None:
+            return API_TIMEOUT
+        return min(API_TIMEOUT, max(ADAPTIVE_TIMEOUT_MIN, p99 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self):
+        """How long to wait before sending a duplicate (None = don't hedge yet)"""
+        if not ENABLE_HEDGED_REQUESTS:
+            return None
+        return self.percentile(HEDGE_PERCENTILE)
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_latency_tracker(dataset):
+    with _trackers_lock:
+        tracker = _trackers.get(dataset)
+        if tracker is None:
+            tracker = _trackers[dataset] = LatencyTracker()
+        return tracker
+
+def _timed(func, timeout, tracker):
+    start = time.perf_counter()
+    try:
+        result = func(timeout)
+    except requests.exceptions.Timeout:
+        tracker.record(timeout)
+        raise
+    tracker.record(time.perf_counter() - start)
+    return result
+
+def hedged_call(func, dataset='unknown', max_attempts=3, initial_delay=2):
+    """
+    Call func(timeout) with adaptive timeouts, hedging and retries
+
+    Args:
+        func: Makes one upstream request with the given timeout (seconds);
+              raises requests exceptions on failure
+        dataset: Endpoint label - latency statistics are kept per dataset
+        max_attempts: Total attempts allowed for this call (hedges included)
+        initial_delay: Base for the exponential backoff between retries
+
+    Returns:
+        Result of the first successful attempt, or None if all attempts fail
+    """
+    tracker = get_latency_tracker(dataset)
+    timeout = tracker.timeout()
+    extra_budget = max_attempts - 1
+    attempts = 1
+
+    def submit(attempt_timeout):
+        return _executor.submit(bind_context(_timed), func, attempt_timeout, tracker)
+
+    pending = {submit(timeout)}
+    hedge_after = tracker.hedge_delay()
+    last_error = None
+
+    while True:
+        can_hedge = hedge_after is not None and attempts <= extra_budget
+        done, pending = wait(pending, timeout=hedge_after if can_hedge else None, return_when=FIRST_COMPLETED)
+
+        if not done:
+            # Still waiting past the p95: send a duplicate if the budgets allow
+            hedge_after = None
+            if _hedge_bucket.try_acquire():
+                attempts += 1
+                UPSTREAM_HEDGES.inc(dataset=dataset)
+                logger.info("🪁 %s request slower than p95, sending hedge (attempt %d/%d)",
+                            dataset, attempts, max_attempts)
+                pending.add(submit(timeout))
+            continue
+
+        for future in done:
+            try:
+                return future.result()
+            except requests.exceptions.RequestException as e:
+                last_error = e
+
+        if pending:
+            # Another attempt (primary or hedge) is still in flight
+            continue
+
+        if attempts > extra_budget:
+            if isinstance(last_error, requests.exceptions.Timeout):
+                logger.error("❌ All %d attempts failed due to timeout", attempts)
+            else:
+                logger.error("❌ All %d attempts failed: %.100s", attempts, last_error)
+            return None
+
+        # Everything in flight failed: back off and retry
+        cause = 'timeout' if isinstance(last_error, requests.exceptions.Timeout) else 'request_exception'
+        UPSTREAM_RETRIES.inc(dataset=dataset, cause=cause)
+        # Exponential backoff with jitter: 2s, 4s, 8s (+ random 0-1s)
+        delay = min(initial_delay * (2 ** (attempts - 1)) + random.uniform(0, 1), 15)
+        if cause == 'timeout':
+            # The adaptive timeout was too tight for the upstream right now - widen it
+            timeout = min(API_TIMEOUT, timeout * 2)
+            logger.warning("⏱️ Request timeout, retrying in %.1fs with %.0fs timeout... (Attempt %d/%d)",
+                           delay, timeout, attempts, max_attempts)
+        else:
+            logger.warning("⚠️ Request failed: %.100s, retrying in %.1fs... (Attempt %d/%d)",
+                           last_error, delay, attempts, max_attempts)
+        time.sleep(delay)
+
+        attempts += 1
+        pending = {submit(timeout)}
+        hedge_after = tracker.hedge_delay()
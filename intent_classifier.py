@@ -0,0 +1,232 @@
+# intent_classifier.py
+# Fast local routing: does a question need agriculture data or is it general?
+# All keyword lists are compiled into one trie-shaped, word-boundary regex (a
+# single scan instead of one substring scan per keyword, and no more 'in' or
+# 'for' matching inside other words). Keywords are split into strong signals (crops,
+# states, rainfall, agricultural metrics) and weak ones ('india', 'data',
+# 'average') that only count next to a year.
+#
+# If a trained model exists (INTENT_MODEL_PATH, see
+# scripts/train_intent_classifier.py), a logistic regression over hashed word
+# n-grams plus the matcher's signals makes the final call. Its training data
+# are the labels Gemini's combined classify+parse call already produces
+# (logged to INTENT_LOG_PATH).
+
+import json
+import math
+import re
+import threading
+import zlib
+
+from config import INTENT_MODEL_PATH, INTENT_LOG_PATH, INTENT_THRESHOLD
+from metadata import AVAILABLE_STATES, STATE_ALIASES, COMMON_CROPS, WATER_USAGE_CROPS
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+GREETINGS = ['hello', 'hi', 'hey', 'thanks', 'thank you', 'bye', 'goodbye',
+             'ok', 'okay', 'cool', 'great', 'awesome', 'good', 'nice']
+
+ASSISTANT_QUESTIONS = ['who are you', 'what are you', 'what can you do', 'what is your name',
+                       'how are you', 'tell me about yourself', 'what do you do']
+
+STRONG_KEYWORDS = [
+    'crop', 'rain', 'rainfall', 'production', 'irrigation', 'harvest', 'farming', 'cultivation',
+    'paddy', 'district', 'yield', 'drip', 'water usage', 'kharif', 'rabi', 'monsoon',
+    'productivity', 'hectare', 'tonne', 'ton', 'ministry of agriculture', 'agriculture', 'agricultural'
+]
+
+WEAK_KEYWORDS = [
+    'data', 'statistics', 'compare', 'trend', 'highest', 'lowest', 'average', 'total',
+    'state', 'india', 'government', 'annual', 'season', 'area', 'traditional'
+]
+
+DEFINITION_PATTERNS = ['what is', 'what are', 'define', 'meaning of', 'explain']
+
+# Words that ask for figures rather than a definition
+ACTION_WORDS = ['compare', 'show', 'list', 'find', 'get', 'analyze', 'analyse', 'data', 'statistics',
+                'production', 'trend', 'highest', 'lowest', 'top', 'how much', 'how many']
+
+def _crop_words():
+    words = set()
+    for crop in COMMON_CROPS + WATER_USAGE_CROPS:
+        # "Moong(Green Gram)" -> moong, green gram; "Arhar/Tur" -> arhar, tur
+        for part in re.split(r"[()/&,]", crop.lower()):
+            part = part.strip()
+            if len(part) > 2 and part not in ('lint',):
+                words.add(part)
+    return sorted(words)
+
+def _build_keyword_table():
+    """{phrase: signals it sets} over every keyword list"""
+    table = {}
+    for category, words in (('strong', STRONG_KEYWORDS + _crop_words()),
+                            ('state', AVAILABLE_STATES + [a for a in STATE_ALIASES if len(a) > 3]),
+                            ('weak', WEAK_KEYWORDS),
+                            ('definition', DEFINITION_PATTERNS),
+                            ('action', ACTION_WORDS),
+                            ('assistant', ASSISTANT_QUESTIONS)):
+        for word in words:
+            phrase = " ".join(re.findall(r"[a-z0-9]+", word.lower()))
+            table.setdefault(phrase, set()).add(category)
+    return {phrase: frozenset(c) for phrase, c in table.items()}
+
+def _trie_pattern(phrases):
+    """
+    Regex alternation shaped as a character trie ("ra(?:bi|in(?:fall)?)" instead
+    of "rabi|rain|rainfall"), so the engine branches once per character instead
+    of retrying every phrase at every position. Greedy, so longer phrases win.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if '' in node:
+            body = (body if len(branches) > 1 else f"(?:{body})") + "?"
+        return body
+
+    return emit(trie)
+
+_KEYWORDS = _build_keyword_table()
+# Keyword (plural 's'/'es' allowed) or a year, at word boundaries. The lookbehind
+# (rather than a leading \b) keeps the engine's first-character fast path.
+_MATCHER = re.compile(r"(?<![a-z0-9])(?:(" + _trie_pattern(_KEYWORDS) + r")(?:e?s)?|((?:19|20)\d\d))\b")
+# Abbreviations ("UP", "MP", "J&K") only count in capitals - "up" is not a state
+_STATE_ABBREVIATION_RE = re.compile(
+    r"(?<![\w&])(?:" + "|".join(re.escape(a) for a in STATE_ALIASES if len(a) <= 3) + r")(?![\w&])"
+)
+_GREETINGS = frozenset(GREETINGS)
+
+def extract_signals(question):
+    """
+    Keyword signals used by both the rules and the model (one regex scan)
+
+    Returns:
+        Set of signal names: 'strong', 'state', 'weak', 'year', 'definition', 'action', 'assistant'
+    """
+    found = set()
+    for keyword, year in _MATCHER.findall(question.lower()):
+        if keyword:
+            found |= _KEYWORDS[keyword]
+        else:
+            found.add('year')
+    if 'state' not in found and _STATE_ABBREVIATION_RE.search(question):
+        found.add('state')
+    return found
+
+def rule_decision(signals):
+    """Keyword rules: True if the question needs data"""
+    if 'strong' in signals or 'state' in signals:
+        # "What is kharif?" is a definition; "What is the kharif rice output in Punjab?" is not
+        specific = 'state' in signals or 'year' in signals or 'action' in signals
+        return specific or 'definition' not in signals
+    # Generic words ('india', 'average', 'data') only matter next to a year
+    return 'weak' in signals and 'year' in signals
+
+# ---------------------------------------------------------------------------
+# Hashed n-gram logistic regression
+# ---------------------------------------------------------------------------
+
+HASH_DIM = 2 ** 14
+
+def featurize(question):
+    """
+    Hashed feature indices: word unigrams, bigrams and the matcher's signals
+
+    Returns:
+        List of indices into a HASH_DIM weight vector (duplicates count twice)
+    """
+    question_lower = question.lower()
+    tokens = re.findall(r"[a-z0-9]+", question_lower)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    grams += [f"__{name}__" for name in sorted(extract_signals(question))]
+    return [zlib.crc32(g.encode('utf-8')) % HASH_DIM for g in grams]
+
+class IntentModel:
+    """
+    Logistic regression over hashed features (weights from scripts/train_intent_classifier.py)
+
+    Args:
+        bias: Intercept
+        weights: {feature index: weight} (sparse)
+    """
+
+    def __init__(self, bias, weights):
+        self.bias = bias
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('hash_dim') != HASH_DIM:
+            raise ValueError(f"model was trained with hash_dim={data.get('hash_dim')}, expected {HASH_DIM}")
+        return cls(data['bias'], {int(i): w for i, w in data['weights'].items()})
+
+    def predict_proba(self, question):
+        """Probability that the question needs data"""
+        z = self.bias + sum(self.weights.get(i, 0.0) for i in featurize(question))
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_model():
+    """Trained model, or None if INTENT_MODEL_PATH is unset or missing"""
+    global _model, _model_loaded
+    if _model_loaded:
+        return _model
+    with _model_lock:
+        if not _model_loaded:
+            if INTENT_MODEL_PATH:
+                try:
+                    _model = IntentModel.load(INTENT_MODEL_PATH)
+                    logger.info("🧭 Intent model loaded from %s (%d weights)", INTENT_MODEL_PATH, len(_model.weights))
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("⚠️ Ignoring intent model %s: %.200s", INTENT_MODEL_PATH, e)
+            _model_loaded = True
+    return _model
+
+def is_data_question(question):
+    """
+    Route a question: True if it needs agriculture data, False for general questions
+
+    Greetings and questions about the assistant are always general; everything
+    else goes to the trained model if there is one, else to the keyword rules.
+    """
+    if question.lower().strip() in _GREETINGS:
+        return False
+
+    signals = extract_signals(question)
+    if 'assistant' in signals:
+        return False
+
+    model = get_model()
+    if model is not None:
+        return model.predict_proba(question) >= INTENT_THRESHOLD
+
+    return rule_decision(signals)
+
+_log_lock = threading.Lock()
+
+def record_label(question, is_data_query):
+    """Append a labelled question to INTENT_LOG_PATH (training data for the model)"""
+    if not INTENT_LOG_PATH:
+        return
+    line = json.dumps({'question': question, 'is_data_query': bool(is_data_query)}, ensure_ascii=False)
+    try:
+        with _log_lock, open(INTENT_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning("⚠️ Could not log intent label: %.200s", e)
@@ -0,0 +1,77 @@
+# json_decode.py
+# Fast, lean decoding of data.gov.in responses
+# Decodes straight from the response bytes with msgspec (typed structs that
+# only declare the fields we read, so every other field is skipped without
+# being materialized), falling back to orjson or the standard json module.
+# Records can also be filtered while decoding so rejected rows are never kept.
+
+from typing import Any
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import json
+
+# Fields each dataset's consumers actually read
+RAINFALL_ANNUAL_FIELDS = ('sd_name', 'subdivision', 'year', 'annual')
+RAINFALL_MONTHLY_FIELDS = ('sd_name', 'subdivision', 'year',
+                           'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+                           'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+CROP_FIELDS = ('state_name', 'district_name', 'crop', 'crop_year', 'season', 'production_', 'area_')
+
+# Response-level metadata kept alongside the records (see delta_sync.py)
+ENVELOPE_FIELDS = ('total', 'count', 'updated')
+
+_decoders = {}
+
+def _msgspec_decoder(fields):
+    """msgspec decoder for an envelope whose records only declare `fields` (built once per field set)"""
+    decoder = _decoders.get(fields)
+    if decoder is None:
+        record = msgspec.defstruct('Record', [(f, Any, msgspec.UNSET) for f in fields])
+        envelope = msgspec.defstruct(
+            'Envelope', [('records', list[record], [])] + [(f, Any, msgspec.UNSET) for f in ENVELOPE_FIELDS]
+        )
+        decoder = _decoders[fields] = msgspec.json.Decoder(envelope)
+    return decoder
+
+def _loads(content):
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+def decode_response(content, fields=None, keep=None):
+    """
+    Decode a data.gov.in JSON response
+
+    Args:
+        content: Raw response body (bytes or str)
+        fields: Record fields to keep (None = keep every field)
+        keep: Optional predicate on a decoded record; records it rejects are dropped
+
+    Returns:
+        Dictionary shaped like response.json(): 'records' plus total/count/updated when present
+    """
+    if fields is not None and msgspec is not None:
+        fields = tuple(fields)
+        envelope = _msgspec_decoder(fields).decode(content)
+        records = []
+        for r in envelope.records:
+            record = {f: v for f in fields if (v := getattr(r, f)) is not msgspec.UNSET}
+            if keep is None or keep(record):
+                records.append(record)
+        data = {f: v for f in ENVELOPE_FIELDS if (v := getattr(envelope, f)) is not msgspec.UNSET}
+        data['records'] = records
+        return data
+
+    data = _loads(content)
+    raw = data.get('records') or []
+    if fields is not None:
+        raw = ({f: r[f] for f in fields if f in r} for r in raw)
+    data['records'] = [r for r in raw if keep is None or keep(r)]
+    return data
@@ -0,0 +1,95 @@
+# logging_setup.py
+# Thread-safe, non-blocking logging for the app modules
+# Loggers hand records to a queue; one background listener thread writes them
+# out, so fetch/parse threads never block on I/O. Every record carries the
+# correlation id of the question being answered (a contextvar, so concurrent
+# Streamlit sessions and worker threads never mix their ids up).
+
+import atexit
+import contextvars
+import functools
+import logging
+import logging.handlers
+import queue
+import threading
+import uuid
+
+from config import ENABLE_DEBUG_MODE
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"
+
+request_id_var = contextvars.ContextVar('request_id', default='-')
+# Browser session asking the current question (for per-session accounting)
+session_id_var = contextvars.ContextVar('session_id', default='-')
+
+_listener = None
+_setup_lock = threading.Lock()
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current request's correlation id"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+def setup_logging(level=None):
+    """
+    Configure the 'samarth' logger once per process
+
+    Args:
+        level: Logging level (default: DEBUG in debug mode, otherwise WARNING)
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        root = logging.getLogger('samarth')
+        root.setLevel(level or (logging.DEBUG if ENABLE_DEBUG_MODE else logging.WARNING))
+        root.propagate = False
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # The filter must run on the producing thread, where the contextvar is set
+        queue_handler.addFilter(RequestIdFilter())
+        root.addHandler(queue_handler)
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+def get_logger(name):
+    """Module logger under the 'samarth' hierarchy, e.g. get_logger(__name__)"""
+    setup_logging()
+    return logging.getLogger(f"samarth.{name}")
+
+def start_request(session_id=None):
+    """
+    Assign a new correlation id to the current context
+
+    Args:
+        session_id: Session asking the question (kept in session_id_var)
+
+    Returns:
+        (request id, token for end_request)
+    """
+    request_id = uuid.uuid4().hex[:8]
+    session_token = session_id_var.set(session_id) if session_id else None
+    return request_id, (request_id_var.set(request_id), session_token)
+
+def end_request(token):
+    request_token, session_token = token
+    request_id_var.reset(request_token)
+    if session_token is not None:
+        session_id_var.reset(session_token)
+
+def bind_context(func):
+    """
+    Wrap func to run in a copy of the caller's context
+
+    Thread pools do not inherit contextvars; submit bind_context(func)
+    instead of func so worker log lines keep the request's correlation id.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
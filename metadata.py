@@ -197,6 +197,42 @@ SUBDIVISION_TO_STATE = {
     "LAKSHADWEEP": ["Lakshadweep"]
 }
 
+# Approximate area (sq km) of each state lying in each of its subdivisions,
+# used to weight subdivision rainfall into a state figure. States covered by
+# a single subdivision need no entry; missing entries get equal weight.
+STATE_SUBDIVISION_AREA_KM2 = {
+    "Uttar Pradesh": {"EAST UTTAR PRADESH": 146000, "WEST UTTAR PRADESH": 95000},
+    "Rajasthan": {"WEST RAJASTHAN": 197000, "EAST RAJASTHAN": 145000},
+    "Madhya Pradesh": {"WEST MADHYA PRADESH": 171000, "EAST MADHYA PRADESH": 137000},
+    "Maharashtra": {"KOKAN & GOA": 30700, "MADHYA MAHARASHTRA": 115000,
+                    "MARATWADA": 64800, "VIDARBHA": 97400},
+    "Karnataka": {"COASTAL KARNATAKA": 18000, "NORTH INTERIOR KARNATAKA": 80000,
+                  "SOUTH INTERIOR KARNATAKA": 93800},
+    "Andhra Pradesh": {"COSTAL ANDHRA PRADESH": 92900, "RAYALSEEMA": 67500},
+    "West Bengal": {"SUB-HIMALAYAN W BENGAL & SIKKIM": 21800, "GANGETIC WEST BENGAL": 66900},
+    "Gujarat": {"GUJARAT REGION, DADRA & NAGAR HAVELI": 91000, "SAURASHTRA KUTCH & DIU": 105000},
+}
+
+# Example questions shown in the sidebar (also pre-warmed by cache_warmer.py)
+EXAMPLE_QUESTIONS = [
+    {
+        'short': 'Q1: Multi-State Comparison',
+        'full': 'Compare the average annual rainfall in Punjab and Haryana for 2010-2014. Also list the top 3 most produced crops (by volume) in each state during 2014.'
+    },
+    {
+        'short': 'Q2: District Extremes',
+        'full': 'Identify the district in Punjab with the highest wheat production in 2014 and compare that with the district with the lowest wheat production in Haryana in 2014.'
+    },
+    {
+        'short': 'Q3: Trend Analysis',
+        'full': 'Analyze the rice production trend in Punjab from 2010 to 2014. Correlate this trend with the rainfall pattern during the same period and provide a summary of the apparent impact.'
+    },
+    {
+        'short': 'Q4: Policy Recommendation',
+        'full': 'A policy advisor is proposing to promote cotton cultivation with drip irrigation over traditional methods in Maharashtra. Based on 2010-2014 data, what are the three most compelling data-backed arguments to support this policy?'
+    }
+]
+
 def normalize_state_name(state_name):
     """
     Normalize state name using aliases
@@ -240,6 +276,42 @@ def get_subdivision_for_state(state_name):
     # If not found, return uppercased state name as fallback
     return normalized_state.upper()
 
+def get_subdivisions_for_state(state_name):
+    """
+    Given a state name, find every rainfall subdivision covering it
+    
+    Example: get_subdivisions_for_state("Uttar Pradesh") returns
+    ["EAST UTTAR PRADESH", "WEST UTTAR PRADESH"]
+    """
+    normalized_state = normalize_state_name(state_name)
+    
+    subdivisions = [subdivision for subdivision, states in SUBDIVISION_TO_STATE.items()
+                    if normalized_state in states]
+    
+    # If not found, fall back to the uppercased state name (as get_subdivision_for_state)
+    return subdivisions or [normalized_state.upper()]
+
+def get_subdivision_weights(state_name, equal=False):
+    """
+    Relative weight of each subdivision in a state's rainfall (sums to 1)
+    
+    Args:
+        state_name: Name of the state
+        equal: Ignore areas and weight every subdivision equally
+    
+    Returns:
+        {subdivision: weight}
+    """
+    subdivisions = get_subdivisions_for_state(state_name)
+    areas = {} if equal else STATE_SUBDIVISION_AREA_KM2.get(normalize_state_name(state_name), {})
+    
+    raw = {sd: areas.get(sd) for sd in subdivisions}
+    if any(area is None for area in raw.values()):
+        raw = {sd: 1 for sd in subdivisions}
+    
+    total = sum(raw.values())
+    return {sd: area / total for sd, area in raw.items()}
+
 def validate_state(state_name):
     """Check if a state exists in our data (with alias support)"""
     normalized_state = normalize_state_name(state_name)
@@ -0,0 +1,254 @@
+# metrics.py
+# Process-wide counters and histograms in Prometheus text format
+# Upstream calls, retries by cause, cache hits/misses, bytes downloaded,
+# records fetched vs matched and per-stage latency. Exposed on a local
+# scrape endpoint (METRICS_PORT) and/or written to a file (METRICS_FILE).
+
+import functools
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_PORT, METRICS_HOST, METRICS_FILE, METRICS_FILE_INTERVAL, METRICS_LATENCY_BUCKETS
+from logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+REGISTRY = []
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+
+    Args:
+        name: Metric name (e.g. "samarth_upstream_requests_total")
+        documentation: HELP text
+        labelnames: Label names every inc() must supply
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels
+
+    Args:
+        name: Metric name (e.g. "samarth_stage_seconds")
+        documentation: HELP text
+        labelnames: Label names every observe() must supply
+        buckets: Upper bounds in ascending order (+Inf is added)
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', repr(float(bound)))])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {state[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+def timed(histogram, **labels):
+    """Decorator observing each call's duration in `histogram`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ============================================================================
+# APP METRICS
+# ============================================================================
+
+UPSTREAM_REQUESTS = Counter(
+    "samarth_upstream_requests_total", "HTTP requests made to data.gov.in (including retries)",
+    ["dataset", "outcome"])
+UPSTREAM_RETRIES = Counter(
+    "samarth_upstream_retries_total", "data.gov.in retries by cause (timeout, request_exception)",
+    ["dataset", "cause"])
+UPSTREAM_HEDGES = Counter(
+    "samarth_upstream_hedges_total", "Duplicate requests sent after a request passed the p95 latency",
+    ["dataset"])
+UPSTREAM_BYTES = Counter(
+    "samarth_upstream_bytes_total", "Response bytes downloaded from data.gov.in", ["dataset"])
+UPSTREAM_CIRCUIT_OPENS = Counter(
+    "samarth_upstream_circuit_opens_total", "Times a dataset's circuit breaker opened after repeated failures",
+    ["dataset"])
+UPSTREAM_LATENCY = Histogram(
+    "samarth_upstream_request_seconds", "Latency of single data.gov.in requests", ["dataset"])
+
+GEMINI_CALLS = Counter(
+    "samarth_gemini_calls_total", "Gemini calls by final outcome (success, rate_limit, timeout, blocked, api_error)",
+    ["outcome"])
+GEMINI_RETRIES = Counter(
+    "samarth_gemini_retries_total", "Gemini retries by cause (rate_limit = 429/quota, timeout, error)", ["cause"])
+GEMINI_LATENCY = Histogram(
+    "samarth_gemini_request_seconds", "Latency of single Gemini generate_content calls")
+GEMINI_TOKENS = Counter(
+    "samarth_gemini_tokens_total", "Gemini tokens by pipeline stage and kind (prompt, output)", ["stage", "kind"])
+GEMINI_OVER_BUDGET = Counter(
+    "samarth_gemini_over_budget_total", "Gemini calls whose prompt exceeded the stage's token budget", ["stage"])
+
+CACHE_REQUESTS = Counter(
+    "samarth_cache_requests_total", "Response cache lookups by fetch function and result (hit, miss, stale)",
+    ["function", "result"])
+
+RECORDS_FETCHED = Counter(
+    "samarth_records_fetched_total", "Upstream records behind each answer's data (total_fetched)", ["dataset"])
+RECORDS_MATCHED = Counter(
+    "samarth_records_matched_total", "Records that matched the question's filters (total_matched)", ["dataset"])
+
+STAGE_LATENCY = Histogram(
+    "samarth_stage_seconds", "Latency of each question-answering stage", ["stage"])
+
+ADMISSIONS = Counter(
+    "samarth_admissions_total", "Questions by admission outcome (admitted, quota, session_rate, ip_rate, "
+    "queue_full, queue_timeout)", ["outcome"])
+ADMISSION_WAIT = Histogram(
+    "samarth_admission_wait_seconds", "Time admitted questions waited in the fair queue")
+
+def render():
+    """All registered metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent; keep them out of the app log
+        pass
+
+def write_metrics_file(path):
+    """Atomically write the current metrics to `path` (for node_exporter's textfile collector etc.)"""
+    # Unique temp name - every worker process writes the same file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render())
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; the collector usually runs as another user
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def start_metrics_export(port=METRICS_PORT, host=METRICS_HOST, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    """
+    Start the scrape endpoint and/or file writer (once per process)
+
+    Args:
+        port: Serve /metrics on this port (None = no endpoint)
+        host: Interface to bind (local only by default)
+        path: Also write metrics to this file every `interval` seconds (None = no file)
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("⚠️ Metrics endpoint not started on %s:%s: %s", host, port, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info("📈 Serving metrics on http://%s:%s/metrics", host, port)
+
+    if path:
+        def write_loop():
+            while True:
+                try:
+                    write_metrics_file(path)
+                except OSError as e:
+                    logger.warning("⚠️ Could not write metrics to %s: %s", path, e)
+                time.sleep(interval)
+        threading.Thread(target=write_loop, name="metrics-file", daemon=True).start()
@@ -0,0 +1,164 @@
+# prefetch.py
+# Speculative data prefetch
+# While Gemini is still parsing the question, a cheap local scan of the text
+# guesses the states/crops/years it needs and starts those fetches, so network
+# time overlaps LLM time. Once the real parse lands, matching fetches are kept
+# (execute_plan picks them up through the shared cache) and the rest cancelled.
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PREFETCH_MAX_WORKERS, PREFETCH_MAX_FETCHES
+from metadata import AVAILABLE_STATES, STATE_ALIASES, COMMON_CROPS, CROP_YEAR_MAX
+from gemini_handler import determine_required_apis
+from query_planner import build_query_plan
+from logging_setup import get_logger, bind_context
+
+logger = get_logger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+
+def _build_state_patterns():
+    """(compiled regex, canonical state) pairs; short all-caps aliases like UP/AP match case-sensitively"""
+    patterns = []
+    for state in AVAILABLE_STATES:
+        patterns.append((re.compile(rf"\b{re.escape(state)}\b", re.IGNORECASE), state))
+    for alias, state in STATE_ALIASES.items():
+        flags = 0 if alias.isupper() else re.IGNORECASE
+        patterns.append((re.compile(rf"(?<![\w&]){re.escape(alias)}(?![\w&])", flags), state))
+    return patterns
+
+def _build_crop_patterns():
+    """(compiled regex, crop) pairs - 'Cotton(lint)' matches 'cotton', 'Arhar/Tur' matches 'arhar' or 'tur'"""
+    patterns = []
+    for crop in COMMON_CROPS:
+        words = re.split(r"[/()&]", crop)
+        words = [w.strip() for w in words if len(w.strip()) > 2]
+        name = words[0].title()
+        for word in words:
+            patterns.append((re.compile(rf"\b{re.escape(word)}\b", re.IGNORECASE), name))
+    patterns.append((re.compile(r"\bpaddy\b", re.IGNORECASE), "Rice"))
+    return patterns
+
+STATE_PATTERNS = _build_state_patterns()
+CROP_PATTERNS = _build_crop_patterns()
+YEAR_RANGE_PATTERN = re.compile(r"\b((?:19|20)\d{2})\s*(?:-|–|to|until|through)\s*((?:19|20)\d{2})\b", re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+LAST_N_YEARS_PATTERN = re.compile(r"\blast\s+(\d{1,2})\s+years\b", re.IGNORECASE)
+SEASON_PATTERN = re.compile(r"\b(kharif|rabi|monsoon|jjas|ond)\b", re.IGNORECASE)
+
+def guess_entities(question):
+    """
+    Guess the parse of a question locally (no LLM)
+
+    Returns:
+        Dictionary in the same shape as parse_user_question's output
+    """
+    states = []
+    for pattern, state in STATE_PATTERNS:
+        if state not in states and pattern.search(question):
+            states.append(state)
+
+    crops = []
+    for pattern, crop in CROP_PATTERNS:
+        if crop not in crops and pattern.search(question):
+            crops.append(crop)
+
+    years = set()
+    for start, end in YEAR_RANGE_PATTERN.findall(question):
+        start, end = int(start), int(end)
+        if start <= end:
+            years.update(range(start, end + 1))
+    years.update(int(y) for y in YEAR_PATTERN.findall(question))
+    last_n = LAST_N_YEARS_PATTERN.search(question)
+    if last_n and not years:
+        n = int(last_n.group(1))
+        years.update(range(CROP_YEAR_MAX - n + 1, CROP_YEAR_MAX + 1))
+
+    question_lower = question.lower()
+    metrics = []
+    season_match = SEASON_PATTERN.search(question)
+    if season_match:
+        metrics.append('seasonal_rainfall')
+    elif 'rain' in question_lower:
+        metrics.append('rainfall')
+    if any(word in question_lower for word in ['production', 'produced', 'crop', 'yield']):
+        metrics.append('production')
+    if any(word in question_lower for word in ['water', 'drip', 'irrigation']):
+        metrics.append('water')
+
+    return {
+        'success': True,
+        'parsed': {
+            'intent': 'policy' if 'water' in metrics else 'general',
+            'entities': {
+                'states': states,
+                'crops': crops,
+                'years': sorted(years),
+                'metrics': metrics,
+                'season': season_match.group(1) if season_match else None
+            }
+        }
+    }
+
+class SpeculativePrefetch:
+    """
+    Upstream fetches started on a guessed parse
+
+    Args:
+        question: The user's question
+    """
+
+    def __init__(self, question):
+        self.guess = guess_entities(question)
+        self.plan = build_query_plan(determine_required_apis(self.guess))
+        self.futures = {}
+
+        # Only the uncached network fetches are worth starting early
+        nodes = [n for n in self.plan['nodes'].values() if n['dataset'] and not n['cached']]
+        for node in nodes[:PREFETCH_MAX_FETCHES]:
+            self.futures[node['id']] = _executor.submit(bind_context(node['func']), **node['kwargs'])
+
+        if self.futures:
+            logger.info("🔮 Speculatively prefetching: %s", list(self.futures))
+
+    def reconcile(self, plan):
+        """
+        Keep prefetches the real plan needs, cancel the rest
+
+        Fetches that already started cannot be interrupted; they finish and
+        simply leave their result in the cache.
+
+        Returns:
+            (kept node ids, cancelled node ids)
+        """
+        kept, cancelled = [], []
+        for node_id, future in self.futures.items():
+            real = plan['nodes'].get(node_id)
+            if real and real['kwargs'] == self.plan['nodes'][node_id]['kwargs']:
+                kept.append(node_id)
+            elif future.cancel():
+                cancelled.append(node_id)
+
+        if self.futures:
+            logger.info("🔮 Prefetch kept %s, cancelled %s", kept, cancelled)
+        return kept, cancelled
+
+    def cancel(self):
+        """Cancel everything not yet started (e.g. the question was not a data query)"""
+        for future in self.futures.values():
+            future.cancel()
+
+def start_speculative_prefetch(question):
+    """
+    Start speculative fetches for a question
+
+    Returns:
+        SpeculativePrefetch, or None if the local scan found nothing to fetch
+    """
+    try:
+        speculation = SpeculativePrefetch(question)
+    except Exception as e:
+        logger.warning("⚠️ Speculative prefetch skipped: %.100s", e)
+        return None
+    return speculation if speculation.futures else None
@@ -0,0 +1,255 @@
+# query_planner.py
+# Cost-based query planner
+# Turns the APIs a question needs into a minimal DAG of fetches: duplicate
+# requests are merged, shared upstream blocks are fetched once, cached data
+# costs nothing, and independent fetches run in parallel
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DATASET_COST_ESTIMATES, ENABLE_PARALLEL_FETCHING, PLANNER_MAX_WORKERS
+from metadata import CROP_YEAR_MAX
+from data_fetcher import (
+    fetch_rainfall_annual_block, fetch_rainfall_annual, fetch_rainfall_monthly,
+    fetch_rainfall_seasonal, fetch_crop_production, fetch_water_usage
+)
+from logging_setup import get_logger, bind_context
+from metrics import RECORDS_FETCHED, RECORDS_MATCHED, STAGE_LATENCY, timed
+
+logger = get_logger(__name__)
+
+def _is_cached(func, kwargs):
+    """True if a cached fetch function already holds fresh data for these arguments"""
+    if not hasattr(func, 'expires_in'):
+        return False
+    expires_in = func.expires_in(**kwargs)
+    return expires_in is not None and expires_in > 0
+
+def _make_node(node_id, func, kwargs, dataset=None, depends_on=None, result_key=None, source=None):
+    """
+    Build one plan node
+
+    Args:
+        node_id: Unique id within the plan
+        func: Fetch function to call with **kwargs
+        dataset: Key into DATASET_COST_ESTIMATES if this node hits the network (None = local derivation)
+        depends_on: Node ids that must finish first
+        result_key: Key in fetched_data for the result (None = intermediate node)
+        source: Dict with 'purpose'/'dataset' labels for the Data Sources panel
+    """
+    cached = dataset is None or _is_cached(func, kwargs)
+    cost = DATASET_COST_ESTIMATES.get(dataset, {}) if not cached else {}
+    return {
+        'id': node_id,
+        'func': func,
+        'kwargs': kwargs,
+        'dataset': dataset,
+        'depends_on': depends_on or [],
+        'result_key': result_key,
+        'source': source,
+        'cached': cached,
+        'est_latency': cost.get('latency', 0.0),
+        'est_requests': cost.get('requests', 0)
+    }
+
+def _year_range(years):
+    return f"{min(years)}-{max(years)}" if years else "all years"
+
+@timed(STAGE_LATENCY, stage='plan')
+def build_query_plan(apis_needed):
+    """
+    Build a minimal execution plan from determine_required_apis output
+
+    Args:
+        apis_needed: List of API specs ({'api': 'rainfall', 'states': [...], ...})
+
+    Returns:
+        Dictionary with 'nodes' (by id), 'stages' (lists of node ids that can
+        run in parallel, in order) and 'estimate' (cost before running)
+    """
+    nodes = {}
+
+    def add(node):
+        # Merge: identical requests collapse onto the first node
+        if node['id'] not in nodes:
+            nodes[node['id']] = node
+        return node['id']
+
+    # Merge overlapping specs of the same kind first
+    rainfall_years = {}
+    seasonal = {}
+    crop_requests = {}
+    water_crops = []
+
+    for spec in apis_needed:
+        years = spec.get('years') or []
+
+        if spec['api'] == 'rainfall':
+            for state in spec.get('states', []):
+                rainfall_years.setdefault(state, set()).update(years)
+
+        elif spec['api'] == 'rainfall_seasonal':
+            for state in spec.get('states', []):
+                seasonal.setdefault((state, spec.get('season')), set()).update(years)
+
+        elif spec['api'] == 'crops':
+            year = max(years) if years else CROP_YEAR_MAX
+            for state in spec.get('states', []):
+                for crop in (spec.get('crops') or [None]):
+                    crop_requests[(state, crop, year)] = True
+
+        elif spec['api'] == 'water':
+            for crop in spec.get('crops') or [None]:
+                if crop not in water_crops:
+                    water_crops.append(crop)
+
+    # Annual rainfall: one shared upstream block, then a local filter per state
+    if rainfall_years:
+        block_id = add(_make_node('rainfall_block', fetch_rainfall_annual_block, {}, dataset='rainfall'))
+        for state, years in rainfall_years.items():
+            years = sorted(years)
+            add(_make_node(
+                f"rainfall_{state}", fetch_rainfall_annual, {'state_name': state, 'years': years},
+                depends_on=[block_id], result_key=f"rainfall_{state}",
+                source={'purpose': f'Rainfall data for {state} ({_year_range(years)})',
+                        'dataset': 'IMD Rainfall Data'}
+            ))
+
+    # Seasonal rainfall: one shared monthly dataset, then vectorized totals per state
+    if seasonal:
+        monthly_id = add(_make_node('rainfall_monthly', fetch_rainfall_monthly, {}, dataset='rainfall_monthly'))
+        for (state, season), years in seasonal.items():
+            years = sorted(years)
+            add(_make_node(
+                f"rainfall_seasonal_{state}_{season}", fetch_rainfall_seasonal,
+                {'state_name': state, 'years': years, 'season': season},
+                depends_on=[monthly_id], result_key=f"rainfall_seasonal_{state}_{season}",
+                source={'purpose': f'{season} rainfall for {state} ({_year_range(years)})',
+                        'dataset': 'IMD Monthly Rainfall Data'}
+            ))
+
+    # Crop production: one request per (state, crop, year)
+    for state, crop, year in crop_requests:
+        key = f"crops_{state}" if crop is None else f"crops_{state}_{crop}"
+        add(_make_node(
+            key, fetch_crop_production, {'state_name': state, 'crop_name': crop, 'year': year},
+            dataset='crops', result_key=key,
+            source={'purpose': f'Crop production for {state} in {year}' + (f' ({crop})' if crop else ''),
+                    'dataset': 'Ministry of Agriculture - Crop Production'}
+        ))
+
+    # Water usage: per crop, or the whole (8 crop) dataset
+    for crop in water_crops:
+        key = f"water_{crop}" if crop else "water_all"
+        add(_make_node(
+            key, fetch_water_usage, {'crop_name': crop},
+            dataset='water', result_key=key,
+            source={'purpose': f'Water efficiency data for {crop or "all crops"}',
+                    'dataset': 'ICAR Water Efficiency Comparison'}
+        ))
+
+    # Topological stages: every node runs after the stage holding its dependencies
+    stages = []
+    placed = {}
+    remaining = list(nodes)
+    while remaining:
+        ready = [n for n in remaining if all(d in placed for d in nodes[n]['depends_on'])]
+        stage = len(stages)
+        for n in ready:
+            placed[n] = stage
+        stages.append(ready)
+        remaining = [n for n in remaining if n not in placed]
+
+    plan = {'nodes': nodes, 'stages': stages}
+    plan['estimate'] = estimate_plan_cost(plan)
+    return plan
+
+def estimate_plan_cost(plan):
+    """
+    Estimate the cost of a plan before running it
+
+    Returns:
+        Dictionary with upstream request count, estimated wall-clock latency
+        (slowest node per stage, as stages run in parallel), the sequential
+        latency for comparison, and how many nodes are served from cache
+    """
+    nodes = plan['nodes']
+    requests_total = sum(n['est_requests'] for n in nodes.values())
+    sequential = sum(n['est_latency'] for n in nodes.values())
+    parallel = sum(max((nodes[n]['est_latency'] for n in stage), default=0.0) for stage in plan['stages'])
+    cached = sum(1 for n in nodes.values() if n['cached'] and n['dataset'])
+    network = sum(1 for n in nodes.values() if n['dataset'])
+
+    return {
+        'upstream_requests': requests_total,
+        'est_latency': parallel if ENABLE_PARALLEL_FETCHING else sequential,
+        'est_sequential_latency': sequential,
+        'cached_fetches': cached,
+        'network_fetches': network
+    }
+
+def describe_plan(plan):
+    """One-line human readable summary of a plan"""
+    est = plan['estimate']
+    return (f"{len(plan['nodes'])} steps in {len(plan['stages'])} stage(s), "
+            f"{est['network_fetches']} fetch(es) ({est['cached_fetches']} cached), "
+            f"~{est['upstream_requests']} upstream request(s), ~{est['est_latency']:.1f}s")
+
+def _run_node(node):
+    return node['func'](**node['kwargs'])
+
+@timed(STAGE_LATENCY, stage='fetch')
+def execute_plan(plan, parallel=ENABLE_PARALLEL_FETCHING):
+    """
+    Run a plan stage by stage
+
+    Args:
+        plan: Plan from build_query_plan
+        parallel: Run the nodes of each stage concurrently
+
+    Returns:
+        (fetched_data, api_calls_made) in the shape app.py displays
+    """
+    nodes = plan['nodes']
+    results = {}
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("🗺️ Query plan: %s", describe_plan(plan))
+
+    for stage in plan['stages']:
+        if parallel and len(stage) > 1:
+            with ThreadPoolExecutor(max_workers=min(PLANNER_MAX_WORKERS, len(stage))) as executor:
+                # bind_context keeps the request's correlation id in worker log lines
+                futures = {n: executor.submit(bind_context(_run_node), nodes[n]) for n in stage}
+                for node_id, future in futures.items():
+                    results[node_id] = future.result()
+        else:
+            for node_id in stage:
+                results[node_id] = _run_node(nodes[node_id])
+
+    fetched_data = {}
+    api_calls_made = []
+
+    for node_id, node in nodes.items():
+        if not node['result_key']:
+            continue
+
+        data = results[node_id]
+        # Store failed fetches too (check_all_apis_failed needs them)
+        fetched_data[node['result_key']] = data
+
+        if data.get('success'):
+            # Fetched = upstream records behind this answer, matched = records actually used
+            dataset = node['source']['dataset']
+            RECORDS_FETCHED.inc(data.get('total_fetched', data.get('total_records', 0)), dataset=dataset)
+            RECORDS_MATCHED.inc(data.get('total_matched', data.get('total_records', 0)), dataset=dataset)
+            api_calls_made.append({
+                'purpose': node['source']['purpose'],
+                'url': data.get('api_url', 'N/A'),
+                'records': data.get('total_matched', data.get('total_records', 0)),
+                'dataset': node['source']['dataset'],
+                # Served from cache/snapshot while the upstream was failing
+                'as_of': data.get('data_as_of') if data.get('stale') else None
+            })
+
+    return fetched_data, api_calls_made
@@ -0,0 +1,207 @@
+# rainfall_monthly.py
+# Compact time-series store for IMD sub-divisional monthly rainfall
+# Holds subdivision x year x month values in one dense float32 array
+# (36 x 117 x 12 values = ~200 KB) so seasonal totals are a single numpy gather
+
+import re
+
+import numpy as np
+
+from metadata import SUBDIVISIONS, RAINFALL_YEAR_MIN, RAINFALL_YEAR_MAX
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+          'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+MONTH_NAMES = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+
+# Named seasons as ordered month windows. A month lower than the one before it
+# belongs to the next calendar year (e.g. rabi Oct-Mar of 2010 ends in March 2011).
+SEASONS = {
+    'JF': (1, 2),                   # Winter
+    'MAM': (3, 4, 5),               # Pre-monsoon
+    'JJAS': (6, 7, 8, 9),           # South-west monsoon
+    'OND': (10, 11, 12),            # North-east monsoon / post-monsoon
+    'KHARIF': (6, 7, 8, 9, 10),     # Kharif sowing-to-harvest window
+    'RABI': (10, 11, 12, 1, 2, 3),  # Rabi window, spans the year boundary
+    'ANNUAL': tuple(range(1, 13)),
+}
+
+SEASON_ALIASES = {
+    'monsoon': 'JJAS', 'southwest monsoon': 'JJAS', 'south-west monsoon': 'JJAS', 'jun-sep': 'JJAS',
+    'northeast monsoon': 'OND', 'north-east monsoon': 'OND', 'post-monsoon': 'OND', 'oct-dec': 'OND',
+    'pre-monsoon': 'MAM', 'summer': 'MAM', 'winter': 'JF',
+    'kharif': 'KHARIF', 'rabi': 'RABI', 'annual': 'ANNUAL', 'year': 'ANNUAL'
+}
+
+def resolve_season(season):
+    """
+    Turn a season name or custom window into (label, months)
+
+    Accepts named seasons ("JJAS", "kharif", "monsoon") and custom month
+    windows ("Jun-Oct", "november to february"), with or without the
+    wording around them ("Kharif season", "the monsoon rains").
+
+    Returns:
+        (label, tuple of month numbers) or (None, None) if not recognised
+    """
+    if not season:
+        return None, None
+
+    # "Rabi Season", "the monsoon rains", "JJAS (season)" -> "rabi", "monsoon", "jjas"
+    text = re.sub(r"[\s_]+", " ", str(season).lower()).strip(" .,:;()'\"")
+    text = re.sub(r"^the ", "", text)
+    text = re.sub(r"(?: \(?(?:season|seasons|rainfall|rains|period)\)?)+$", "", text).strip()
+    key = text.upper()
+    if key in SEASONS:
+        return key, SEASONS[key]
+
+    alias = SEASON_ALIASES.get(text)
+    if alias:
+        return alias, SEASONS[alias]
+
+    # Custom window: "Jun-Oct", "june to october", "nov - feb"
+    normalized = text.replace(' to ', '-').replace(' ', '')
+    parts = normalized.split('-')
+    if len(parts) == 2 and parts[0] in MONTH_NAMES and parts[1] in MONTH_NAMES:
+        start, end = MONTH_NAMES[parts[0]], MONTH_NAMES[parts[1]]
+        length = (end - start) % 12 + 1
+        months = tuple((start - 1 + i) % 12 + 1 for i in range(length))
+        label = f"{MONTHS[start - 1].title()}-{MONTHS[end - 1].title()}"
+        return label, months
+
+    return None, None
+
+class MonthlyRainfallStore:
+    """
+    Dense subdivision x year x month rainfall array (mm), NaN where missing
+
+    Args:
+        values: float32 array of shape (len(SUBDIVISIONS), n_years, 12)
+        year_min: Calendar year of values[:, 0, :]
+    """
+
+    def __init__(self, values, year_min=RAINFALL_YEAR_MIN):
+        self.values = values
+        self.year_min = year_min
+        self._subdivision_index = {name.upper(): i for i, name in enumerate(SUBDIVISIONS)}
+
+    @classmethod
+    def empty(cls, year_min=RAINFALL_YEAR_MIN, year_max=RAINFALL_YEAR_MAX):
+        n_years = year_max - year_min + 1
+        values = np.full((len(SUBDIVISIONS), n_years, 12), np.nan, dtype=np.float32)
+        return cls(values, year_min)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build the store from raw API records
+
+        Records need a subdivision name ('subdivision' or 'sd_name'), a 'year'
+        and one field per month ('jan' ... 'dec'). Unknown subdivisions,
+        out-of-range years and non-numeric values are skipped.
+        """
+        store = cls.empty()
+        n_years = store.values.shape[1]
+
+        for r in records:
+            name = (r.get('subdivision') or r.get('sd_name') or '').strip().upper()
+            s = store._subdivision_index.get(name)
+            if s is None:
+                continue
+
+            try:
+                y = int(float(r.get('year', 0))) - store.year_min
+            except (ValueError, TypeError):
+                continue
+            if not 0 <= y < n_years:
+                continue
+
+            for m, month in enumerate(MONTHS):
+                try:
+                    store.values[s, y, m] = float(r.get(month))
+                except (ValueError, TypeError):
+                    continue
+
+        return store
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def subdivision_index(self, subdivision):
+        return self._subdivision_index.get(subdivision.upper())
+
+    def monthly(self, subdivision, year):
+        """Return the 12 monthly values for one subdivision and year (NaN if missing)"""
+        s = self.subdivision_index(subdivision)
+        y = year - self.year_min
+        if s is None or not 0 <= y < self.values.shape[1]:
+            return np.full(12, np.nan, dtype=np.float32)
+        return self.values[s, y]
+
+    def seasonal_totals(self, months, years, subdivisions=None):
+        """
+        Vectorized seasonal totals
+
+        Args:
+            months: Ordered month window, e.g. SEASONS['JJAS'] or (10, 11, 12, 1, 2, 3)
+            years: Season start years
+            subdivisions: Subdivision names (default: all)
+
+        Returns:
+            float32 array of shape (len(subdivisions), len(years)).
+            A season with any missing month (or running past the data) is NaN.
+        """
+        months = np.asarray(months, dtype=np.intp)
+        # Months that wrap past December belong to the following year
+        offsets = np.concatenate([[0], np.cumsum(np.diff(months) < 0)]).astype(np.intp)
+
+        if subdivisions is None:
+            rows = np.arange(self.values.shape[0])
+        else:
+            rows = np.array([self.subdivision_index(s) for s in subdivisions], dtype=object)
+            if any(r is None for r in rows):
+                raise ValueError(f"Unknown subdivision in {subdivisions}")
+            rows = rows.astype(np.intp)
+
+        year_idx = np.asarray(years, dtype=np.intp) - self.year_min
+
+        # Pad with NaN years so out-of-range lookups become NaN instead of errors
+        pad = int(offsets.max()) + 1 if len(offsets) else 1
+        n_years = self.values.shape[1]
+        padded = np.full((len(rows), n_years + 2 * pad, 12), np.nan, dtype=np.float32)
+        padded[:, pad:pad + n_years] = self.values[rows]
+
+        y = np.clip(year_idx[:, None] + offsets[None, :] + pad, 0, n_years + 2 * pad - 1)
+        gathered = padded[:, y, months[None, :] - 1]  # (S, Y, W)
+        return gathered.sum(axis=2)
+
+    def weighted_seasonal_totals(self, months, years, weights):
+        """
+        Seasonal totals combined over several subdivisions (e.g. a state's)
+
+        Args:
+            months: Ordered month window
+            years: Season start years
+            weights: {subdivision: weight}; unknown subdivisions are ignored
+
+        Returns:
+            float32 array of len(years). Subdivisions missing a year are left
+            out and the remaining weights renormalized; NaN if none has data.
+        """
+        known = {sd: w for sd, w in weights.items() if self.subdivision_index(sd) is not None}
+        if not known:
+            return np.full(len(years), np.nan, dtype=np.float32)
+
+        totals = self.seasonal_totals(months, years, list(known))  # (S, Y)
+        w = np.asarray(list(known.values()), dtype=np.float32)[:, None]
+        present = ~np.isnan(totals)
+        weight = (w * present).sum(axis=0)
+        weighted = (np.where(present, totals, 0) * w).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(weight > 0, weighted / weight, np.nan).astype(np.float32)
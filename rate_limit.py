@@ -0,0 +1,65 @@
+# rate_limit.py
+# Small thread-safe token bucket used to stay polite towards upstream services
+
+import threading
+import time
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`
+
+    Args:
+        rate: Tokens added per second (e.g. 0.5 = one request every 2 seconds)
+        capacity: Maximum burst size (default 1 = no bursts)
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now. Returns True on success."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+            timeout: Give up after this many seconds (None = wait forever)
+
+        Returns:
+            True if tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
@@ -0,0 +1,279 @@
+# response_cache.py
+# Thread-safe TTL cache for data.gov.in responses
+# Used instead of st.cache_data so entries can be refreshed in the background
+# (see cache_warmer.py) before they expire
+# Expired entries are kept: when data.gov.in is down (or a dataset's circuit
+# is open) the last good value - or a local snapshot - is served instead,
+# flagged with 'stale' and 'data_as_of' so the answer can name its vintage.
+
+import functools
+import inspect
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from config import ENABLE_STALE_FALLBACK, CACHE_STALE_MAX_AGE, CACHE_MAX_ENTRIES, CACHE_MAX_TRACKED_REQUESTS
+from logging_setup import get_logger
+from metrics import CACHE_REQUESTS
+
+logger = get_logger(__name__)
+
+# All cached fetch functions, by name (used by the cache warmer)
+CACHED_FUNCTIONS = {}
+
+def _freeze(value):
+    """Turn lists/dicts into hashable tuples so they can be part of a cache key"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+# Fetch errors meaning the upstream could not be reached (as opposed to "no data")
+UPSTREAM_ERRORS = ('api_timeout', 'api_status', 'unexpected')
+
+# Fields marking a value served while the upstream was failing
+STALE_FIELDS = ('stale', 'data_as_of')
+
+def _is_cacheable(value):
+    """Only successful API responses are cached - failures should be retried next time"""
+    return isinstance(value, dict) and value.get('success') is True
+
+def _is_upstream_failure(value):
+    return isinstance(value, dict) and value.get('success') is False and value.get('error') in UPSTREAM_ERRORS
+
+def staleness(value):
+    """The stale marker fields of a value ({} if fresh) - for results derived from it"""
+    return {field: value[field] for field in STALE_FIELDS if field in value}
+
+class TTLCache:
+    """
+    In-memory cache where every entry expires `ttl` seconds after it was stored
+
+    Also remembers how often each key was requested (across expiries) so the
+    warmer can find the most popular queries.
+
+    Args:
+        ttl: Seconds an entry stays fresh
+        max_entries: Entries kept (least recently used are dropped)
+        max_tracked: Keys whose request counts are kept - past this the
+                     least requested half is dropped and the rest halved,
+                     so old popularity fades
+    """
+
+    def __init__(self, ttl, max_entries=CACHE_MAX_ENTRIES, max_tracked=CACHE_MAX_TRACKED_REQUESTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_tracked = max_tracked
+        self._entries = OrderedDict()  # key -> (stored_at, value, as_of), least recently used first
+        self._call_args = {}      # key -> keyword arguments that produced it
+        self._inflight = {}       # key -> threading.Event while a fetch is running
+        self.request_counts = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value if still fresh, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value, _ = entry
+            if time.time() - stored_at >= self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_stale(self, key, max_age=None):
+        """
+        The entry even if expired - expired values come back as a copy flagged
+        with 'stale' and 'data_as_of' (one copy per entry, so derived indexes
+        keyed on the value are reused)
+
+        Args:
+            max_age: Ignore entries whose data is older than this many seconds
+
+        Returns:
+            The value, or None if never stored or too old
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value, as_of = entry
+            now = time.time()
+            if max_age is not None and now - as_of > max_age:
+                return None
+            if now - stored_at >= self.ttl and not value.get('stale'):
+                value = dict(value, stale=True, data_as_of=as_of)
+                self._entries[key] = (stored_at, value, as_of)
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, stored_at=None, as_of=None):
+        """
+        Args:
+            stored_at: When the entry's TTL starts (default now; 0 = only usable as a stale fallback)
+            as_of: When the data was last confirmed upstream (default stored_at)
+        """
+        with self._lock:
+            if stored_at is None:
+                stored_at = time.time()
+            self._entries[key] = (stored_at, value, stored_at if as_of is None else as_of)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_in(self, key):
+        """Seconds until the entry expires (negative if expired), None if never stored"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry[0] + self.ttl - time.time()
+
+    def as_of(self, key):
+        """When the entry's data was last confirmed upstream, None if never stored"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[2]
+
+    def record_request(self, key, call_args):
+        with self._lock:
+            self.request_counts[key] += 1
+            self._call_args[key] = call_args
+            if len(self.request_counts) > self.max_tracked:
+                kept = self.request_counts.most_common(self.max_tracked // 2)
+                self.request_counts = Counter({k: (count + 1) // 2 for k, count in kept})
+                self._call_args = {k: self._call_args[k] for k in self.request_counts}
+
+    def most_requested(self, n):
+        """Return [(call_args, count), ...] for the n most requested keys"""
+        with self._lock:
+            return [(self._call_args[key], count)
+                    for key, count in self.request_counts.most_common(n)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._call_args.clear()
+            self.request_counts.clear()
+
+def ttl_cache(ttl):
+    """
+    Decorator caching successful fetch results for `ttl` seconds
+
+    The wrapped function gets extra attributes:
+        .refresh(*args, **kwargs) - fetch again and replace the cached entry
+        .expires_in(*args, **kwargs) - seconds until the entry for these args expires
+        .cache_key(*args, **kwargs) - the hashable key these args are cached under
+        .cache - the underlying TTLCache
+        .clear() - drop all entries
+        .set_fallback(provider) - provider(**kwargs) -> (as_of, value) or None,
+                                  consulted when the upstream fails and nothing is cached
+
+    Concurrent calls with the same arguments share one upstream request.
+    If the upstream fails, the last cached value (or the fallback provider's,
+    e.g. a local snapshot) is returned flagged as stale.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = TTLCache(ttl)
+        fallbacks = []
+
+        def bind(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(_freeze(v) for v in bound.arguments.values())
+            return key, dict(bound.arguments)
+
+        def fetch_and_store(key, args, kwargs):
+            # Single-flight: if another thread is already fetching this key, wait for it
+            with cache._lock:
+                event = cache._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = threading.Event()
+                    cache._inflight[key] = event
+
+            if not owner:
+                event.wait()
+                value = cache.get(key)
+                if value is not None:
+                    return value
+                # The other fetch failed - try ourselves
+                return func(*args, **kwargs)
+
+            try:
+                value = func(*args, **kwargs)
+                if _is_cacheable(value):
+                    cache.put(key, value)
+                return value
+            finally:
+                with cache._lock:
+                    cache._inflight.pop(key, None)
+                event.set()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key, call_args = bind(args, kwargs)
+            cache.record_request(key, call_args)
+
+            value = cache.get(key)
+            if value is not None:
+                CACHE_REQUESTS.inc(function=func.__name__, result='hit')
+                return value
+
+            CACHE_REQUESTS.inc(function=func.__name__, result='miss')
+            value = fetch_and_store(key, args, kwargs)
+            if ENABLE_STALE_FALLBACK and _is_upstream_failure(value):
+                return serve_stale(key, call_args, value)
+            return value
+
+        def serve_stale(key, call_args, failure):
+            """Last known good value (flagged stale) instead of an upstream failure"""
+            stale = cache.get_stale(key, CACHE_STALE_MAX_AGE)
+            if stale is None:
+                for provider in fallbacks:
+                    found = provider(**call_args)
+                    if found is not None:
+                        as_of, value = found
+                        # Kept for later failures only - the next call still tries upstream first
+                        cache.put(key, value, stored_at=0, as_of=as_of)
+                        stale = cache.get_stale(key, CACHE_STALE_MAX_AGE)
+                        break
+            if stale is None:
+                return failure
+            if not stale.get('stale'):
+                # Another caller stored a fresh value meanwhile
+                return stale
+
+            CACHE_REQUESTS.inc(function=func.__name__, result='stale')
+            logger.warning("🕰️ %s failed (%s) - serving data as of %s", func.__name__, failure.get('error'),
+                           time.strftime('%Y-%m-%d %H:%M', time.localtime(stale['data_as_of'])))
+            return stale
+
+        def refresh(*args, **kwargs):
+            key, _ = bind(args, kwargs)
+            return fetch_and_store(key, args, kwargs)
+
+        def expires_in(*args, **kwargs):
+            key, _ = bind(args, kwargs)
+            return cache.expires_in(key)
+
+        def cache_key(*args, **kwargs):
+            return bind(args, kwargs)[0]
+
+        def set_fallback(provider):
+            fallbacks[:] = [provider]
+
+        wrapper.refresh = refresh
+        wrapper.cache_key = cache_key
+        wrapper.expires_in = expires_in
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        wrapper.set_fallback = set_fallback
+
+        CACHED_FUNCTIONS[func.__name__] = wrapper
+        return wrapper
+
+    return decorator
@@ -0,0 +1,96 @@
+# scripts/import_profile.py
+# Import-time profile of the app modules (cold start cost on Streamlit Cloud)
+# Runs `python -X importtime` in a fresh interpreter, reports the slowest
+# imports, and optionally fails if the total exceeds a budget or a module that
+# should load lazily (Gemini client, numpy) is imported eagerly.
+#
+# Usage:
+#   python scripts/import_profile.py
+#   python scripts/import_profile.py --top 30 --budget-ms 3000 --forbid google.generativeai numpy
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Everything app.py imports before the first page renders
+APP_MODULES = [
+    "config", "metadata", "data_fetcher", "gemini_handler", "cache_warmer",
+    "query_planner", "prefetch", "conversation_store", "ui_render"
+]
+
+# Modules that must not be imported at startup (they are loaded on first use)
+DEFAULT_FORBIDDEN = ["google.generativeai", "numpy"]
+
+def run_importtime(modules):
+    """
+    Import modules in a fresh interpreter with -X importtime
+
+    Returns:
+        List of (self_us, cumulative_us, module name) tuples in import order
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"❌ Importing {modules} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            # The name column is "| " followed by two spaces per nesting level
+            rows.append((int(self_us), int(cumulative_us), name.rstrip()[1:]))
+        except ValueError:
+            continue
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of the app modules")
+    parser.add_argument("--top", type=int, default=20, help="How many of the slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if total import time exceeds this")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN,
+                        help="Fail if any of these modules is imported at startup")
+    args = parser.parse_args(argv)
+
+    rows = run_importtime(APP_MODULES)
+
+    # Top-level entries (no indentation) sum to the total wall time
+    total_us = sum(cumulative for _, cumulative, name in rows if not name.startswith(" "))
+    print(f"📦 {len(rows)} modules imported in {total_us / 1000:.0f} ms\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+
+    print("\nApp modules:")
+    for self_us, cumulative_us, name in rows:
+        if name.strip() in APP_MODULES:
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+
+    failures = []
+    imported = {name.strip() for _, _, name in rows}
+    for module in args.forbid or []:
+        if module in imported:
+            failures.append(f"{module} is imported at startup (should be lazy)")
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        failures.append(f"total import time {total_us / 1000:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+
+    print("\n✅ Import profile OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
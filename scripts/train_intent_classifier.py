@@ -0,0 +1,140 @@
+# scripts/train_intent_classifier.py
+# Train the local intent model used by intent_classifier.py
+# Fits a logistic regression over hashed word n-grams (plus the keyword
+# matcher's signals) with plain SGD - no ML dependencies. Training data are
+# JSONL files of {"question": ..., "is_data_query": true/false}, e.g. the
+# labels logged from Gemini's classify+parse call (INTENT_LOG_PATH), plus a
+# small built-in seed set.
+#
+# Usage:
+#   python scripts/train_intent_classifier.py intent_labels.jsonl
+#   python scripts/train_intent_classifier.py --no-seed --epochs 30 --output intent_model.json labels.jsonl
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from config import INTENT_MODEL_PATH  # noqa: E402
+from intent_classifier import HASH_DIM, featurize, rule_decision, extract_signals  # noqa: E402
+
+# Hand-labelled examples so a model can be trained before any labels are logged
+SEED_EXAMPLES = [
+    ("Compare the average annual rainfall in Punjab and Haryana for 2010-2014", True),
+    ("Top 3 crops in Haryana in 2014", True),
+    ("Which district in Punjab had the highest wheat production in 2014?", True),
+    ("Analyze the rice production trend in Punjab from 2010 to 2014", True),
+    ("How much rain did Kerala get during the monsoon of 2015?", True),
+    ("Wheat yield per hectare in Uttar Pradesh", True),
+    ("Rainfall in Maharashtra last 5 years", True),
+    ("Is drip irrigation better for sugarcane than traditional methods?", True),
+    ("Show cotton production in Gujarat 2012", True),
+    ("kharif rainfall in karnataka 2010", True),
+    ("lowest producing district for maize in Bihar", True),
+    ("How did rainfall affect rice output in West Bengal in 2009?", True),
+    ("water savings with drip irrigation for banana", True),
+    ("Compare groundnut production in Andhra Pradesh and Tamil Nadu", True),
+    ("What was the total rice production in India in 2010?", True),
+    ("What is the capital of India?", False),
+    ("What is kharif?", False),
+    ("Define crop rotation", False),
+    ("Who is the prime minister of India?", False),
+    ("What is the meaning of rabi season?", False),
+    ("Tell me a joke", False),
+    ("How is the weather today?", False),
+    ("What is data.gov.in?", False),
+    ("Explain what a hectare is", False),
+    ("What is the population of India?", False),
+    ("Which is the largest state in India?", False),
+    ("What does the government of India do for farmers in general?", False),
+    ("Write a poem about the rain", False),
+    ("What time is it?", False),
+    ("How do I cook rice?", False),
+]
+
+def read_examples(paths):
+    examples = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    item = json.loads(line)
+                    examples.append((item['question'], bool(item['is_data_query'])))
+    return examples
+
+def train(examples, epochs=20, learning_rate=0.5, l2=1e-4, seed=0):
+    """
+    SGD logistic regression on hashed features
+
+    Returns:
+        (bias, {feature index: weight})
+    """
+    rng = random.Random(seed)
+    data = [(featurize(question), 1.0 if label else 0.0) for question, label in examples]
+    bias, weights = 0.0, {}
+
+    for _ in range(epochs):
+        rng.shuffle(data)
+        for features, label in data:
+            z = bias + sum(weights.get(i, 0.0) for i in features)
+            p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+            gradient = p - label
+            bias -= learning_rate * gradient
+            for i in features:
+                w = weights.get(i, 0.0)
+                weights[i] = w - learning_rate * (gradient + l2 * w)
+
+    return bias, {i: w for i, w in weights.items() if abs(w) > 1e-6}
+
+def accuracy(examples, predict):
+    if not examples:
+        return float('nan')
+    return sum(predict(q) == label for q, label in examples) / len(examples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the local intent model")
+    parser.add_argument("labels", nargs="*", help="JSONL files of {question, is_data_query}")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, INTENT_MODEL_PATH or "intent_model.json"))
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--no-seed", action="store_true", help="Don't include the built-in seed examples")
+    args = parser.parse_args(argv)
+
+    examples = read_examples(args.labels)
+    if not args.no_seed:
+        examples += SEED_EXAMPLES
+    if not examples:
+        parser.error("no training examples")
+
+    # Every 5th example is held out to compare the model with the keyword rules
+    held_out = examples[::5]
+    training = [e for i, e in enumerate(examples) if i % 5]
+
+    bias, weights = train(training, epochs=args.epochs, learning_rate=args.learning_rate)
+
+    def model_predict(question):
+        z = bias + sum(weights.get(i, 0.0) for i in featurize(question))
+        return z >= 0
+
+    def rules_predict(question):
+        return rule_decision(extract_signals(question))
+
+    print(f"Examples: {len(training)} training, {len(held_out)} held out")
+    print(f"Held-out accuracy: model {accuracy(held_out, model_predict):.1%}, "
+          f"keyword rules {accuracy(held_out, rules_predict):.1%}")
+
+    # Final model uses every example
+    bias, weights = train(examples, epochs=args.epochs, learning_rate=args.learning_rate)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'hash_dim': HASH_DIM, 'bias': bias, 'weights': {str(i): round(w, 6) for i, w in weights.items()}}, f)
+    print(f"Wrote {args.output} ({len(weights)} weights)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
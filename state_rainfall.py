@@ -0,0 +1,131 @@
+# state_rainfall.py
+# State-level annual rainfall from IMD sub-divisional records
+# Several states span more than one subdivision (Uttar Pradesh, Rajasthan,
+# Maharashtra, Karnataka, ...). One pass over the annual block combines every
+# subdivision of every state into an area-weighted value per state and year.
+# The index is kept until the block itself is replaced (cache refresh or
+# delta sync), so each state lookup is a dictionary read with no upstream call.
+
+import threading
+
+from config import RAINFALL_STATE_WEIGHTING
+from metadata import SUBDIVISION_TO_STATE, normalize_state_name, get_subdivision_weights
+
+def _records_series(records):
+    """{subdivision: {year: annual mm}} from plain annual records"""
+    series = {}
+    for r in records:
+        name = (r.get('sd_name') or r.get('subdivision') or '').strip().upper()
+        try:
+            year = int(float(r.get('year')))
+            annual = float(r.get('annual'))
+        except (ValueError, TypeError):
+            continue
+        if annual > 0:  # Zero/negative values mark missing data
+            series.setdefault(name, {})[year] = annual
+    return series
+
+def _table_series(table):
+    """{subdivision: {year: annual mm}} straight from a memory-mapped table's columns (no row decoding)"""
+    name_column = next((c for c in ('sd_name', 'subdivision') if c in table.columns), None)
+    if name_column is None or 'year' not in table.numeric_columns or 'annual' not in table.numeric_columns:
+        return _records_series(table.rows())
+
+    years = table.numeric('year')
+    annual = table.numeric('annual')
+    valid = (annual > 0) & (years == years)  # NaN marks missing data; zero/negative too
+    series = {}
+    for name in {str(v).upper() for v in table.dictionaries[name_column] if v}:
+        mask = valid & table.equals_ignore_case(name_column, name)
+        if mask.any():
+            values = series.setdefault(name.strip(), {})
+            values.update(zip(years[mask].astype(int).tolist(), annual[mask].tolist()))
+    return series
+
+def _block_series(block):
+    """Annual series of a block, whether plain or memory-mapped (see dataset_store.py)"""
+    table = block.get('table')
+    return _table_series(table) if table is not None else _records_series(block['records'])
+
+class StateRainfallIndex:
+    """
+    Precomputed annual rainfall per (state, year), weighted over subdivisions
+
+    A year missing for some subdivisions is combined from the ones present
+    (weights renormalized) and its 'coverage' is the weight share they hold.
+
+    Args:
+        series: {subdivision (upper case): {year: annual mm}}, see _block_series
+        equal_weights: Weight subdivisions equally instead of by area
+    """
+
+    def __init__(self, series, equal_weights=False):
+        self.equal_weights = equal_weights
+        self._subdivisions = series
+
+        self._values = {}
+        states = {state for covered in SUBDIVISION_TO_STATE.values() for state in covered}
+        for state in states:
+            self._values[state] = self._combine(state)
+
+    def _combine(self, state):
+        """{year: entry} for one state"""
+        weights = get_subdivision_weights(state, equal=self.equal_weights)
+        years = set()
+        for subdivision in weights:
+            years.update(self._subdivisions.get(subdivision, {}))
+
+        combined = {}
+        for year in sorted(years):
+            present = {sd: w for sd, w in weights.items() if year in self._subdivisions.get(sd, {})}
+            weight = sum(present.values())
+            value = sum(w * self._subdivisions[sd][year] for sd, w in present.items()) / weight
+            combined[year] = {
+                'annual': round(value, 1),
+                'subdivisions': list(present),
+                'coverage': round(weight, 3)
+            }
+        return combined
+
+    def lookup(self, state_name, years):
+        """
+        Rainfall records for a state and years (years without data are left out)
+
+        Returns:
+            List of {'sd_name', 'year', 'annual', 'coverage'} records, by year
+        """
+        state = normalize_state_name(state_name)
+        values = self._values.get(state)
+        if values is None:
+            # State outside SUBDIVISION_TO_STATE (matched by its own name) - rare, not kept
+            values = self._combine(state)
+
+        records = []
+        for year in sorted(set(years)):
+            entry = values.get(year)
+            if entry:
+                records.append({
+                    'sd_name': " + ".join(entry['subdivisions']),
+                    'year': year,
+                    'annual': entry['annual'],
+                    'coverage': entry['coverage']
+                })
+        return records
+
+_index_lock = threading.Lock()
+_index_block = None
+_index = None
+
+def get_state_rainfall_index(block):
+    """
+    Index for an annual rainfall block, built once per block
+
+    Args:
+        block: Successful result of fetch_rainfall_annual_block()
+    """
+    global _index_block, _index
+    with _index_lock:
+        if _index_block is not block:
+            _index = StateRainfallIndex(_block_series(block), equal_weights=RAINFALL_STATE_WEIGHTING == "equal")
+            _index_block = block
+        return _index
@@ -0,0 +1,39 @@
+# tests/test_answer_templates.py
+# Template answers must never present part of the requested data as the whole answer
+
+from answer_templates import render_template_answer
+
+def _crop_section(state, years, production=500):
+    records = [{'state_name': state, 'district_name': district, 'crop': 'Rice', 'crop_year': str(year),
+                'season': 'Kharif', 'production_': str(production), 'area_': '100'}
+               for year in years for district in ('A', 'B')]
+    return {'success': True, 'state': state, 'crop': 'Rice', 'records': records}
+
+def _parsed(intent, years):
+    return {'parsed': {'intent': intent, 'entities': {'states': ['Punjab'], 'crops': ['rice'], 'years': years,
+                                                      'metrics': ['production']}}}
+
+def test_trend_with_single_year_of_data_falls_through_to_gemini():
+    question = "Show the rice production trend in Punjab from 2010 to 2014"
+    fetched = {'crops_Punjab_rice': _crop_section('Punjab', [2014])}
+    assert render_template_answer(question, _parsed('trend', [2010, 2014]), fetched) is None
+
+def test_year_range_in_question_counts_as_requested_years():
+    question = "Rice production in Punjab for 2010-2014"
+    fetched = {'crops_Punjab_rice': _crop_section('Punjab', [2014])}
+    assert render_template_answer(question, _parsed('comparison', []), fetched) is None
+
+def test_trend_with_every_requested_year_is_rendered():
+    question = "Show the rice production trend in Punjab from 2010 to 2014"
+    fetched = {'crops_Punjab_rice': _crop_section('Punjab', range(2010, 2015))}
+    answer = render_template_answer(question, _parsed('trend', [2010, 2014]), fetched)
+    assert answer is not None
+    assert all(f"- {year}:" in answer for year in range(2010, 2015))
+
+def test_state_extreme_compares_states_not_districts():
+    question = "Which state produced more rice in 2014, Punjab or Haryana?"
+    fetched = {'crops_Punjab_rice': _crop_section('Punjab', [2014], production=500),
+               'crops_Haryana_rice': _crop_section('Haryana', [2014], production=300)}
+    answer = render_template_answer(question, _parsed('extreme', [2014]), fetched)
+    assert "by state (2014)" in answer
+    assert "Highest: **Punjab**" in answer
@@ -0,0 +1,25 @@
+# tests/test_rainfall_monthly.py
+# Season names as Gemini writes them must resolve to the same month windows
+
+import pytest
+
+from rainfall_monthly import resolve_season
+
+@pytest.mark.parametrize("season, label", [
+    ("Kharif season", 'KHARIF'),
+    ("Rabi Season", 'RABI'),
+    ("monsoon season", 'JJAS'),
+    ("the monsoon rains", 'JJAS'),
+    ("JJAS (season)", 'JJAS'),
+    ("north-east monsoon season", 'OND'),
+    ("  Summer  ", 'MAM'),
+])
+def test_named_season_with_surrounding_words(season, label):
+    assert resolve_season(season)[0] == label
+
+def test_custom_window_with_season_suffix():
+    assert resolve_season("june to september season") == ('Jun-Sep', (6, 7, 8, 9))
+
+def test_unknown_season():
+    assert resolve_season("season") == (None, None)
+    assert resolve_season("harvest festival") == (None, None)
@@ -0,0 +1,249 @@
+# ui_render.py
+# Rendering helpers for the chat UI
+# Keeps per-rerun work constant: the CSS is minified once per process,
+# Data Sources cards are rendered once per message and cached on it, and
+# older history is paginated instead of re-rendered in full
+
+import html
+import re
+import time
+
+import streamlit as st
+
+from config import HISTORY_PAGE_SIZE
+
+_APP_CSS_SOURCE = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        color: #2E7D32;
+        text-align: center;
+        margin-bottom: 0.5rem;
+    }
+    .sub-header {
+        font-size: 1.1rem;
+        color: #666;
+        text-align: center;
+        margin-bottom: 1.5rem;
+    }
+    
+    /* Scroll to bottom button */
+    .scroll-to-bottom {
+        position: fixed;
+        bottom: 80px;
+        left: 20px;
+        z-index: 999;
+        background-color: #2E7D32;
+        color: white;
+        border: none;
+        border-radius: 50%;
+        width: 40px;
+        height: 40px;
+        cursor: pointer;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.3);
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 20px;
+    }
+    
+    .scroll-to-bottom:hover {
+        background-color: #1B5E20;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.4);
+    }
+    
+    /* ULTRA COMPACT SIDEBAR */
+    [data-testid="stSidebar"] {
+        font-size: 0.8rem;
+        padding-top: 0.5rem;
+    }
+    
+    [data-testid="stSidebar"] > div {
+        padding-top: 0.3rem;
+    }
+    
+    [data-testid="stSidebar"] .stButton {
+        margin-bottom: 0.15rem;
+    }
+    
+    [data-testid="stSidebar"] .stButton button {
+        padding: 0.25rem 0.4rem;
+        font-size: 0.75rem;
+        margin-bottom: 0;
+    }
+    
+    [data-testid="stSidebar"] h2 {
+        font-size: 0.9rem;
+        margin-bottom: 0.25rem;
+        margin-top: 0.25rem;
+        font-weight: 600;
+    }
+    
+    [data-testid="stSidebar"] hr {
+        margin: 0.3rem 0;
+        border-top: 1px solid #e0e0e0;
+    }
+    
+    [data-testid="stSidebar"] .stExpander {
+        border: 1px solid #e0e0e0;
+        border-radius: 3px;
+        margin-top: 0.2rem;
+        margin-bottom: 0.2rem;
+    }
+    
+    [data-testid="stSidebar"] .stExpander summary {
+        padding: 0.25rem 0.4rem;
+        font-size: 0.72rem;
+    }
+    
+    [data-testid="stSidebar"] .stExpander [data-testid="stExpanderDetails"] {
+        padding: 0.3rem 0.4rem;
+        font-size: 0.7rem;
+        line-height: 1.3;
+    }
+    
+    [data-testid="stSidebar"] .stCaption {
+        font-size: 0.68rem;
+        line-height: 1.2;
+        margin-bottom: 0.1rem;
+    }
+    
+    /* Question text in expander */
+    .example-question-text {
+        font-size: 0.7rem;
+        line-height: 1.4;
+        color: #333;
+    }
+    
+    .stChatMessage {
+        background-color: transparent !important;
+    }
+    
+    .stExpander {
+        border: 1px solid #e0e0e0;
+        border-radius: 4px;
+        margin-top: 0.5rem;
+    }
+    
+    .source-item {
+        background-color: #f8f9fa;
+        border-left: 3px solid #4CAF50;
+        padding: 0.6rem;
+        margin-bottom: 0.6rem;
+        border-radius: 4px;
+    }
+    
+    .source-title {
+        font-weight: 600;
+        font-size: 0.9rem;
+        color: #2E7D32;
+        margin-bottom: 0.3rem;
+    }
+    
+    .source-detail {
+        font-size: 0.8rem;
+        color: #666;
+        margin: 0.2rem 0;
+    }
+    
+    .api-url-box {
+        background-color: #f5f5f5;
+        border: 1px solid #ddd;
+        border-radius: 3px;
+        padding: 0.5rem;
+        margin-top: 0.3rem;
+        font-size: 0.7rem;
+        font-family: monospace;
+        word-break: break-all;
+        color: #555;
+    }
+</style>
+"""
+
+def _minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{}:;,>])\s*", r"\1", css).strip()
+
+# Custom CSS - PRODUCTION OPTIMIZED with ULTRA COMPACT SIDEBAR
+APP_CSS = _minify_css(_APP_CSS_SOURCE)
+
+SOURCES_FOOTER = (
+    "💡 All data sourced in real-time from **data.gov.in** (Government of India Open Data Portal)  \n"
+    "🔍 API endpoints above can be used to independently verify all data points"
+)
+
+def build_sources_html(api_calls):
+    """
+    Render all Data Sources cards as ONE html string (one element instead of one per source)
+
+    Args:
+        api_calls: List of api_calls_made dicts (purpose, url, records, dataset, as_of)
+    """
+    total_records = sum(c.get('records', 0) for c in api_calls)
+    parts = [f"<p><strong>{len(api_calls)} data source(s) • {total_records} records processed</strong></p>"]
+
+    for i, call in enumerate(api_calls, 1):
+        vintage = ""
+        if call.get("as_of"):
+            # Served from cache/snapshot while data.gov.in was unreachable
+            vintage = (f'<div class="source-detail">🕰️ Cached copy from '
+                       f'{time.strftime("%d %b %Y, %H:%M", time.localtime(call["as_of"]))}</div>')
+        parts.append(
+            f'<div class="source-item">'
+            f'<div class="source-title">Source {i}: {html.escape(str(call.get("dataset", "Unknown")))}</div>'
+            f'<div class="source-detail">📍 {html.escape(str(call.get("purpose", "N/A")))}</div>'
+            f'<div class="source-detail">📊 {call.get("records", 0)} records retrieved</div>'
+            f'{vintage}'
+            f'<div class="api-url-box">🔗 API: {html.escape(str(call.get("url", "N/A")))}</div>'
+            f'</div>'
+        )
+
+    return "".join(parts)
+
+def render_sources(sources_html):
+    """Show a rendered Data Sources card (inside whatever container is active)"""
+    st.markdown(sources_html, unsafe_allow_html=True)
+    st.markdown("---")
+    st.caption(SOURCES_FOOTER)
+
+def render_message(msg):
+    """
+    Render one stored message
+
+    The sources card is only built and sent when the user opens it, and
+    the built HTML is cached on the message for later reruns.
+    """
+    with st.chat_message(msg.role):
+        st.markdown(msg.content)
+
+        # Only show data sources when api_calls exist AND have data
+        if msg.role == 'assistant' and msg.api_calls:
+            if st.toggle("📊 Data Sources", key=f"sources_{msg.seq}"):
+                if msg.sources_html is None:
+                    msg.sources_html = build_sources_html(msg.api_calls)
+                render_sources(msg.sources_html)
+
+def _show_earlier(visible):
+    st.session_state['history_visible'] = visible + HISTORY_PAGE_SIZE
+
+@st.fragment
+def render_history(messages):
+    """
+    Render the conversation, newest HISTORY_PAGE_SIZE messages first
+
+    Runs as a fragment: opening a sources card or loading earlier messages
+    reruns only the history, not the whole app.
+    """
+    if not messages:
+        return
+
+    visible = st.session_state.get('history_visible', HISTORY_PAGE_SIZE)
+    hidden = max(0, len(messages) - visible)
+
+    if hidden:
+        st.button(f"⬆️ Show {min(hidden, HISTORY_PAGE_SIZE)} earlier message(s)", key="show_earlier",
+                  on_click=_show_earlier, args=(visible,))
+
+    for msg in messages[hidden:]:
+        render_message(msg)
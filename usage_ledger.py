@@ -0,0 +1,236 @@
+# usage_ledger.py
+# Token, latency and retry accounting for every Gemini call
+# call_gemini_with_retry reports each call with its pipeline stage
+# (classify_parse, parse, answer, general, polish) and the usage_metadata
+# Gemini returns. The ledger keeps hourly totals per stage and per-session
+# totals in memory, flags prompts over their stage's budget
+# (GEMINI_PROMPT_BUDGETS) and sessions over GEMINI_SESSION_TOKEN_BUDGET, and
+# can append every call to a JSONL file for offline analysis.
+#
+# Summarize a usage log:  python usage_ledger.py gemini_usage.jsonl
+
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    GEMINI_PROMPT_BUDGETS, GEMINI_SESSION_TOKEN_BUDGET, USAGE_LEDGER_HOURS, USAGE_LEDGER_MAX_SESSIONS,
+    USAGE_LOG_PATH
+)
+from logging_setup import get_logger, request_id_var, session_id_var
+from metrics import GEMINI_TOKENS, GEMINI_OVER_BUDGET
+
+logger = get_logger(__name__)
+
+def _new_totals():
+    return {'calls': 0, 'failures': 0, 'retries': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0,
+            'latency': 0.0, 'over_budget': 0}
+
+def _add(totals, entry):
+    totals['calls'] += 1
+    totals['failures'] += entry['outcome'] != 'success'
+    totals['retries'] += entry['attempts'] - 1
+    totals['prompt_tokens'] += entry['prompt_tokens']
+    totals['cached_tokens'] += entry.get('cached_tokens', 0)
+    totals['output_tokens'] += entry['output_tokens']
+    totals['latency'] += entry['latency']
+    totals['over_budget'] += entry['over_budget']
+
+def token_counts(usage):
+    """
+    (prompt tokens, output tokens) from a response's usage_metadata
+
+    Output includes the model's thinking tokens, which are billed as output.
+    """
+    if usage is None:
+        return 0, 0
+    prompt = getattr(usage, 'prompt_token_count', 0) or 0
+    output = (getattr(usage, 'candidates_token_count', 0) or 0) + (getattr(usage, 'thoughts_token_count', 0) or 0)
+    return prompt, output
+
+class UsageLedger:
+    """
+    In-memory Gemini usage totals by hour/stage and by session
+
+    Args:
+        budgets: {stage: prompt token budget}
+        session_budget: Tokens per session before it is flagged
+        path: Optional JSONL file receiving one line per call
+    """
+
+    def __init__(self, budgets=GEMINI_PROMPT_BUDGETS, session_budget=GEMINI_SESSION_TOKEN_BUDGET,
+                 path=USAGE_LOG_PATH, max_hours=USAGE_LEDGER_HOURS, max_sessions=USAGE_LEDGER_MAX_SESSIONS):
+        self.budgets = budgets
+        self.session_budget = session_budget
+        self.path = path
+        self.max_hours = max_hours
+        self.max_sessions = max_sessions
+        self._hours = OrderedDict()     # hour start (epoch) -> {stage: totals}
+        self._sessions = OrderedDict()  # session id -> totals (+ 'stages')
+        self._lock = threading.Lock()
+
+    def record(self, stage, usage, latency, attempts, outcome, prompt_chars=0):
+        """
+        Account one Gemini call (retries included)
+
+        Args:
+            stage: Pipeline stage that made the call
+            usage: response.usage_metadata (None if the call failed)
+            latency: Seconds from first attempt to final outcome
+            attempts: Attempts made
+            outcome: 'success' or the error kind (rate_limit, timeout, blocked, api_error)
+            prompt_chars: Prompt length, for calls without usage metadata
+
+        Returns:
+            The ledger entry (a dict)
+        """
+        prompt_tokens, output_tokens = token_counts(usage)
+        # Part of the prompt served from a Gemini context cache (billed at a lower rate)
+        cached_tokens = (getattr(usage, 'cached_content_token_count', 0) or 0) if usage is not None else 0
+        budget = self.budgets.get(stage)
+        entry = {
+            'ts': time.time(), 'stage': stage, 'session': session_id_var.get(), 'request': request_id_var.get(),
+            'prompt_tokens': prompt_tokens, 'cached_tokens': cached_tokens, 'output_tokens': output_tokens,
+            'prompt_chars': prompt_chars, 'latency': round(latency, 3), 'attempts': attempts, 'outcome': outcome,
+            'over_budget': bool(budget and prompt_tokens > budget)
+        }
+
+        GEMINI_TOKENS.inc(prompt_tokens, stage=stage, kind='prompt')
+        GEMINI_TOKENS.inc(output_tokens, stage=stage, kind='output')
+        if entry['over_budget']:
+            GEMINI_OVER_BUDGET.inc(stage=stage)
+            logger.warning("💸 %s prompt used %d tokens (budget %d, %d chars)", stage, prompt_tokens, budget, prompt_chars)
+
+        hour = int(entry['ts'] // 3600 * 3600)
+        with self._lock:
+            stages = self._hours.get(hour)
+            if stages is None:
+                stages = self._hours[hour] = {}
+                while len(self._hours) > self.max_hours:
+                    self._hours.popitem(last=False)
+            _add(stages.setdefault(stage, _new_totals()), entry)
+
+            session = self._sessions.get(entry['session'])
+            if session is None:
+                session = self._sessions[entry['session']] = dict(_new_totals(), stages={})
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(entry['session'])
+            before = session['prompt_tokens'] + session['output_tokens']
+            _add(session, entry)
+            _add(session['stages'].setdefault(stage, _new_totals()), entry)
+            after = session['prompt_tokens'] + session['output_tokens']
+
+            if self.path:
+                self._append(entry)
+
+        if self.session_budget and before <= self.session_budget < after:
+            logger.warning("💸 Session %s passed its token budget (%d > %d)", entry['session'], after, self.session_budget)
+        return entry
+
+    def _append(self, entry):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning("⚠️ Could not log Gemini usage: %.200s", e)
+
+    def hourly(self):
+        """[{'hour', 'stage', totals...}, ...] oldest hour first"""
+        with self._lock:
+            return [dict(totals, hour=hour, stage=stage)
+                    for hour, stages in self._hours.items() for stage, totals in sorted(stages.items())]
+
+    def session(self, session_id):
+        """Totals for one session (with per-stage totals and an 'over_budget_session' flag), or None"""
+        with self._lock:
+            totals = self._sessions.get(session_id)
+            if totals is None:
+                return None
+            result = dict(totals, stages={stage: dict(t) for stage, t in totals['stages'].items()})
+        result['over_budget_session'] = bool(
+            self.session_budget and result['prompt_tokens'] + result['output_tokens'] > self.session_budget)
+        return result
+
+    def top_sessions(self, n=10):
+        """[(session id, total tokens), ...] for the n heaviest sessions"""
+        with self._lock:
+            ranked = [(sid, t['prompt_tokens'] + t['output_tokens']) for sid, t in self._sessions.items()]
+        return sorted(ranked, key=lambda item: item[1], reverse=True)[:n]
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_usage_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
+
+def record_gemini_usage(stage, usage, latency, attempts, outcome, prompt_chars=0):
+    """Account one Gemini call in the process-wide ledger (never raises)"""
+    try:
+        return get_usage_ledger().record(stage, usage, latency, attempts, outcome, prompt_chars)
+    except Exception as e:
+        logger.warning("⚠️ Gemini usage accounting failed: %.200s", e)
+        return None
+
+# ---------------------------------------------------------------------------
+# Offline summary of a USAGE_LOG_PATH file
+# ---------------------------------------------------------------------------
+
+def summarize(entries):
+    """
+    Totals by stage, by hour and by session for logged ledger entries
+
+    Returns:
+        {'stages': {stage: totals}, 'hours': {hour: totals}, 'sessions': {session: totals}}
+    """
+    summary = {'stages': {}, 'hours': {}, 'sessions': {}}
+    for entry in entries:
+        _add(summary['stages'].setdefault(entry['stage'], _new_totals()), entry)
+        _add(summary['hours'].setdefault(int(entry['ts'] // 3600 * 3600), _new_totals()), entry)
+        _add(summary['sessions'].setdefault(entry['session'], _new_totals()), entry)
+    return summary
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: python usage_ledger.py USAGE_LOG.jsonl [...]")
+        return 2
+
+    entries = []
+    for path in argv:
+        with open(path, encoding='utf-8') as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    summary = summarize(entries)
+
+    print(f"{'stage':<16}{'calls':>7}{'fail':>6}{'retry':>7}{'prompt tok':>12}{'avg prompt':>12}{'cached':>9}"
+          f"{'output tok':>12}{'avg s':>8}{'over budget':>13}")
+    # Stages spending the most prompt tokens first - that's where prompt work pays off
+    for stage, t in sorted(summary['stages'].items(), key=lambda item: item[1]['prompt_tokens'], reverse=True):
+        print(f"{stage:<16}{t['calls']:>7}{t['failures']:>6}{t['retries']:>7}{t['prompt_tokens']:>12,}"
+              f"{t['prompt_tokens'] / t['calls']:>12,.0f}{t['cached_tokens'] / max(1, t['prompt_tokens']):>9.0%}"
+              f"{t['output_tokens']:>12,}{t['latency'] / t['calls']:>8.2f}"
+              f"{t['over_budget']:>13}")
+
+    print("\nBy hour:")
+    for hour, t in sorted(summary['hours'].items()):
+        print(f"  {time.strftime('%Y-%m-%d %H:00', time.localtime(hour))}  {t['calls']:>5} calls  "
+              f"{t['prompt_tokens'] + t['output_tokens']:>10,} tokens  {t['retries']:>4} retries")
+
+    print("\nHeaviest sessions:")
+    heaviest = sorted(summary['sessions'].items(),
+                      key=lambda item: item[1]['prompt_tokens'] + item[1]['output_tokens'], reverse=True)[:10]
+    for session, t in heaviest:
+        total = t['prompt_tokens'] + t['output_tokens']
+        flag = "  ⚠️ over budget" if GEMINI_SESSION_TOKEN_BUDGET and total > GEMINI_SESSION_TOKEN_BUDGET else ""
+        print(f"  {session:<34}{t['calls']:>5} calls  {total:>10,} tokens{flag}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())